@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.sites.shortcuts import get_current_site
 from django.utils.translation import gettext_lazy as _
 
 # Register your models here.
-from accounts.models import CustomUser, Profile
+from accounts.helpers import send_account_activation_emails
+from accounts.models import CustomUser, Profile, QueuedEmail
 
 
 class ProfileInline(admin.StackedInline):
@@ -32,6 +34,8 @@ class CustomUserAdmin(UserAdmin):
     ]
     # Show a related field in the list view
     list_select_related = ["profile"]
+    # Bulk actions available in the list view
+    actions = ["resend_activation_email"]
 
     # Split up the view into sections
     fieldsets = (
@@ -67,6 +71,17 @@ class CustomUserAdmin(UserAdmin):
 
     get_title.short_description = "Title"
 
+    # Example of a bulk action on the selected users
+    @admin.action(description="Re-send activation email")
+    def resend_activation_email(self, request, queryset):
+        users = list(
+            queryset.filter(is_active=False).select_related("profile")
+        )
+        send_account_activation_emails(users, get_current_site(request))
+        self.message_user(
+            request, f"Activation email sent to {len(users)} user(s)."
+        )
+
     def get_inline_instances(self, request, obj=None):
         if not obj:
             return list()
@@ -74,3 +89,21 @@ class CustomUserAdmin(UserAdmin):
 
 
 admin.site.register(CustomUser, CustomUserAdmin)
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    model = QueuedEmail
+    list_display = [
+        "subject",
+        "recipients",
+        "status",
+        "attempts",
+        "created_at",
+        "claimed_at",
+    ]
+    list_filter = ["status"]
+    search_fields = ["subject", "recipients"]
+    ordering = ["-created_at"]
+
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
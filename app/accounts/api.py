@@ -2,6 +2,11 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ValidationError
 from django.dispatch import receiver
 from django_rest_passwordreset.signals import reset_password_token_created
+from django_rest_passwordreset.views import (
+    ResetPasswordConfirm,
+    ResetPasswordRequestToken,
+    ResetPasswordValidateToken,
+)
 from knox.models import AuthToken
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
@@ -13,6 +18,8 @@ from .serializers import (
     RegisterSerializer,
     UserSerializer,
 )
+from app.throttling import SlidingWindowThrottle
+from app.views import AsyncAPIViewMixin
 
 
 # Register API
@@ -23,13 +30,15 @@ class RegisterAPI(generics.GenericAPIView):
     """
 
     serializer_class = RegisterSerializer
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "register"
 
     def post(self, request, *args, **kwargs):
         # Validate the data
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # Save the user
+        # Save the user, along with their profile details
         try:
             user = serializer.save()
         except ValidationError:
@@ -38,20 +47,12 @@ class RegisterAPI(generics.GenericAPIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Save the profile details
-        user.refresh_from_db()
-        for field in ["title", "job_title"]:
-            if field in request.data:
-                setattr(user.profile, field, request.data[field])
-
         # Make any other changes to the user here as required
         # e.g. forcing specific domains to be superusers by default
         # if user.email.split("@")[1] == "superuserdomain.co.uk":
         #   user.is_staff = True
         #   user.is_superuser = True
-
-        # Save the user with the profile details
-        user.save()
+        #   user.save()
 
         # Return the API respose with the user details and empty token
         # The token is empty so that the user is forced to activate their
@@ -83,14 +84,9 @@ class ActivateAccountAPI(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # Get the validated user details
-        user = serializer.validated_data
-        # Set the user's active state to true so they can log in
-        user.is_active = True
-        # Set their profile to say the email was confirmed
-        user.profile.email_confirmed = True
-        # Save the updates
-        user.save()
+        # Set the user's active state to true so they can log in, and their
+        # profile to say the email was confirmed
+        user = serializer.activate()
 
         # Return the API respose with the user details and null token
         return Response(
@@ -116,6 +112,8 @@ class LoginAPI(generics.GenericAPIView):
     """
 
     serializer_class = LoginSerializer
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "login"
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -134,7 +132,7 @@ class LoginAPI(generics.GenericAPIView):
 
 
 # Get User API
-class UserAPI(generics.RetrieveAPIView):
+class UserAPI(AsyncAPIViewMixin, generics.RetrieveAPIView):
     """
     Returns the user details connected to the provided token
     """
@@ -147,8 +145,30 @@ class UserAPI(generics.RetrieveAPIView):
     def get_object(self):
         return self.request.user
 
+    # The user was loaded when authenticating, so nothing else needs the
+    # database when dispatched asynchronously (see app/views.py)
+    async def aget(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
+
 
 # Password reset
+# The views from django_rest_passwordreset, with the attempts limited
+class PasswordResetRequestAPI(ResetPasswordRequestToken):
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "password_reset"
+
+
+class PasswordResetValidateAPI(ResetPasswordValidateToken):
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "password_reset_confirm"
+
+
+class PasswordResetConfirmAPI(ResetPasswordConfirm):
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "password_reset_confirm"
+
+
 @receiver(reset_password_token_created)
 def password_reset_token_created(
     sender, instance, reset_password_token, *args, **kwargs
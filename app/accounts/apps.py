@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "accounts"
+
+    def ready(self):
+        from accounts.hashing import is_hashing_process
+        from accounts.housekeeping import setup_runner
+        from app.validators import password_policy
+
+        # The hashing processes only hash passwords
+        if is_hashing_process:
+            return
+
+        # Create the password validators (loading the common passwords list)
+        # at startup, rather than in the first request that needs them
+        password_policy.validators
+
+        # Clear expired tokens in the background, if it's turned on
+        setup_runner()
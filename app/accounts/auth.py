@@ -0,0 +1,234 @@
+import binascii
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import get_token_model
+from knox.settings import knox_settings
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+
+
+def token_cache_key(digest):
+    return f"auth_token:{digest}"
+
+
+def token_refresh_key(digest):
+    return f"auth_token_refresh:{digest}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Knox token authentication, caching tokens once they have been validated.
+
+    Knox looks up the token, and the user's other tokens, in the database on
+    every request. Instead, once a token has been validated its details are
+    cached (by digest) for AUTH_TOKEN_CACHE_TIMEOUT seconds, and following
+    requests use the cached user (see accounts.user_cache), so don't need the
+    database at all.
+
+    When AUTO_REFRESH is on, the expiry is only written to the database once
+    per MIN_REFRESH_INTERVAL (see REST_KNOX), rather than on every request.
+
+    Cached tokens are removed as soon as the token is deleted e.g. on logout
+    (see accounts.models).
+
+    Async views authenticate with `aauthenticate` instead.
+    """
+
+    def authenticate_credentials(self, token):
+        digest = self.get_digest(token)
+
+        cached = cache.get(token_cache_key(digest))
+        if self.is_cached_valid(cached):
+            auth_token = self.get_cached_token(digest, cached)
+            if knox_settings.AUTO_REFRESH and auth_token.expiry:
+                self.renew_token(auth_token)
+            return self.validate_user(auth_token)
+
+        # Not cached (or expired), so validate the token against the database
+        user, auth_token = super().authenticate_credentials(token)
+        self.cache_token(auth_token)
+        return user, auth_token
+
+    async def aauthenticate(self, request):
+        """
+        Authenticate the request from an async view (see app/views.py).
+
+        Cached tokens are checked using the async cache and ORM. Tokens that
+        aren't cached are checked against the database as usual, in a thread.
+        """
+        token = self.get_token(request)
+        if token is None:
+            return None
+
+        digest = self.get_digest(token)
+        cached = await cache.aget(token_cache_key(digest))
+        if self.is_cached_valid(cached):
+            auth_token = await self.aget_cached_token(digest, cached)
+            if knox_settings.AUTO_REFRESH and auth_token.expiry:
+                await self.arenew_token(auth_token)
+            return self.validate_user(auth_token)
+
+        return await sync_to_async(self.authenticate_credentials)(token)
+
+    def get_token(self, request):
+        """
+        The token from the Authorization header, or None if there isn't one
+        (with the same checks as TokenAuthentication.authenticate)
+        """
+        auth = get_authorization_header(request).split()
+        prefix = self.authenticate_header(request).encode()
+
+        if not auth or auth[0].lower() != prefix.lower():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid token header. No credentials provided.")
+            )
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(
+                _(
+                    "Invalid token header. "
+                    "Token string should not contain spaces."
+                )
+            )
+        return auth[1]
+
+    def get_digest(self, token):
+        try:
+            return hash_token(token.decode("utf-8"))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+    def is_cached_valid(self, cached):
+        return cached is not None and (
+            cached["expiry"] is None or cached["expiry"] > timezone.now()
+        )
+
+    def get_cached_token(self, digest, cached):
+        """
+        Rebuild the token from the cached details, with the cached user
+        """
+        # Imported here, as the user cache needs the models
+        from accounts.user_cache import get_cached_user
+
+        try:
+            user = get_cached_user(cached["user_id"])
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        return self.build_token(digest, cached, user)
+
+    async def aget_cached_token(self, digest, cached):
+        from accounts.user_cache import aget_cached_user
+
+        try:
+            user = await aget_cached_user(cached["user_id"])
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        return self.build_token(digest, cached, user)
+
+    def build_token(self, digest, cached, user):
+        auth_token = get_token_model()(
+            digest=digest,
+            token_key=cached["token_key"],
+            user=user,
+            created=cached["created"],
+            expiry=cached["expiry"],
+        )
+        # Mark it as an existing row so that it can be deleted on logout
+        auth_token._state.adding = False
+        auth_token._state.db = get_token_model().objects.db
+        return auth_token
+
+    def get_cache_value(self, auth_token):
+        return {
+            "token_key": auth_token.token_key,
+            "user_id": auth_token.user_id,
+            "created": auth_token.created,
+            "expiry": auth_token.expiry,
+        }
+
+    def cache_token(self, auth_token):
+        cache.set(
+            token_cache_key(auth_token.digest),
+            self.get_cache_value(auth_token),
+            settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+    async def acache_token(self, auth_token):
+        await cache.aset(
+            token_cache_key(auth_token.digest),
+            self.get_cache_value(auth_token),
+            settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+    def get_new_expiry(self, auth_token):
+        """
+        The new expiry when refreshing the token, or None if it shouldn't be
+        changed
+        """
+        new_expiry = timezone.now() + knox_settings.TOKEN_TTL
+        # Do not auto-renew tokens past AUTO_REFRESH_MAX_TTL
+        if knox_settings.AUTO_REFRESH_MAX_TTL is not None:
+            new_expiry = min(
+                new_expiry,
+                auth_token.created + knox_settings.AUTO_REFRESH_MAX_TTL,
+            )
+        if new_expiry <= auth_token.expiry:
+            return None
+        return new_expiry
+
+    def renew_token(self, auth_token):
+        # Only the first request in each refresh interval (across all
+        # processes sharing the cache) writes the new expiry
+        if not cache.add(
+            token_refresh_key(auth_token.digest),
+            True,
+            knox_settings.MIN_REFRESH_INTERVAL,
+        ):
+            return
+
+        new_expiry = self.get_new_expiry(auth_token)
+        if new_expiry is None:
+            return
+
+        auth_token.expiry = new_expiry
+        updated = (
+            get_token_model()
+            .objects.filter(digest=auth_token.digest)
+            .update(expiry=new_expiry)
+        )
+        # The token has been deleted since it was cached
+        if not updated:
+            cache.delete(token_cache_key(auth_token.digest))
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        self.cache_token(auth_token)
+
+    async def arenew_token(self, auth_token):
+        if not await cache.aadd(
+            token_refresh_key(auth_token.digest),
+            True,
+            knox_settings.MIN_REFRESH_INTERVAL,
+        ):
+            return
+
+        new_expiry = self.get_new_expiry(auth_token)
+        if new_expiry is None:
+            return
+
+        auth_token.expiry = new_expiry
+        updated = (
+            await get_token_model()
+            .objects.filter(digest=auth_token.digest)
+            .aupdate(expiry=new_expiry)
+        )
+        if not updated:
+            await cache.adelete(token_cache_key(auth_token.digest))
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        await self.acache_token(auth_token)
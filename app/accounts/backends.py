@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class EmailBackend(ModelBackend):
+    """
+    As ModelBackend, keeping the user that was looked up (or None) on the
+    request as `login_user`, so that a failed login can say why without
+    loading the user again. Inactive users' passwords aren't checked.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash the password anyway, so that this takes as long as an
+            # incorrect password
+            UserModel().set_password(password)
+            user = None
+
+        if request is not None:
+            request.login_user = user
+        if (
+            user is not None
+            and self.user_can_authenticate(user)
+            and user.check_password(password)
+        ):
+            return user
+        return None
@@ -0,0 +1,115 @@
+import re
+import string
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Checking email addresses against ALLOWED_EMAIL_DOMAINS.
+# An address is allowed when its domain is one of the allowed domains,
+# optionally with anything before it (e.g. a subdomain), followed by a
+# top level domain of 2 to 5 characters e.g. "mydomain" allows
+# user@mydomain.com and user@mail.mydomain.co.uk.
+#
+# The allowed domains are compiled once per process into a trie of their
+# reversed characters, so checking an address takes about the same time
+# whether there are two allowed domains or a hundred thousand.
+
+# The characters allowed in the local part of the address
+LOCAL_PART = r"[a-zA-Z0-9\._:$!%-']+"
+ADDRESS_RE = re.compile(LOCAL_PART + r"@([^@]+)")
+INVALID_PREFIX_RE = re.compile(r"[^a-zA-Z0-9.-]")
+TLD_CHARS = frozenset(string.ascii_letters + ".")
+TLD_LENGTHS = range(2, 6)
+
+# Marks the end of an allowed domain in the trie
+END = None
+
+_policy = None
+
+
+class EmailDomainPolicy:
+    """
+    Checks email addresses against a list of allowed domains. All addresses
+    are allowed when the list is empty.
+    """
+
+    def __init__(self, domains):
+        domains = list(domains)
+        self.allow_all = not domains
+        self.trie = {}
+        for domain in domains:
+            node = self.trie
+            for char in reversed(domain):
+                node = node.setdefault(char, {})
+            node[END] = True
+
+    def is_allowed(self, email):
+        """
+        Whether the email address is allowed
+        """
+        if self.allow_all:
+            return True
+
+        match = ADDRESS_RE.fullmatch(email)
+        if match is None:
+            return False
+        domain = match.group(1)
+
+        for length in TLD_LENGTHS:
+            if len(domain) <= length:
+                break
+            if domain[-length - 1] != "." or not TLD_CHARS.issuperset(
+                domain[-length:]
+            ):
+                continue
+            if self.matches_end(domain[: -length - 1]):
+                return True
+        return False
+
+    def check_many(self, emails):
+        """
+        Whether each of the email addresses is allowed e.g. when importing
+        many users
+        """
+        return [self.is_allowed(email) for email in emails]
+
+    def matches_end(self, name):
+        """
+        Whether the name ends with an allowed domain, with only valid
+        characters before it
+        """
+        # Everything before this index is valid before an allowed domain
+        invalid = INVALID_PREFIX_RE.search(name)
+        valid_before = len(name) if invalid is None else invalid.start()
+
+        node = self.trie
+        index = len(name)
+        for char in reversed(name):
+            node = node.get(char)
+            if node is None:
+                return False
+            index -= 1
+            if END in node and index <= valid_before:
+                return True
+        return False
+
+
+def get_email_domain_policy():
+    """
+    The policy for ALLOWED_EMAIL_DOMAINS, compiled the first time it is used
+    """
+    global _policy
+
+    if _policy is None:
+        _policy = EmailDomainPolicy(settings.ALLOWED_EMAIL_DOMAINS)
+    return _policy
+
+
+# Recompile the policy if the allowed domains change (e.g. in tests)
+@receiver(setting_changed)
+def clear_email_domain_policy(setting, **kwargs):
+    global _policy
+
+    if setting == "ALLOWED_EMAIL_DOMAINS":
+        _policy = None
@@ -0,0 +1,252 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+# Outgoing email queue
+# Rather than sending emails during a request (and making the user wait for
+# the mail server), they are saved to the database and sent in the background
+# by running the send_queued_emails management command. This is controlled by
+# the EMAIL_USE_QUEUE setting - when it is off, emails are sent straight away.
+
+
+def queue_email(subject, message, recipient_list, html_message=None):
+    """
+    Queue an email to be sent, or send it straight away if the queue is off
+    """
+    if not settings.EMAIL_USE_QUEUE:
+        mail.send_mail(
+            subject, message, None, recipient_list, html_message=html_message
+        )
+        return None
+
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def queue_emails(emails):
+    """
+    Queue many (subject, message, recipient_list, html_message) emails with one
+    query, or send them over one connection if the queue is off
+    """
+    if not settings.EMAIL_USE_QUEUE:
+        messages = []
+        for subject, message, recipient_list, html_message in emails:
+            email = mail.EmailMultiAlternatives(
+                subject, message, None, recipient_list
+            )
+            if html_message:
+                email.attach_alternative(html_message, "text/html")
+            messages.append(email)
+        mail.get_connection().send_messages(messages)
+        return []
+
+    return QueuedEmail.objects.bulk_create(
+        [
+            QueuedEmail(
+                subject=subject,
+                body=message,
+                html_body=html_message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipients=list(recipient_list),
+            )
+            for subject, message, recipient_list, html_message in emails
+        ]
+    )
+
+
+def build_message(queued_email, connection):
+    """
+    Create the email message to send from the queued email
+    """
+    message = mail.EmailMultiAlternatives(
+        queued_email.subject,
+        queued_email.body,
+        queued_email.from_email,
+        queued_email.recipients,
+        connection=connection,
+    )
+    if queued_email.html_body:
+        message.attach_alternative(queued_email.html_body, "text/html")
+    return message
+
+
+def get_retry_delay(attempts):
+    """
+    How long to wait before trying again, doubling after each failure
+    """
+    return timedelta(
+        seconds=settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def send_queued_emails(batch_size=None, connection=None):
+    """
+    Send the queued emails that are due, in batches over a single mail server
+    connection, until there are none left.
+
+    Failed emails are retried later with an increasing delay, until they
+    have been tried EMAIL_QUEUE_MAX_ATTEMPTS times.
+
+    Returns a tuple of the number of emails (sent, failed).
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    connection = connection or mail.get_connection()
+    sent = failed = 0
+
+    requeue_stale_emails()
+
+    # Keep the connection open for all of the batches
+    with connection:
+        while True:
+            batch_sent, batch_failed = send_batch(batch_size, connection)
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent + batch_failed < batch_size:
+                break
+            # Stop if everything in the batch failed, rather than retrying
+            # straight away against a broken server
+            if not batch_sent:
+                break
+
+    return sent, failed
+
+
+def requeue_stale_emails():
+    """
+    Put emails that have been left as sending for longer than
+    EMAIL_QUEUE_CLAIM_TIMEOUT back in the queue, or mark them as failed if
+    they have run out of attempts.
+
+    Returns the number of emails requeued.
+    """
+    now = timezone.now()
+    stale = QueuedEmail.objects.filter(
+        Q(claimed_at__isnull=True)
+        | Q(
+            claimed_at__lte=now
+            - timedelta(seconds=settings.EMAIL_QUEUE_CLAIM_TIMEOUT)
+        ),
+        status=QueuedEmail.SENDING,
+    )
+    max_attempts = settings.EMAIL_QUEUE_MAX_ATTEMPTS
+    stale.filter(attempts__gte=max_attempts).update(
+        status=QueuedEmail.FAILED,
+        last_error="Sending did not finish",
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=QueuedEmail.PENDING,
+        next_attempt_at=now,
+    )
+    if requeued:
+        logger.warning("Requeued %s emails left as sending", requeued)
+    return requeued
+
+
+def claim_batch(batch_size):
+    """
+    Mark a batch of the due emails as being sent, committing before any of
+    them are sent so that no other worker (or later run) sends them again
+    """
+    with transaction.atomic():
+        # Lock the rows so that other workers skip these emails
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=QueuedEmail.PENDING,
+                next_attempt_at__lte=timezone.now(),
+            )
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        now = timezone.now()
+        for queued_email in batch:
+            queued_email.status = QueuedEmail.SENDING
+            queued_email.attempts += 1
+            queued_email.claimed_at = now
+        QueuedEmail.objects.bulk_update(
+            batch, ["status", "attempts", "claimed_at"]
+        )
+    return batch
+
+
+def send_batch(batch_size, connection):
+    """
+    Send a single batch of queued emails.
+
+    If the process stops while sending, the claimed emails are left as
+    sending rather than risk sending them twice straight away. They are put
+    back in the queue once EMAIL_QUEUE_CLAIM_TIMEOUT has passed (see
+    requeue_stale_emails).
+    """
+    sent = failed = 0
+    batch = claim_batch(batch_size)
+    for index, queued_email in enumerate(batch):
+        try:
+            build_message(queued_email, connection).send()
+        except Exception as e:
+            logger.warning("Failed to send queued email: %s", e)
+            failed += 1
+            queued_email.last_error = str(e)
+            if queued_email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+                queued_email.status = QueuedEmail.FAILED
+            else:
+                queued_email.status = QueuedEmail.PENDING
+                queued_email.next_attempt_at = (
+                    timezone.now() + get_retry_delay(queued_email.attempts)
+                )
+            # The failure may have broken the connection, so start a new
+            # one. If that isn't possible, leave the rest for next time.
+            if not reconnect(connection):
+                for unsent in batch[index + 1 :]:
+                    unsent.status = QueuedEmail.PENDING
+                    unsent.attempts -= 1
+                break
+        else:
+            sent += 1
+            queued_email.status = QueuedEmail.SENT
+            queued_email.sent_at = timezone.now()
+            # The bodies aren't needed once sent, and contain links (e.g. to
+            # activate the account or reset the password) that shouldn't be
+            # kept in the database
+            queued_email.body = ""
+            queued_email.html_body = None
+
+    QueuedEmail.objects.bulk_update(
+        batch,
+        [
+            "attempts",
+            "last_error",
+            "status",
+            "next_attempt_at",
+            "sent_at",
+            "body",
+            "html_body",
+        ],
+    )
+    return sent, failed
+
+
+def reconnect(connection):
+    """
+    Close and reopen the connection to the mail server
+    """
+    connection.close()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Unable to reconnect to the mail server: %s", e)
+        return False
+    return True
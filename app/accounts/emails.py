@@ -0,0 +1,112 @@
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template.loader import get_template
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .tokens import account_activation_token
+
+# Rendering of the account emails.
+# Each email has a text and a html template, which are loaded and compiled
+# once per process and then reused. The context for each user is built once
+# and used to render both versions.
+
+
+class AccountEmail:
+    """
+    An email sent to a user, rendered from the text and html templates
+    `<template_name>.txt` and `<template_name>.html`
+    """
+
+    subject = None
+    template_name = None
+
+    def __init__(self):
+        self._templates = None
+
+    @property
+    def templates(self):
+        """
+        The compiled (text, html) templates
+        """
+        if self._templates is None:
+            self._templates = (
+                get_template(f"{self.template_name}.txt"),
+                get_template(f"{self.template_name}.html"),
+            )
+        return self._templates
+
+    def clear(self):
+        """
+        Reload the templates the next time they are used
+        """
+        self._templates = None
+
+    def get_context(self, user, **kwargs):
+        return {"user": user, **kwargs}
+
+    def render(self, user, **kwargs):
+        """
+        Render the email for the user, returning the (subject, text, html)
+        """
+        context = self.get_context(user, **kwargs)
+        text_template, html_template = self.templates
+        return (
+            self.subject,
+            text_template.render(context),
+            html_template.render(context),
+        )
+
+    def render_many(self, users, **kwargs):
+        """
+        Render the email for each of the users, yielding a tuple of
+        (user, subject, text, html) for each one
+        """
+        text_template, html_template = self.templates
+        for user in users:
+            context = self.get_context(user, **kwargs)
+            yield (
+                user,
+                self.subject,
+                text_template.render(context),
+                html_template.render(context),
+            )
+
+
+class AccountActivationEmail(AccountEmail):
+    subject = "Activate Your Account"
+    template_name = "email/account_activation_email"
+
+    def get_context(self, user, domain):
+        return {
+            "user": user,
+            "domain": domain,
+            "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+            "token": account_activation_token.make_token(user),
+        }
+
+
+class PasswordResetEmail(AccountEmail):
+    subject = "Reset your password"
+    template_name = "email/password_reset_email"
+
+    def get_context(self, user, key, domain):
+        return {
+            "user": user,
+            "email": user.email,
+            "reset_password_url": (
+                f"http://{domain}/#/reset-password?token={key}"
+            ),
+        }
+
+
+account_activation_email = AccountActivationEmail()
+password_reset_email = PasswordResetEmail()
+
+
+# Reload the templates if the template settings change (e.g. in tests)
+@receiver(setting_changed)
+def clear_email_templates(setting, **kwargs):
+    if setting == "TEMPLATES":
+        account_activation_email.clear()
+        password_reset_email.clear()
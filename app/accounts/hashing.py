@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.db import connection
+
+from app.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Password hashing executor
+# Hashing a password (on login, registration and password changes) is a few
+# hundred milliseconds of CPU by design, which holds up the worker handling the
+# request. Instead, passwords are hashed by a pool of processes (sharing the
+# cores between the web workers by default), so the hashing runs in parallel
+# without competing with the workers for the GIL. This is controlled by the
+# PASSWORD_HASHING_WORKERS setting - when it is 0, passwords are hashed in the
+# worker as normal.
+#
+# Note: the request still waits for the hash, so under WSGI the worker thread
+# is held for as long as before. The gain is that hashing no longer holds the
+# GIL, so the worker's other threads carry on. Under ASGI, async code awaits
+# the hash (see acheck_password), so the event loop carries on too. With a
+# single threaded WSGI worker there is nothing else to carry on, so the pool
+# only adds the cost of sending each password to another process.
+#
+# When a password was hashed with old settings (e.g. fewer iterations), the
+# new hash is made by the pool at the same time as checking it, and saved in
+# the background, rather than hashing it again and saving it in the request.
+
+_executor = None
+_executor_lock = threading.Lock()
+# Whether this process is one of the hashing processes
+is_hashing_process = False
+# Saves upgraded password hashes outside of the request
+_upgrade_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="password-upgrade"
+)
+
+
+def setup_worker(settings_module):
+    """
+    Configure Django in a new hashing process
+    """
+    global is_hashing_process
+
+    # Set before setup, so the apps can skip work only the web workers need
+    is_hashing_process = True
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+
+    django.setup()
+
+
+def get_executor():
+    """
+    The process pool for hashing, or None if passwords are hashed in the worker
+    """
+    global _executor
+
+    if not settings.PASSWORD_HASHING_WORKERS:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_executor(settings.PASSWORD_HASHING_WORKERS)
+        return _executor
+
+
+def create_executor(workers):
+    """
+    A new pool of hashing processes
+    """
+    # Forking a threaded server can deadlock the new process, so start the
+    # hashing processes afresh
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=setup_worker,
+        initargs=(os.environ.get("DJANGO_SETTINGS_MODULE"),),
+    )
+
+
+def shutdown_executor():
+    """
+    Stop the hashing processes (they are started again when next needed)
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def run(func, *args):
+    """
+    Run the hashing function in the pool, or in the worker if it isn't in use
+    """
+    executor = get_executor()
+    if executor is not None:
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            # A hashing process died, so start a new pool next time
+            logger.exception("Password hashing pool failed")
+            shutdown_executor()
+    return func(*args)
+
+
+async def arun(func, *args):
+    """
+    As run, but awaiting the pool so the event loop isn't held up. Without
+    the pool, the function is run in a thread rather than on the event loop.
+    """
+    executor = get_executor()
+    if executor is not None:
+        try:
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        except BrokenProcessPool:
+            logger.exception("Password hashing pool failed")
+            shutdown_executor()
+    return await sync_to_async(func, thread_sensitive=False)(*args)
+
+
+def verify_password(password, encoded):
+    """
+    Check the password against the hash, returning whether it matches and,
+    if the hash needs upgrading, the new hash
+    """
+    upgraded = None
+
+    def setter(password):
+        nonlocal upgraded
+        upgraded = hashers.make_password(password)
+
+    return hashers.check_password(password, encoded, setter), upgraded
+
+
+def make_password(password):
+    """
+    Hash the password, as django.contrib.auth.hashers.make_password
+    """
+    # Unusable passwords don't need hashing
+    if password is None:
+        return hashers.make_password(None)
+    return run(hashers.make_password, password)
+
+
+def make_passwords(passwords, executor=None):
+    """
+    Hash many passwords (e.g. when adding users in bulk), in parallel in the
+    given pool or the hashing pool. None gives an unusable password.
+    """
+    passwords = list(passwords)
+    encoded = [
+        hashers.make_password(None) if password is None else None
+        for password in passwords
+    ]
+    usable = [
+        i for i, password in enumerate(passwords) if password is not None
+    ]
+    executor = executor or get_executor()
+    hashed = None
+    if executor is not None and usable:
+        # Send the passwords in a few chunks for each process, rather than
+        # one at a time
+        chunksize = max(1, len(usable) // ((os.cpu_count() or 1) * 4))
+        try:
+            hashed = list(
+                executor.map(
+                    hashers.make_password,
+                    [passwords[i] for i in usable],
+                    chunksize=chunksize,
+                )
+            )
+        except BrokenProcessPool:
+            logger.exception("Password hashing pool failed")
+            if executor is _executor:
+                shutdown_executor()
+    if hashed is None:
+        hashed = [hashers.make_password(passwords[i]) for i in usable]
+    for i, password in zip(usable, hashed):
+        encoded[i] = password
+    return encoded
+
+
+def check_password(password, encoded):
+    """
+    As django.contrib.auth.hashers.check_password, returning whether the
+    password matches and the upgraded hash if it needs one
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, None
+    return run(verify_password, password, encoded)
+
+
+async def acheck_password(password, encoded):
+    """
+    Async version of check_password
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, None
+    return await arun(verify_password, password, encoded)
+
+
+def save_upgraded_password(user, encoded):
+    """
+    Save the user's upgraded password hash. This is done in the background
+    when the hashing pool is in use.
+    """
+    old_encoded = user.password
+    user.password = encoded
+    if get_executor() is None:
+        user.save(update_fields=["password"])
+        return
+    _upgrade_executor.submit(_save_password, user.pk, old_encoded, encoded)
+
+
+def _save_password(pk, old_encoded, encoded):
+    from accounts.models import USER_CACHE_NAMESPACE
+
+    try:
+        # Only replace the hash that was checked, in case the password has
+        # been changed since
+        updated = (
+            get_user_model()
+            .objects.filter(pk=pk, password=old_encoded)
+            .update(password=encoded)
+        )
+        # An update doesn't send post_save, so invalidate the cached user
+        if updated:
+            bump_version(USER_CACHE_NAMESPACE, pk)
+    except Exception:
+        logger.exception("Failed to save upgraded password for user %s", pk)
+    finally:
+        connection.close()
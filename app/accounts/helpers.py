@@ -1,8 +1,5 @@
-from django.template.loader import render_to_string
-from django.utils.encoding import force_bytes
-from django.utils.http import urlsafe_base64_encode
-
-from .tokens import account_activation_token
+from .email_queue import queue_email, queue_emails
+from .emails import account_activation_email, password_reset_email
 
 
 def send_account_activation_email(user, current_site):
@@ -10,20 +7,36 @@ def send_account_activation_email(user, current_site):
     Send an email to the user with a link to validate their account
     """
 
-    subject = "Activate Your Account"
-    data = {
-        "user": user,
-        "domain": current_site.domain,
-        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
-        "token": account_activation_token.make_token(user),
-    }
-    html_message = render_to_string(
-        "email/account_activation_email.html", data
+    subject, message, html_message = account_activation_email.render(
+        user, domain=current_site.domain
     )
-    message = render_to_string("email/account_activation_email.txt", data)
 
-    # Send the email
-    user.email_user(subject, message, html_message=html_message)
+    # Queue the email to be sent
+    queue_email(subject, message, [user.email], html_message=html_message)
+
+
+def send_account_activation_emails(users, current_site):
+    """
+    Send the account activation email to each of the users e.g. to re-send
+    them from the admin panel
+    """
+
+    queue_account_activation_emails(users, current_site.domain)
+
+
+def queue_account_activation_emails(users, domain):
+    """
+    Queue the account activation email for each of the users together e.g.
+    when adding users in bulk
+    """
+
+    rendered = account_activation_email.render_many(users, domain=domain)
+    queue_emails(
+        [
+            (subject, message, [user.email], html_message)
+            for user, subject, message, html_message in rendered
+        ]
+    )
 
 
 def send_password_reset_email(user, key, current_site):
@@ -31,16 +44,9 @@ def send_password_reset_email(user, key, current_site):
     Send an email to the user with a link to reset their password
     """
 
-    subject = "Reset your password"
-    data = {
-        "user": user,
-        "email": user.email,
-        "reset_password_url": (
-            f"http://{current_site}/#/reset-password?token={key}"
-        ),
-    }
-    html_message = render_to_string("email/password_reset_email.html", data)
-    message = render_to_string("email/password_reset_email.txt", data)
+    subject, message, html_message = password_reset_email.render(
+        user, key=key, domain=current_site
+    )
 
-    # Send the email
-    user.email_user(subject, message, html_message=html_message)
+    # Queue the email to be sent
+    queue_email(subject, message, [user.email], html_message=html_message)
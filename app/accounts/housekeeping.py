@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connections
+from django.utils import timezone
+from django_rest_passwordreset.models import (
+    ResetPasswordToken,
+    get_password_reset_token_expiry_time,
+)
+from knox.models import get_token_model
+
+logger = logging.getLogger(__name__)
+
+# Token housekeeping
+# Neither knox nor django_rest_passwordreset remove expired tokens by
+# themselves, so the token tables keep growing. clear_expired_tokens deletes
+# the expired tokens a batch at a time (using the indexes added in the
+# accounts migrations), so each delete only locks a few rows and doesn't hold
+# up logins. Run it regularly with the clear_expired_tokens command (e.g. from
+# cron), or set TOKEN_HOUSEKEEPING_INTERVAL to run it in the background of
+# each web worker, in which case only one worker runs it in each interval.
+
+# Cache key held by the worker clearing the tokens
+LOCK_KEY = "token_housekeeping"
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_expired_querysets():
+    """
+    The expired tokens in each of the token tables, by name
+    """
+    now = timezone.now()
+    reset_expiry = timedelta(hours=get_password_reset_token_expiry_time())
+    return {
+        "auth tokens": get_token_model().objects.filter(expiry__lt=now),
+        "password reset tokens": ResetPasswordToken.objects.filter(
+            created_at__lt=now - reset_expiry
+        ),
+    }
+
+
+def delete_in_batches(queryset, batch_size, pause=0):
+    """
+    Delete the rows a batch at a time, returning the number deleted
+    """
+    model = queryset.model
+    pk_name = model._meta.pk.name
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list(pk_name, flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        # Deleting sends post_delete for each token e.g. to uncache it
+        count, _ = model.objects.filter(pk__in=pks).delete()
+        deleted += count
+        if len(pks) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def clear_expired_tokens(batch_size=None, pause=0):
+    """
+    Delete the expired tokens, returning the number deleted from each table
+    """
+    batch_size = batch_size or settings.TOKEN_HOUSEKEEPING_BATCH_SIZE
+    return {
+        name: delete_in_batches(queryset, batch_size, pause)
+        for name, queryset in get_expired_querysets().items()
+    }
+
+
+def get_table_stats():
+    """
+    The size of each of the token tables: the number of rows and how many
+    have expired, and on PostgreSQL the dead rows waiting to be vacuumed,
+    the size on disk in bytes and when it was last vacuumed
+    """
+    stats = {}
+    for name, expired in get_expired_querysets().items():
+        model = expired.model
+        table_stats = {
+            "rows": model.objects.count(),
+            "expired": expired.count(),
+            "dead_rows": None,
+            "size": None,
+            "last_vacuum": None,
+        }
+        connection = connections[model.objects.db]
+        if connection.vendor == "postgresql":
+            table_stats.update(get_postgres_stats(connection, model))
+        stats[name] = table_stats
+    return stats
+
+
+def get_postgres_stats(connection, model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT n_dead_tup, pg_total_relation_size(relid), "
+            "GREATEST(last_vacuum, last_autovacuum) "
+            "FROM pg_stat_user_tables WHERE relname = %s",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return {}
+    return dict(zip(("dead_rows", "size", "last_vacuum"), row))
+
+
+def run_housekeeping():
+    """
+    Clear the expired tokens, unless another worker is already doing so
+    """
+    interval = settings.TOKEN_HOUSEKEEPING_INTERVAL
+    # Held until the next run is due, so each interval only has one
+    if not cache.add(LOCK_KEY, True, interval):
+        return None
+    deleted = clear_expired_tokens()
+    if any(deleted.values()):
+        logger.info(
+            "Deleted expired tokens: %s",
+            ", ".join(f"{count} {name}" for name, count in deleted.items()),
+        )
+    return deleted
+
+
+def run_periodically():
+    interval = settings.TOKEN_HOUSEKEEPING_INTERVAL
+    while True:
+        # Spread the workers out, so they don't all check at once
+        time.sleep(interval * random.uniform(0.5, 1.5))
+        try:
+            run_housekeeping()
+        except Exception:
+            logger.exception("Unable to clear expired tokens")
+        finally:
+            # This thread's connections aren't closed at the end of a request
+            connections.close_all()
+
+
+def start_runner(**kwargs):
+    """
+    Start clearing the tokens in the background of this worker, once it
+    starts handling requests
+    """
+    global _runner
+
+    request_started.disconnect(start_runner)
+    with _runner_lock:
+        if _runner is None:
+            _runner = threading.Thread(
+                target=run_periodically,
+                name="token-housekeeping",
+                daemon=True,
+            )
+            _runner.start()
+
+
+def setup_runner():
+    """
+    Clear the tokens in the background of each web worker, if
+    TOKEN_HOUSEKEEPING_INTERVAL is set
+    """
+    if settings.TOKEN_HOUSEKEEPING_INTERVAL:
+        # Only processes handling requests (rather than e.g. management
+        # commands or the hashing processes) run the housekeeping
+        request_started.connect(start_runner)
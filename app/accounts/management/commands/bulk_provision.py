@@ -0,0 +1,117 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import hashing
+from accounts.models import CustomUser
+from accounts.provisioning import BATCH_SIZE, FIELDS, read_csv, read_ndjson
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+# Other extensions used for newline delimited JSON
+EXTENSIONS = {"jsonl": "ndjson", "json": "ndjson"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Add users (and their profiles) in bulk from a CSV or newline "
+        f"delimited JSON file with the fields: {', '.join(FIELDS)}. "
+        "Users that can't be added are skipped and listed at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="File of the users to add, or - to read from stdin",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            default=None,
+            help="Format of the file (by default, from its extension)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of users to add in each batch",
+        )
+        parser.add_argument(
+            "--active",
+            action="store_true",
+            help="Create the accounts already activated",
+        )
+        parser.add_argument(
+            "--send-activation-email",
+            metavar="DOMAIN",
+            default=None,
+            help=(
+                "Queue the account activation email to each new user, with "
+                "links to the site at DOMAIN (e.g. www.domain.co.uk)"
+            ),
+        )
+        parser.add_argument(
+            "--hashing-workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes to hash the passwords with",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"]
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lstrip(".").lower()
+            file_format = EXTENSIONS.get(extension, extension)
+        if file_format not in READERS:
+            raise CommandError(
+                "Unable to tell the format of the file, use --format"
+            )
+        if options["active"] and options["send_activation_email"]:
+            raise CommandError(
+                "Active accounts don't need an activation email"
+            )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        executor = None
+        if options["hashing_workers"] > 0:
+            executor = hashing.create_executor(options["hashing_workers"])
+        try:
+            if path == "-":
+                result = self.provision(
+                    READERS[file_format](sys.stdin), executor, options
+                )
+            else:
+                # utf-8-sig, as spreadsheets often start CSV files with a BOM
+                with open(path, encoding="utf-8-sig", newline="") as file:
+                    result = self.provision(
+                        READERS[file_format](file), executor, options
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        for number, email, errors in result.skipped:
+            self.stderr.write(
+                f"Row {number} ({email or 'no email'}): {' '.join(errors)}"
+            )
+        self.stdout.write(
+            f"Added {result.created} users in {result.elapsed:.1f}s "
+            f"({result.rate:.0f} users/s), skipped {len(result.skipped)}"
+        )
+
+    def provision(self, rows, executor, options):
+        def progress(result):
+            self.stdout.write(
+                f"Added {result.created} users ({result.rate:.0f} users/s)"
+            )
+
+        return CustomUser.objects.bulk_provision(
+            rows,
+            batch_size=options["batch_size"],
+            is_active=options["active"],
+            activation_domain=options["send_activation_email"],
+            hashing_executor=executor,
+            progress=progress if options["verbosity"] > 0 else None,
+        )
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.housekeeping import clear_expired_tokens, get_table_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the expired authentication and password reset tokens, a "
+        "batch at a time. Use --stats to also report the size of the token "
+        "tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of tokens to delete in each batch",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches, to spread out the load",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Report the size of the token tables after clearing them",
+        )
+        parser.add_argument(
+            "--stats-only",
+            action="store_true",
+            help="Only report the size of the token tables",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if not options["stats_only"]:
+            deleted = clear_expired_tokens(
+                batch_size=options["batch_size"], pause=options["pause"]
+            )
+            for name, count in deleted.items():
+                self.stdout.write(f"Deleted {count} expired {name}")
+
+        if options["stats"] or options["stats_only"]:
+            for name, stats in get_table_stats().items():
+                self.stdout.write(self.format_stats(name, stats))
+
+    def format_stats(self, name, stats):
+        line = f"{name}: {stats['rows']} rows, {stats['expired']} expired"
+        if stats["dead_rows"] is not None:
+            line += f", {stats['dead_rows']} dead rows"
+        if stats["size"] is not None:
+            line += f", {stats['size'] / 1024 / 1024:.1f} MB"
+        if stats["last_vacuum"] is not None:
+            line += f", last vacuumed {stats['last_vacuum']:%Y-%m-%d %H:%M}"
+        return line
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.email_queue import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the emails waiting in the queue. Use --loop to keep running "
+        "and send new emails as they are queued."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of emails to send in each batch",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep checking the queue for new emails",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between checks when using --loop",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = send_queued_emails(
+                    batch_size=options["batch_size"]
+                )
+            except Exception as e:
+                # e.g. the mail server couldn't be reached
+                if not options["loop"]:
+                    raise
+                self.stderr.write(f"Unable to send emails: {e}")
+            else:
+                if sent or failed or not options["loop"]:
+                    self.stdout.write(f"Sent {sent} emails ({failed} failed)")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
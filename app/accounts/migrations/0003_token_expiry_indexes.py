@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+# Indexes for finding expired tokens (see accounts/housekeeping.py). The token
+# models belong to knox and django_rest_passwordreset, so the indexes are
+# added here rather than to the models.
+INDEXES = [
+    ("knox", "AuthToken", "expiry", "knox_authtoken_expiry_idx"),
+    (
+        "django_rest_passwordreset",
+        "ResetPasswordToken",
+        "created_at",
+        "reset_token_created_at_idx",
+    ),
+]
+
+
+def add_indexes(apps, schema_editor):
+    # As app.operations.PortableAddIndexConcurrently, built concurrently on
+    # Postgres so that the (large) token tables aren't locked against writes
+    concurrently = schema_editor.connection.vendor == "postgresql"
+    for app_label, model_name, field, name in INDEXES:
+        model = apps.get_model(app_label, model_name)
+        index = models.Index(fields=[field], name=name)
+        if concurrently:
+            schema_editor.execute(
+                index.create_sql(model, schema_editor, concurrently=True)
+            )
+        else:
+            schema_editor.add_index(model, index)
+
+
+def remove_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == "postgresql"
+    for app_label, model_name, field, name in INDEXES:
+        model = apps.get_model(app_label, model_name)
+        index = models.Index(fields=[field], name=name)
+        if concurrently:
+            schema_editor.execute(
+                index.remove_sql(model, schema_editor, concurrently=True)
+            )
+        else:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    # The indexes are built concurrently so that the table isn't locked
+    # against writes, which can't be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0002_queuedemail"),
+        ("knox", "0009_extend_authtoken_field"),
+        (
+            "django_rest_passwordreset",
+            "0004_alter_resetpasswordtoken_user_agent",
+        ),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_queuedemail_sending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="queuedemail",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from app.operations import PortableAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # The index is built concurrently so that the table isn't locked against
+    # writes, which can't be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0005_queuedemail_claimed_at"),
+    ]
+
+    operations = [
+        PortableAddIndexConcurrently(
+            model_name="customuser",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="accounts_user_email_lower",
+            ),
+        ),
+    ]
@@ -1,13 +1,24 @@
-import re
-
-from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from knox.models import AuthToken
+
+from accounts import hashing
+from accounts.auth import token_cache_key
+from accounts.domains import get_email_domain_policy
+from app.versions import bump_version_on_commit
+
+# Namespace for the per-user version stamp used to invalidate the cached user
+# and profile (see accounts.user_cache)
+USER_CACHE_NAMESPACE = "user"
 
 
 class CustomUserManager(BaseUserManager):
@@ -16,28 +27,52 @@ class CustomUserManager(BaseUserManager):
     for authentication instead of usernames.
     """
 
-    def create_user(self, email, password, **extra_fields):
+    def create_user(self, email, password, profile=None, **extra_fields):
         """
-        Create and save a User with the given email and password.
+        Create and save a User with the given email and password, and their
+        profile with any details given in `profile`.
         """
         if not email:
             raise ValueError(_("The Email must be set"))
-        # Restrict who can sign up
-        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
-            if not re.match(
-                r"^[a-zA-Z0-9\._:$!%-']+@[a-zA-Z0-9\.-]*(?:"
-                + "|".join(settings.ALLOWED_EMAIL_DOMAINS)
-                + r")\.[a-zA-Z\\.]{2,5}$",
-                email,
-            ):
-                raise ValidationError({"email": _("Invalid Email format")})
+        # Restrict who can sign up (see accounts.domains)
+        if not get_email_domain_policy().is_allowed(email):
+            raise ValidationError({"email": _("Invalid Email format")})
 
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
-        user.save()
+        # The profile is saved along with the user (see update_user_profile)
+        user.profile = Profile(**(profile or {}))
+        with transaction.atomic():
+            user.save()
         return user
 
+    def bulk_provision(
+        self,
+        rows,
+        batch_size=None,
+        is_active=False,
+        activation_domain=None,
+        hashing_executor=None,
+        progress=None,
+    ):
+        """
+        Create many users and their profiles from `rows` of their details, in
+        batches, skipping any that can't be added (see accounts.provisioning).
+        No signals are sent for the new users.
+        """
+        from accounts.provisioning import BATCH_SIZE, provision_users
+
+        return provision_users(
+            self,
+            rows,
+            batch_size=batch_size or BATCH_SIZE,
+            is_active=is_active,
+            activation_domain=activation_domain,
+            hashing_executor=hashing_executor,
+            progress=progress,
+        )
+
     def create_superuser(self, email, password, **extra_fields):
         """
         Create and save a SuperUser with the given email and password.
@@ -74,9 +109,34 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
+    # Passwords are hashed by the hashing pool (see accounts.hashing)
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        valid, upgraded = hashing.check_password(raw_password, self.password)
+        if valid and upgraded:
+            hashing.save_upgraded_password(self, upgraded)
+        return valid
+
+    async def acheck_password(self, raw_password):
+        valid, upgraded = await hashing.acheck_password(
+            raw_password, self.password
+        )
+        if valid and upgraded:
+            await sync_to_async(hashing.save_upgraded_password)(self, upgraded)
+        return valid
+
     class Meta:
         ordering = ["email"]
         verbose_name = "User"
+        indexes = [
+            # Finding the existing users when adding users in bulk, as the
+            # email addresses are compared ignoring case (see
+            # accounts.provisioning)
+            models.Index(Lower("email"), name="accounts_user_email_lower"),
+        ]
 
 
 class Profile(models.Model):
@@ -88,14 +148,134 @@ class Profile(models.Model):
     def __str__(self):
         return str(self.user)
 
+    # The saved values are kept, so that the profile is only saved along with
+    # the user when it has changed
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = instance.get_field_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._saved_values = self.get_field_values()
+
+    def get_field_values(self):
+        deferred = self.get_deferred_fields()
+        return {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname not in deferred
+        }
+
+    def get_changed_fields(self):
+        """
+        The names of the fields changed since the profile was loaded or saved
+        """
+        saved_values = getattr(self, "_saved_values", None)
+        if saved_values is None:
+            return None
+        return [
+            attname
+            for attname, value in self.get_field_values().items()
+            if attname not in saved_values or saved_values[attname] != value
+        ]
+
     class Meta:
         ordering = ["user__id"]
 
 
+class QueuedEmail(models.Model):
+    """
+    An email waiting to be sent by the send_queued_emails command, so that
+    requests don't have to wait for the mail server
+    """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    recipients = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    # Number of times sending has been tried, and when to try again
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    # When the email was last marked as sending, so that it can be requeued
+    # if the sender stops before finishing
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.subject} ({', '.join(self.recipients)})"
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        indexes = [
+            # Finding the emails that are ready to send
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="accounts_queued_email_next",
+            ),
+        ]
+
+
 # This function is special - it basically ensures that a related profile is
-# created whenever a new user is created.
+# created whenever a new user is created. Afterwards, the profile is only
+# saved with the user when it has been loaded and changed.
 @receiver(post_save, sender=CustomUser)
 def update_user_profile(sender, instance, created, **kwargs):
+    profile = CustomUser.profile.related.get_cached_value(instance, None)
     if created:
-        Profile.objects.create(user=instance)
-    instance.profile.save()
+        # The profile may have been set before the user was saved, with the
+        # details to create it with
+        if profile is None:
+            profile = Profile()
+        profile.user = instance
+        profile.save()
+    elif profile is not None:
+        changed = profile.get_changed_fields()
+        if changed is None:
+            profile.save()
+        elif changed:
+            profile.save(update_fields=changed)
+
+
+# Whenever a user or their profile is changed or removed, bump the user's
+# version so that their cached details aren't used again (see
+# accounts.user_cache). As with the examples, bulk queryset operations don't
+# send these signals, so need to call bump_version themselves.
+# The version is bumped once the change is committed, so that a concurrent
+# request can't cache the old user against the new version.
+@receiver([post_save, post_delete], sender=CustomUser)
+def bump_user_version(sender, instance, using, **kwargs):
+    bump_version_on_commit(USER_CACHE_NAMESPACE, instance.pk, using=using)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def bump_profile_user_version(sender, instance, using, **kwargs):
+    if instance.user_id is not None:
+        bump_version_on_commit(
+            USER_CACHE_NAMESPACE, instance.user_id, using=using
+        )
+
+
+# Remove a token from the authentication cache as soon as it is deleted e.g.
+# when the user logs out, so it can't continue to be used
+@receiver(post_delete, sender=AuthToken)
+def uncache_auth_token(sender, instance, **kwargs):
+    cache.delete(token_cache_key(instance.digest))
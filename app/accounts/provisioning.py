@@ -0,0 +1,268 @@
+import csv
+import json
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.translation import gettext as _
+
+from accounts import hashing
+from accounts.domains import get_email_domain_policy
+from accounts.helpers import queue_account_activation_emails
+from accounts.models import Profile
+from app.validators import password_policy
+
+# Bulk user provisioning
+# Adding users one at a time with create_user hashes the password, inserts the
+# user, sends post_save and then inserts the profile, for every user. When
+# adding many users at once (e.g. onboarding a company), bulk_provision works
+# through them in batches instead: the email domains and passwords of the
+# whole batch are checked together, the passwords are hashed in parallel by
+# the hashing pool, and the users and then their profiles are inserted with
+# one query each. No signals are sent for the new users.
+#
+# Each user is a dict of their details, with the fields below. Users without
+# a password get an unusable one (e.g. so they set it with a password reset).
+# Users that can't be added (e.g. their email address is taken) are skipped
+# and reported, rather than stopping the rest.
+
+BATCH_SIZE = 1000
+USER_FIELDS = ("email", "password", "first_name", "last_name")
+PROFILE_FIELDS = ("title", "job_title")
+FIELDS = USER_FIELDS + PROFILE_FIELDS
+
+
+class ProvisionResult:
+    """
+    The users added by bulk_provision, and those skipped
+    """
+
+    def __init__(self):
+        self.created = 0
+        # (row number, email, error messages) for each user that was skipped
+        self.skipped = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        """
+        Users added per second
+        """
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+
+def read_csv(file):
+    """
+    The users in a CSV file with a header row of their fields
+    """
+    for row in csv.DictReader(file):
+        # Empty columns are left out, rather than set to ""
+        yield {field: value for field, value in row.items() if value}
+
+
+def read_ndjson(file):
+    """
+    The users in a newline delimited JSON file, with an object on each line
+    """
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as an invalid row
+            yield None
+
+
+def provision_users(
+    manager,
+    rows,
+    batch_size=BATCH_SIZE,
+    is_active=False,
+    activation_domain=None,
+    hashing_executor=None,
+    progress=None,
+):
+    """
+    Create a user and profile for each of the rows, in batches of
+    `batch_size`. When `activation_domain` is given, the account activation
+    email is queued for each new user. `progress` is called with the result
+    after each batch.
+    """
+    result = ProvisionResult()
+    # The (lower case) email addresses seen so far, to find duplicates
+    seen = set()
+    batch = []
+    for number, row in enumerate(rows, start=1):
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            provision_batch(
+                manager,
+                batch,
+                seen,
+                result,
+                is_active,
+                activation_domain,
+                hashing_executor,
+            )
+            batch = []
+            if progress is not None:
+                progress(result)
+    if batch:
+        provision_batch(
+            manager,
+            batch,
+            seen,
+            result,
+            is_active,
+            activation_domain,
+            hashing_executor,
+        )
+        if progress is not None:
+            progress(result)
+    return result
+
+
+def provision_batch(
+    manager,
+    batch,
+    seen,
+    result,
+    is_active,
+    activation_domain,
+    hashing_executor,
+):
+    """
+    Check and create a single batch of users
+    """
+    skipped = []
+    rows = []
+    for number, row in batch:
+        error = check_row(manager, row, seen)
+        if error is not None:
+            email = row.get("email") if isinstance(row, dict) else None
+            skipped.append((number, email, [error]))
+            continue
+        email = manager.normalize_email(row["email"].strip())
+        seen.add(email.lower())
+        rows.append((number, row, email))
+
+    # Restrict who can be added, as create_user does
+    allowed = get_email_domain_policy().check_many(
+        [email for number, row, email in rows]
+    )
+    # The email addresses are compared ignoring case, using the index on
+    # the lower case email address
+    existing = set(
+        manager.annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=[email.lower() for number, row, email in rows])
+        .values_list("email_lower", flat=True)
+    )
+    users = []
+    for (number, row, email), is_allowed in zip(rows, allowed):
+        if not is_allowed:
+            skipped.append((number, email, [_("Invalid Email format")]))
+        elif email.lower() in existing:
+            skipped.append(
+                (number, email, [_("A user with that email already exists.")])
+            )
+        else:
+            user = manager.model(
+                email=email,
+                first_name=row.get("first_name") or "",
+                last_name=row.get("last_name") or "",
+                is_active=is_active,
+            )
+            users.append((number, row, user))
+
+    # Check all of the passwords together
+    with_password = [
+        (row["password"], user)
+        for number, row, user in users
+        if row.get("password")
+    ]
+    errors = iter(password_policy.validate_many(with_password))
+    valid = []
+    for number, row, user in users:
+        error = next(errors) if row.get("password") else None
+        if error is not None:
+            skipped.append((number, user.email, error.messages))
+        else:
+            valid.append((row, user))
+
+    passwords = hashing.make_passwords(
+        [row.get("password") or None for row, user in valid], hashing_executor
+    )
+    for (row, user), password in zip(valid, passwords):
+        user.password = password
+
+    if valid:
+        with transaction.atomic():
+            created = manager.bulk_create([user for row, user in valid])
+            profiles = Profile.objects.bulk_create(
+                [
+                    Profile(
+                        user=user,
+                        **{field: row.get(field) for field in PROFILE_FIELDS},
+                    )
+                    for (row, unsaved), user in zip(valid, created)
+                ]
+            )
+            for user, profile in zip(created, profiles):
+                user.profile = profile
+
+            if activation_domain is not None:
+                queue_account_activation_emails(created, activation_domain)
+        result.created += len(created)
+    result.skipped.extend(sorted(skipped, key=lambda skip: skip[0]))
+    result.elapsed = time.perf_counter() - result.started
+
+
+def check_row(manager, row, seen):
+    """
+    The error that prevents the row being added, or None
+    """
+    if not isinstance(row, dict):
+        return _("Each user must be an object of their details.")
+    # The key csv.DictReader gives any values beyond the header
+    if None in row:
+        return _("The row has more values than there are fields.")
+    unknown = set(row) - set(FIELDS)
+    if unknown:
+        return _("Unknown fields: %(fields)s.") % {
+            "fields": ", ".join(sorted(unknown))
+        }
+    email = row.get("email")
+    if not isinstance(email, str) or not email.strip():
+        return _("The Email must be set")
+    for field in FIELDS:
+        value = row.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return _("Each field must be text.")
+        if field == "password":
+            continue
+        max_length = get_max_length(manager, field)
+        if len(value) > max_length:
+            return _(
+                "Ensure %(field)s has no more than %(max_length)d characters."
+            ) % {"field": field, "max_length": max_length}
+    try:
+        validate_email(email.strip())
+    except ValidationError as error:
+        return error.messages[0]
+    if manager.normalize_email(email.strip()).lower() in seen:
+        return _("The email address is repeated.")
+    return None
+
+
+def get_max_length(manager, field):
+    """
+    The most characters allowed for the user or profile field
+    """
+    model = Profile if field in PROFILE_FIELDS else manager.model
+    return model._meta.get_field(field).max_length
@@ -1,13 +1,21 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
-from django.contrib.auth.password_validation import validate_password
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils.http import urlsafe_base64_decode
 from rest_framework import serializers
 
 from .helpers import send_account_activation_email
 from .tokens import account_activation_token
-from accounts.models import CustomUser
+from accounts.models import USER_CACHE_NAMESPACE, CustomUser, Profile
+from app.validators import password_policy
+from app.versions import bump_version
+
+
+def activation_resend_key(pk):
+    return f"activation_email_sent:{pk}"
 
 
 # User Serializer
@@ -19,6 +27,24 @@ class UserSerializer(serializers.ModelSerializer):
 
 # Register Serializer
 class RegisterSerializer(serializers.ModelSerializer):
+    # Profile details, saved when the user is created
+    title = serializers.CharField(
+        source="profile.title",
+        max_length=10,
+        required=False,
+        allow_null=True,
+        allow_blank=True,
+        write_only=True,
+    )
+    job_title = serializers.CharField(
+        source="profile.job_title",
+        max_length=100,
+        required=False,
+        allow_null=True,
+        allow_blank=True,
+        write_only=True,
+    )
+
     class Meta:
         model = CustomUser
         fields = (
@@ -27,6 +53,8 @@ class RegisterSerializer(serializers.ModelSerializer):
             "password",
             "first_name",
             "last_name",
+            "title",
+            "job_title",
         )
         extra_kwargs = {"password": {"write_only": True}}
 
@@ -49,7 +77,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             errors = dict()
             try:
                 # validate the password and catch the exception
-                validate_password(password=password, user=user)
+                password_policy.validate(password, user)
 
             # the exception raised here is different than
             # serializers.ValidationError
@@ -65,13 +93,14 @@ class RegisterSerializer(serializers.ModelSerializer):
 
         # Deactivate the account until it's been confirmed
         validated_data["is_active"] = False
-        user = CustomUser.objects.create_user(**validated_data)
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(**validated_data)
 
-        # Send the account activation email
-        current_site = get_current_site(
-            self.context["request"]
-        )  # e.g. www.domain.co.uk
-        send_account_activation_email(user, current_site)
+            # Send the account activation email
+            current_site = get_current_site(
+                self.context["request"]
+            )  # e.g. www.domain.co.uk
+            send_account_activation_email(user, current_site)
 
         return user
 
@@ -82,17 +111,24 @@ class ActivateAccountSerializer(serializers.Serializer):
 
     def validate(self, data):
 
-        # Tries to find the user based on the information encoded in the url
-        # used including the user ID and activation code
+        # The user ID encoded in the url
         try:
-            uid = urlsafe_base64_decode(data.get("id"))
-            user = CustomUser.objects.get(pk=uid)
-        except (
-            TypeError,
-            ValueError,
-            OverflowError,
-            CustomUser.DoesNotExist,
+            uid = int(urlsafe_base64_decode(data.get("id")))
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(
+                "Unable to find this user. Please try again."
+            )
+
+        # Bad or expired tokens are rejected before looking up the user
+        if not account_activation_token.check_token_for_pk(
+            uid, data.get("token")
         ):
+            raise serializers.ValidationError("Invalid activation token.")
+
+        # Tries to find the user, along with their profile to activate
+        try:
+            user = CustomUser.objects.select_related("profile").get(pk=uid)
+        except (OverflowError, CustomUser.DoesNotExist):
             raise serializers.ValidationError(
                 "Unable to find this user. Please try again."
             )
@@ -101,42 +137,100 @@ class ActivateAccountSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "This email has already been activated."
             )
-        # If it could identify the user, but the token isn't valid
-        if not account_activation_token.check_token(user, data.get("token")):
+        # The account was activated before, and has since been deactivated
+        if user.profile.email_confirmed:
             raise serializers.ValidationError("Invalid activation token.")
 
         return user
 
+    def activate(self):
+        """
+        Activate the validated user's account, returning the user
+        """
+        user = self.validated_data
+        with transaction.atomic():
+            # Only the first request to activate the account does so, so the
+            # token can only be used once
+            activated = CustomUser.objects.filter(
+                pk=user.pk, is_active=False
+            ).update(is_active=True)
+            if not activated:
+                raise serializers.ValidationError(
+                    "This email has already been activated."
+                )
+            Profile.objects.filter(user_id=user.pk).update(
+                email_confirmed=True
+            )
+        # Updates don't send post_save, so invalidate the cached user
+        bump_version(USER_CACHE_NAMESPACE, user.pk)
+
+        user.is_active = True
+        user.profile.email_confirmed = True
+        return user
+
 
 # Login Serializer
 class LoginSerializer(serializers.Serializer):
+    """
+    Checks the login details, returning the user.
+
+    The details are checked with authenticate(), so the configured
+    AUTHENTICATION_BACKENDS are used and user_login_failed is sent on
+    failure. With accounts.backends.EmailBackend, the user is looked up once
+    (case insensitively), and each outcome only needs that one query. The
+    activation email is only re-sent to inactive users once per
+    ACCOUNT_ACTIVATION_RESEND_INTERVAL.
+    """
+
     email = serializers.EmailField()
     password = serializers.CharField()
 
     def validate(self, data):
-        user = authenticate(**data)
-        if user and user.is_active:
+        request = self.context["request"]
+        user = authenticate(
+            request, email=data["email"], password=data["password"]
+        )
+        if user is not None:
             return user
 
-        # If not authenticated, check if they are not yet activated
-        try:
-            user = CustomUser.objects.get(email=data["email"])
+        # Find out why, using the user the backend looked up if it can
+        if hasattr(request, "login_user"):
+            user = request.login_user
+        else:
+            user = CustomUser.objects.filter(
+                email__iexact=data["email"]
+            ).first()
+
         # If we can't find the user
-        except Exception:
+        if user is None:
             raise serializers.ValidationError("Username not recognised.")
 
-        if user and not user.is_active:
+        if not user.is_active:
             # Send the account activation email
-            current_site = get_current_site(
-                self.context["request"]
-            ).domain  # e.g. www.domain.co.uk
-            send_account_activation_email(user, current_site)
+            self.resend_activation_email(user)
 
             # Raise an error
             raise serializers.ValidationError(
                 "This email has not been validated. Please check your "
                 "emails for the validation link."
             )
+
         raise serializers.ValidationError(
             "Password incorrect. Please try again."
         )
+
+    def resend_activation_email(self, user):
+        """
+        Send the account activation email, unless it was sent recently
+        """
+        # The key is only added if it isn't already in the cache
+        if not cache.add(
+            activation_resend_key(user.pk),
+            True,
+            settings.ACCOUNT_ACTIVATION_RESEND_INTERVAL,
+        ):
+            return
+        current_site = get_current_site(
+            self.context["request"]
+        )  # e.g. www.domain.co.uk
+        send_account_activation_email(user, current_site)
@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase, override_settings
+
+from accounts.domains import EmailDomainPolicy, get_email_domain_policy
+
+
+class EmailDomainPolicyTestCase(SimpleTestCase):
+    def test_allowed(self):
+        """Addresses at the allowed domains are allowed"""
+        emails = [
+            "test@mydomain.com",
+            "test@mydomain.co.uk",
+            "first.last@mail.mydomain.co.uk",
+            "o'brien@mydomain.com",
+            "test@second.domain.org",
+        ]
+        policy = EmailDomainPolicy(["mydomain", "second.domain"])
+        for email in emails:
+            self.assertTrue(policy.is_allowed(email), email)
+
+    def test_not_allowed(self):
+        """Other addresses aren't allowed"""
+        emails = [
+            "test@otherdomain.com",
+            "test@mydomain",
+            "test@mydomain.c",
+            "test@mydomain.company",
+            "test@mydomain.com.evil.com",
+            "test@my_domain.mydomain.com",
+            "test+tag@mydomain.com",
+            "test@test@mydomain.com",
+            "@mydomain.com",
+            "test",
+            # The domains are matched exactly, not as patterns
+            "test@secondxdomain.org",
+        ]
+        policy = EmailDomainPolicy(["mydomain", "second.domain"])
+        for email in emails:
+            self.assertFalse(policy.is_allowed(email), email)
+
+    def test_empty(self):
+        """Any address is allowed when there are no allowed domains"""
+        policy = EmailDomainPolicy([])
+        self.assertTrue(policy.is_allowed("test@anydomain.com"))
+
+    def test_check_many(self):
+        """Many addresses can be checked at once"""
+        policy = EmailDomainPolicy([f"domain{i}" for i in range(5000)])
+        self.assertEqual(
+            policy.check_many(
+                ["a@domain0.com", "b@domain4999.com", "c@domain5000.com"]
+            ),
+            [True, True, False],
+        )
+
+    def test_setting_changed(self):
+        """The policy is compiled again when the setting changes"""
+        with override_settings(ALLOWED_EMAIL_DOMAINS=["firstdomain"]):
+            policy = get_email_domain_policy()
+            self.assertTrue(policy.is_allowed("test@firstdomain.com"))
+            with override_settings(ALLOWED_EMAIL_DOMAINS=["newdomain"]):
+                policy = get_email_domain_policy()
+                self.assertTrue(policy.is_allowed("test@newdomain.com"))
+                self.assertFalse(policy.is_allowed("test@firstdomain.com"))
@@ -0,0 +1,228 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import QueuedEmail
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """
+    Email backend where the mail server rejects every email
+    """
+
+    def send_messages(self, email_messages):
+        raise SMTPException("Mail server unavailable")
+
+
+FAILING_EMAIL_BACKEND = "accounts.tests.tests_email_queue.FailingEmailBackend"
+
+
+class StatusEmailBackend(BaseEmailBackend):
+    """
+    Email backend recording the status saved for the queued emails at the
+    point each one is sent
+    """
+
+    statuses = []
+
+    def send_messages(self, email_messages):
+        self.statuses.append(
+            list(QueuedEmail.objects.values_list("status", "attempts"))
+        )
+        return len(email_messages)
+
+
+STATUS_EMAIL_BACKEND = "accounts.tests.tests_email_queue.StatusEmailBackend"
+
+
+@override_settings(EMAIL_USE_QUEUE=True)
+class EmailQueueTestCase(TestCase):
+    def setUp(self):
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+        self.client = APIClient()
+        self.example = {
+            "email": f"test@{self.allowed_domain}.co.uk",
+            "password": "123ABCcde456",
+            "first_name": "Test",
+            "last_name": "ABC",
+        }
+
+    def register(self):
+        response = self.client.post(
+            "/api/v1/auth/register",
+            self.example,
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def send_queue(self, **options):
+        call_command("send_queued_emails", stdout=StringIO(), **options)
+
+    def test_emails_queued(self):
+        """
+        Registering queues the activation email, rather than sending it, and
+        it is sent by the management command
+        """
+        self.register()
+
+        # Nothing is sent during the request
+        self.assertEqual(len(mail.outbox), 0)
+        queued_email = QueuedEmail.objects.get()
+        self.assertEqual(queued_email.status, QueuedEmail.PENDING)
+        self.assertEqual(queued_email.recipients, [self.example["email"]])
+
+        # Send the queue
+        self.send_queue()
+
+        # Check email sent, including the html version
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Activate Your Account")
+        self.assertEqual(mail.outbox[0].to, [self.example["email"]])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+
+        queued_email.refresh_from_db()
+        self.assertEqual(queued_email.status, QueuedEmail.SENT)
+        self.assertEqual(queued_email.attempts, 1)
+
+        # It isn't sent again
+        self.send_queue()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_sent_bodies_cleared(self):
+        """
+        The bodies of sent emails, with their activation links, are cleared
+        """
+        self.register()
+        queued_email = QueuedEmail.objects.get()
+        self.assertIn("/activate-account/", queued_email.body)
+        self.assertIn("/activate-account/", queued_email.html_body)
+
+        self.send_queue()
+
+        # The email was sent with the link, which is no longer stored
+        self.assertIn("/activate-account/", mail.outbox[0].body)
+        queued_email.refresh_from_db()
+        self.assertEqual(queued_email.status, QueuedEmail.SENT)
+        self.assertEqual(queued_email.body, "")
+        self.assertIsNone(queued_email.html_body)
+
+    def test_batches(self):
+        """
+        All of the queued emails are sent, over multiple batches
+        """
+        for i in range(5):
+            self.example["email"] = f"test{i}@{self.allowed_domain}.co.uk"
+            self.register()
+
+        self.send_queue(batch_size=2)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            QueuedEmail.objects.filter(status=QueuedEmail.SENT).count(), 5
+        )
+
+    @override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_retry(self):
+        """
+        Emails that fail to send are retried later, until they run out of
+        attempts
+        """
+        self.register()
+
+        with self.settings(EMAIL_BACKEND=FAILING_EMAIL_BACKEND):
+            self.send_queue()
+
+            # It's scheduled to try again later
+            queued_email = QueuedEmail.objects.get()
+            self.assertEqual(queued_email.status, QueuedEmail.PENDING)
+            self.assertEqual(queued_email.attempts, 1)
+            self.assertEqual(
+                queued_email.last_error, "Mail server unavailable"
+            )
+            self.assertGreater(queued_email.next_attempt_at, timezone.now())
+
+            # So isn't tried again straight away
+            self.send_queue()
+            queued_email.refresh_from_db()
+            self.assertEqual(queued_email.attempts, 1)
+
+            # Once it's due, it's tried again and fails for good
+            QueuedEmail.objects.update(next_attempt_at=timezone.now())
+            self.send_queue()
+            queued_email.refresh_from_db()
+            self.assertEqual(queued_email.status, QueuedEmail.FAILED)
+            self.assertEqual(queued_email.attempts, 2)
+
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_BACKEND=STATUS_EMAIL_BACKEND)
+    def test_claimed_before_sending(self):
+        """
+        Emails are marked as being sent before they are sent, so they aren't
+        sent again if the sender stops before saving that they were sent
+        """
+        self.register()
+        StatusEmailBackend.statuses = []
+
+        self.send_queue()
+
+        self.assertEqual(
+            StatusEmailBackend.statuses, [[(QueuedEmail.SENDING, 1)]]
+        )
+        queued_email = QueuedEmail.objects.get()
+        self.assertEqual(queued_email.status, QueuedEmail.SENT)
+
+        # An email left as sending isn't sent again
+        QueuedEmail.objects.update(status=QueuedEmail.SENDING)
+        self.send_queue()
+        self.assertEqual(len(StatusEmailBackend.statuses), 1)
+
+    @override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_stale_emails_requeued(self):
+        """
+        Emails left as sending (e.g. because the sender was stopped) are put
+        back in the queue once the claim has timed out
+        """
+        self.register()
+        self.send_queue()
+        self.assertEqual(len(mail.outbox), 1)
+
+        # The sender stopped after claiming the email
+        QueuedEmail.objects.update(status=QueuedEmail.SENDING)
+
+        # It isn't sent again while the claim is recent
+        self.send_queue()
+        self.assertEqual(len(mail.outbox), 1)
+
+        # But is once the claim has timed out
+        timeout = timedelta(seconds=settings.EMAIL_QUEUE_CLAIM_TIMEOUT)
+        QueuedEmail.objects.update(
+            claimed_at=timezone.now() - timeout - timedelta(seconds=1)
+        )
+        self.send_queue()
+        self.assertEqual(len(mail.outbox), 2)
+        queued_email = QueuedEmail.objects.get()
+        self.assertEqual(queued_email.status, QueuedEmail.SENT)
+        self.assertEqual(queued_email.attempts, 2)
+
+        # Without any attempts left, it's marked as failed instead
+        QueuedEmail.objects.update(
+            status=QueuedEmail.SENDING,
+            claimed_at=timezone.now() - timeout - timedelta(seconds=1),
+        )
+        self.send_queue()
+        self.assertEqual(len(mail.outbox), 2)
+        queued_email.refresh_from_db()
+        self.assertEqual(queued_email.status, QueuedEmail.FAILED)
+        self.assertEqual(queued_email.last_error, "Sending did not finish")
@@ -0,0 +1,100 @@
+import datetime
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core import mail
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from accounts.emails import account_activation_email, password_reset_email
+from accounts.models import CustomUser
+from accounts.tokens import account_activation_token
+
+
+class AccountEmailTestCase(TestCase):
+    def setUp(self):
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+
+        self.users = [
+            CustomUser.objects.create_user(
+                email=f"test{i}@{self.allowed_domain}.co.uk",
+                password="123ABC456cde",
+                first_name="Test",
+                last_name=str(i),
+                is_active=False,
+            )
+            for i in range(3)
+        ]
+
+    def test_render_matches_templates(self):
+        """
+        The precompiled templates give the same result as rendering them
+        """
+        user = self.users[0]
+        context = {
+            "user": user,
+            "email": user.email,
+            "reset_password_url": (
+                "http://example.com/#/reset-password?token=abc"
+            ),
+        }
+        self.assertEqual(
+            password_reset_email.render(user, key="abc", domain="example.com"),
+            (
+                "Reset your password",
+                render_to_string("email/password_reset_email.txt", context),
+                render_to_string("email/password_reset_email.html", context),
+            ),
+        )
+
+    def test_render_many(self):
+        """
+        Rendering a batch of emails gives one for each user, with their own
+        activation link
+        """
+        # Fix the time used in the tokens, so they're the same each time
+        now = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        with patch.object(account_activation_token, "_now", return_value=now):
+            rendered = list(
+                account_activation_email.render_many(
+                    self.users, domain="example.com"
+                )
+            )
+            self.assertEqual([r[0] for r in rendered], self.users)
+            for user, subject, message, html_message in rendered:
+                self.assertEqual(
+                    (subject, message, html_message),
+                    account_activation_email.render(
+                        user, domain="example.com"
+                    ),
+                )
+                self.assertIn(f"Test {user.last_name}", message)
+
+    def test_admin_resend(self):
+        """
+        Inactive users can be sent their activation email again from the
+        admin panel
+        """
+        admin = CustomUser.objects.create_superuser(
+            email=f"admin@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+        )
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            "/admin/accounts/customuser/",
+            {
+                "action": "resend_activation_email",
+                "_selected_action": [u.pk for u in self.users] + [admin.pk],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+
+        # Only the inactive users are sent the email
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            sorted(u.email for u in self.users),
+        )
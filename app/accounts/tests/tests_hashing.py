@@ -0,0 +1,153 @@
+import os
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import (
+    aauthenticate,
+    authenticate,
+    hashers,
+    password_validation,
+)
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, identify_hasher
+from django.core.signals import request_started
+from django.test import TestCase, override_settings
+
+from accounts import hashing
+from accounts.housekeeping import start_runner
+from accounts.models import CustomUser
+
+
+def get_process_setup():
+    """
+    Run in a hashing process, to check what was set up when it started
+    """
+    validators = password_validation.get_default_password_validators
+    return (
+        hashing.is_hashing_process,
+        settings.TOKEN_HOUSEKEEPING_INTERVAL,
+        # Whether the housekeeping runner was set up
+        request_started.disconnect(start_runner),
+        # Whether the password validators were loaded
+        validators.cache_info().currsize,
+    )
+
+
+class PasswordHashingTestCase(TestCase):
+    def setUp(self):
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+
+        self.email = f"test@{self.allowed_domain}.co.uk"
+        self.user = CustomUser.objects.create_user(
+            email=self.email,
+            password="123ABC456cde",
+            first_name="Test",
+            last_name="123",
+            is_active=True,
+        )
+
+    def make_outdated(self):
+        """
+        Hash the user's password with fewer iterations than the current ones
+        """
+        hasher = PBKDF2PasswordHasher()
+        encoded = hasher.encode("123ABC456cde", hasher.salt(), iterations=1000)
+        CustomUser.objects.filter(pk=self.user.pk).update(password=encoded)
+        return encoded
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_pool(self):
+        """Passwords are hashed and checked by the hashing processes"""
+        self.addCleanup(hashing.shutdown_executor)
+
+        encoded = hashing.make_password("123ABC456cde")
+        self.assertEqual(
+            hashing.check_password("123ABC456cde", encoded), (True, None)
+        )
+        self.assertEqual(
+            hashing.check_password("wrong", encoded), (False, None)
+        )
+
+        # The upgraded hash is made at the same time as checking it
+        valid, upgraded = hashing.check_password(
+            "123ABC456cde", self.make_outdated()
+        )
+        self.assertTrue(valid)
+        self.assertEqual(
+            identify_hasher(upgraded).safe_summary(upgraded)["iterations"],
+            PBKDF2PasswordHasher.iterations,
+        )
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_make_passwords(self):
+        """Many passwords are hashed together by the hashing processes"""
+        self.addCleanup(hashing.shutdown_executor)
+
+        encoded = hashing.make_passwords(["123ABC456cde", None, "abc"])
+        self.assertEqual(
+            hashing.check_password("123ABC456cde", encoded[0]), (True, None)
+        )
+        self.assertFalse(hashers.is_password_usable(encoded[1]))
+        self.assertEqual(
+            hashing.check_password("abc", encoded[2]), (True, None)
+        )
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_process_setup(self):
+        """
+        The hashing processes don't set up the web workers' background work
+        """
+        self.addCleanup(hashing.shutdown_executor)
+
+        with patch.dict(os.environ, {"TOKEN_HOUSEKEEPING_INTERVAL": "60"}):
+            result = hashing.get_executor().submit(get_process_setup).result()
+        self.assertEqual(result, (True, 60, False, 0))
+        self.assertFalse(hashing.is_hashing_process)
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    async def test_async_pool(self):
+        """
+        Async checks await the hashing processes, rather than blocking on them
+        """
+        self.addCleanup(hashing.shutdown_executor)
+
+        with patch.object(
+            hashing, "run", side_effect=AssertionError("Blocked")
+        ), patch(
+            "accounts.hashing.asyncio.wrap_future",
+            wraps=hashing.asyncio.wrap_future,
+        ) as wrap_future:
+            self.assertTrue(await self.user.acheck_password("123ABC456cde"))
+            self.assertFalse(await self.user.acheck_password("wrong"))
+        self.assertEqual(wrap_future.call_count, 2)
+
+    async def test_async_login_upgrades_password(self):
+        """Outdated hashes are upgraded when the user logs in asynchronously"""
+        encoded = await sync_to_async(self.make_outdated)()
+
+        user = await aauthenticate(email=self.email, password="123ABC456cde")
+        self.assertEqual(user, self.user)
+        self.assertNotEqual(user.password, encoded)
+
+        await self.user.arefresh_from_db()
+        self.assertEqual(self.user.password, user.password)
+        self.assertIsNone(
+            await aauthenticate(email=self.email, password="wrong")
+        )
+
+    def test_login_upgrades_password(self):
+        """Outdated hashes are upgraded when the user logs in"""
+        encoded = self.make_outdated()
+
+        user = authenticate(email=self.email, password="123ABC456cde")
+        self.assertEqual(user, self.user)
+        self.assertNotEqual(user.password, encoded)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, user.password)
+        self.assertTrue(self.user.check_password("123ABC456cde"))
+
+        self.assertIsNone(authenticate(email=self.email, password="wrong"))
@@ -0,0 +1,107 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_rest_passwordreset.models import ResetPasswordToken
+from knox.models import AuthToken
+
+from accounts import housekeeping
+from accounts.auth import token_cache_key
+from accounts.models import CustomUser
+
+
+class TokenHousekeepingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+
+        self.user = CustomUser.objects.create_user(
+            email=f"test@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+            is_active=True,
+        )
+        now = timezone.now()
+        self.current = [
+            AuthToken.objects.create(self.user)[0],
+            # Tokens without an expiry don't expire
+            AuthToken.objects.create(self.user, expiry=None)[0],
+        ]
+        self.expired = [
+            AuthToken.objects.create(self.user, expiry=-timedelta(hours=1))[0]
+            for _ in range(5)
+        ]
+        for token in self.expired:
+            cache.set(token_cache_key(token.digest), {}, None)
+
+        self.reset_token = ResetPasswordToken.objects.create(user=self.user)
+        expired_reset_token = ResetPasswordToken.objects.create(user=self.user)
+        ResetPasswordToken.objects.filter(pk=expired_reset_token.pk).update(
+            created_at=now - timedelta(days=2)
+        )
+
+    def test_clear_expired_tokens(self):
+        """
+        Only the expired tokens are deleted, a batch at a time
+        """
+        # Each batch of auth tokens is selected, loaded (to send
+        # post_delete) and then deleted, and the one batch of reset tokens is
+        # selected and deleted
+        with self.assertNumQueries(3 * 3 + 2):
+            deleted = housekeeping.clear_expired_tokens(batch_size=2)
+        self.assertEqual(
+            deleted, {"auth tokens": 5, "password reset tokens": 1}
+        )
+
+        self.assertCountEqual(AuthToken.objects.all(), self.current)
+        self.assertEqual(
+            list(ResetPasswordToken.objects.all()), [self.reset_token]
+        )
+        # The deleted tokens are no longer cached
+        for token in self.expired:
+            self.assertIsNone(cache.get(token_cache_key(token.digest)))
+
+        self.assertEqual(
+            housekeeping.clear_expired_tokens(),
+            {"auth tokens": 0, "password reset tokens": 0},
+        )
+
+    def test_command(self):
+        """
+        The command clears the tokens, and reports the table sizes
+        """
+        stdout = StringIO()
+        call_command("clear_expired_tokens", "--stats", stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn("Deleted 5 expired auth tokens", output)
+        self.assertIn("Deleted 1 expired password reset tokens", output)
+        self.assertIn("auth tokens: 2 rows, 0 expired", output)
+        self.assertIn("password reset tokens: 1 rows, 0 expired", output)
+
+        stdout = StringIO()
+        call_command("clear_expired_tokens", "--stats-only", stdout=stdout)
+        self.assertNotIn("Deleted", stdout.getvalue())
+
+    @override_settings(TOKEN_HOUSEKEEPING_INTERVAL=60)
+    def test_one_worker_per_interval(self):
+        """
+        Only one worker clears the tokens in each interval
+        """
+        self.assertEqual(
+            housekeeping.run_housekeeping(),
+            {"auth tokens": 5, "password reset tokens": 1},
+        )
+        self.assertIsNone(housekeeping.run_housekeeping())
+
+        cache.delete(housekeeping.LOCK_KEY)
+        self.assertEqual(
+            housekeeping.run_housekeeping(),
+            {"auth tokens": 0, "password reset tokens": 0},
+        )
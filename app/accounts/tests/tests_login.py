@@ -1,13 +1,23 @@
 from django.conf import settings
-from django.test import TestCase
+from django.contrib.auth.signals import user_login_failed
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ErrorDetail
 from rest_framework.test import APIClient
 
 from accounts.models import CustomUser
+from app.throttling import get_store
 
 
+@override_settings(THROTTLE_STORE="app.throttling.MemoryStore")
 class LoginTestCase(TestCase):
     def setUp(self):
+        get_store().clear()
+        cache.clear()
+
         if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
             self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
         else:
@@ -115,3 +125,112 @@ class LoginTestCase(TestCase):
 
         # Clear the credentials
         self.client.credentials()
+
+    def login(self, email, password):
+        """
+        Log in, returning the response and the queries on the users table
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                "/api/v1/auth/login",
+                {"email": email, "password": password},
+                format="json",
+            )
+        queries = [
+            q["sql"]
+            for q in context.captured_queries
+            if CustomUser._meta.db_table in q["sql"]
+        ]
+        return response, queries
+
+    def test_login_case_insensitive(self):
+        """
+        The email address isn't case sensitive
+        """
+        response, queries = self.login(self.email.upper(), self.password)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["id"], self.user.id)
+        self.assertEqual(len(queries), 1)
+
+    def test_login_queries(self):
+        """
+        The user is only looked up once, whatever the outcome
+        """
+        for email, password in [
+            (self.email, "InvalidPassword"),
+            (f"invalid@{self.allowed_domain}.co.uk", self.password),
+        ]:
+            response, queries = self.login(email, password)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(len(queries), 1)
+
+    def test_login_inactive(self):
+        """
+        Inactive users are sent the activation email again, but no more than
+        once per interval
+        """
+        self.user.is_active = False
+        self.user.save()
+
+        for _ in range(3):
+            response, queries = self.login(self.email, self.password)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                str(response.data["non_field_errors"][0]),
+                "This email has not been validated. Please check your "
+                "emails for the validation link.",
+            )
+            self.assertEqual(len(queries), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.email])
+
+        # Once the interval has passed, it is sent again
+        cache.clear()
+        self.login(self.email, self.password)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_login_failed_signal(self):
+        """
+        Failed logins send user_login_failed, without the password
+        """
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+
+        response, _queries = self.login(self.email, self.password)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(failures, [])
+
+        self.login(self.email, "InvalidPassword")
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]["email"], self.email)
+        self.assertNotEqual(failures[0]["password"], "InvalidPassword")
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=["django.contrib.auth.backends.ModelBackend"]
+    )
+    def test_login_other_backend(self):
+        """
+        Logging in works with other authentication backends, looking up the
+        user again to say why it failed
+        """
+        response, _queries = self.login(self.email, self.password)
+        self.assertEqual(response.status_code, 200)
+
+        response, _queries = self.login(self.email, "InvalidPassword")
+        self.assertEqual(
+            str(response.data["non_field_errors"][0]),
+            "Password incorrect. Please try again.",
+        )
+
+        response, _queries = self.login(
+            f"invalid@{self.allowed_domain}.co.uk", self.password
+        )
+        self.assertEqual(
+            str(response.data["non_field_errors"][0]),
+            "Username not recognised.",
+        )
@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from accounts.models import CustomUser, Profile
 
@@ -64,3 +66,33 @@ class UserTestCase(TestCase):
                     last_name="123",
                 )
             )
+
+    def test_profile_only_saved_when_changed(self):
+        """The profile is only saved with the user when it has changed"""
+
+        user = CustomUser.objects.get(
+            email=f"test@{self.allowed_domain}.co.uk"
+        )
+        profile_table = Profile._meta.db_table
+
+        # The profile isn't loaded, so isn't saved
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        self.assertEqual(len(context.captured_queries), 1)
+
+        # Nor when it is loaded but unchanged
+        user.profile
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        self.assertEqual(len(context.captured_queries), 1)
+
+        # Only the changed fields are saved
+        user.profile.job_title = "Tester"
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        queries = [q["sql"] for q in context.captured_queries]
+        self.assertEqual(len(queries), 2)
+        self.assertIn(profile_table, queries[1])
+        self.assertIn("job_title", queries[1])
+        self.assertNotIn("email_confirmed", queries[1])
+        self.assertEqual(Profile.objects.get(user=user).job_title, "Tester")
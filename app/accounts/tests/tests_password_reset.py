@@ -1,14 +1,17 @@
 from django.conf import settings
 from django.core import mail
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.exceptions import ErrorDetail
 from rest_framework.test import APIClient
 
 from accounts.models import CustomUser
+from app.throttling import get_store
 
 
+@override_settings(THROTTLE_STORE="app.throttling.MemoryStore")
 class PasswordResetCase(TestCase):
     def setUp(self):
+        get_store().clear()
         if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
             self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
         else:
@@ -0,0 +1,207 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser, Profile, QueuedEmail
+from accounts.tokens import account_activation_token
+
+
+# Hash passwords quickly, as many users are added
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+)
+class BulkProvisionTestCase(TestCase):
+    def setUp(self):
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+        CustomUser.objects.create_user(
+            email=f"existing@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+        )
+
+    def email(self, name):
+        return f"{name}@{self.allowed_domain}.co.uk"
+
+    def write_file(self, extension, content):
+        file, path = tempfile.mkstemp(suffix=extension)
+        with os.fdopen(file, "w") as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def call(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "bulk_provision",
+            *args,
+            "--hashing-workers=0",
+            stdout=stdout,
+            stderr=stderr,
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_bulk_provision(self):
+        """
+        Valid users are added with their profiles, and the rest are skipped
+        """
+        rows = [
+            {
+                "email": self.email("one"),
+                "password": "123ABCcde456",
+                "first_name": "One",
+                "title": "Dr",
+                "job_title": "Tester",
+            },
+            # No password
+            {"email": self.email("two"), "last_name": "Two"},
+            # Repeated
+            {"email": self.email("ONE"), "password": "123ABCcde456"},
+            # Already exists
+            {"email": self.email("Existing"), "password": "123ABCcde456"},
+            # Password too weak
+            {"email": self.email("three"), "password": "password"},
+            {"email": "not an email"},
+            {"email": self.email("four"), "role": "admin"},
+            {"email": self.email("five"), "title": "Too long a title"},
+            None,
+        ]
+        # Checking the existing users, then adding the users and profiles
+        # (in a savepoint, as the test is in a transaction)
+        with self.assertNumQueries(5):
+            result = CustomUser.objects.bulk_provision(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            [number for number, email, errors in result.skipped],
+            [3, 4, 5, 6, 7, 8, 9],
+        )
+        self.assertEqual(
+            result.skipped[1][2], ["A user with that email already exists."]
+        )
+        self.assertIn("This password is too common.", result.skipped[2][2])
+
+        user = CustomUser.objects.select_related("profile").get(
+            email=self.email("one")
+        )
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.first_name, "One")
+        self.assertTrue(user.check_password("123ABCcde456"))
+        self.assertEqual(user.profile.title, "Dr")
+        self.assertEqual(user.profile.job_title, "Tester")
+
+        user = CustomUser.objects.get(email=self.email("two"))
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(Profile.objects.count(), 3)
+
+    @override_settings(ALLOWED_EMAIL_DOMAINS=["mydomain"])
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_existing_emails_plan(self):
+        """
+        Finding the existing users (ignoring case) uses an index
+        """
+        rows = [{"email": self.email(name)} for name in ("Existing", "new")]
+        with CaptureQueriesContext(connection) as context:
+            CustomUser.objects.bulk_provision(rows)
+        table = CustomUser._meta.db_table
+        sql = next(
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and f'FROM "{table}"' in query["sql"]
+            and "LOWER" in query["sql"]
+        )
+        with connection.cursor() as cursor:
+            # There are too few users for the index to be chosen otherwise
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("accounts_user_email_lower", plan)
+
+    def test_restricted_domains(self):
+        """Users outside of the allowed domains are skipped"""
+        result = CustomUser.objects.bulk_provision(
+            [{"email": "test@mydomain.com"}, {"email": "test@other.com"}]
+        )
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            result.skipped, [(2, "test@other.com", ["Invalid Email format"])]
+        )
+
+    def test_batches(self):
+        """The users are checked and added a batch at a time"""
+        rows = [{"email": self.email(f"user{i}")} for i in range(5)]
+        # The same queries for each batch
+        with self.assertNumQueries(15):
+            result = CustomUser.objects.bulk_provision(rows, batch_size=2)
+        self.assertEqual(result.created, 5)
+        self.assertEqual(
+            Profile.objects.filter(user__email__startswith="user").count(), 5
+        )
+
+    def test_command_csv(self):
+        """Users are added from a CSV file"""
+        path = self.write_file(
+            ".csv",
+            "email,password,first_name,last_name,title,job_title\n"
+            f"{self.email('one')},123ABCcde456,One,Test,,Tester\n"
+            f"{self.email('existing')},123ABCcde456,Existing,Test,,\n"
+            f"{self.email('extra')},123ABCcde456,Extra,Test,,,Extra\n",
+        )
+        stdout, stderr = self.call(path, "--active")
+
+        self.assertIn("Added 1 users", stdout)
+        self.assertIn("skipped 2", stdout)
+        self.assertIn(f"Row 2 ({self.email('existing')})", stderr)
+        self.assertIn(
+            f"Row 3 ({self.email('extra')}): The row has more values than "
+            "there are fields.",
+            stderr,
+        )
+        self.assertFalse(
+            CustomUser.objects.filter(email=self.email("extra")).exists()
+        )
+
+        user = CustomUser.objects.get(email=self.email("one"))
+        self.assertTrue(user.is_active)
+        self.assertIsNone(user.profile.title)
+        self.assertEqual(user.profile.job_title, "Tester")
+
+    @override_settings(EMAIL_USE_QUEUE=True)
+    def test_command_activation_email(self):
+        """
+        The activation email is queued for each user, added from a newline
+        delimited JSON file
+        """
+        path = self.write_file(
+            ".ndjson",
+            "\n".join(
+                [
+                    json.dumps({"email": self.email("one")}),
+                    "",
+                    json.dumps({"email": self.email("two")}),
+                    "{not json",
+                ]
+            ),
+        )
+        stdout, stderr = self.call(
+            path, "--send-activation-email", "www.mydomain.co.uk"
+        )
+        self.assertIn("Added 2 users", stdout)
+        self.assertIn("Row 3 (no email)", stderr)
+
+        self.assertEqual(QueuedEmail.objects.count(), 2)
+        for queued in QueuedEmail.objects.all():
+            user = CustomUser.objects.get(email=queued.recipients[0])
+            link = queued.body.split("http://www.mydomain.co.uk/")[1]
+            token = link.split()[0].split("/")[-1]
+            self.assertTrue(account_activation_token.check_token(user, token))
@@ -1,14 +1,26 @@
+import re
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
 from django.conf import settings
 from django.core import mail
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
 from rest_framework.exceptions import ErrorDetail
 from rest_framework.test import APIClient
 
-from accounts.models import CustomUser
+from accounts.models import CustomUser, Profile
+from accounts.tokens import account_activation_token
+from app.throttling import get_store
 
 
+@override_settings(THROTTLE_STORE="app.throttling.MemoryStore")
 class RegistrationTestCase(TestCase):
     def setUp(self):
+        get_store().clear()
         if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
             self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
         else:
@@ -178,6 +190,8 @@ class RegistrationTestCase(TestCase):
             },
         ]
         for password in test_passwords:
+            # Each attempt counts towards the registration limit
+            get_store().clear()
             self.example["password"] = password["password"]
             response = self.client.post(
                 "/api/v1/auth/register",
@@ -277,3 +291,125 @@ class RegistrationTestCase(TestCase):
                 ]
             },
         )
+
+    def capture_queries(self, method, url, data):
+        """
+        Send the request, returning the response and the queries on the user
+        and profile tables, as (statement, table) pairs
+        """
+        tables = [CustomUser._meta.db_table, Profile._meta.db_table]
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format="json")
+        queries = []
+        for query in context.captured_queries:
+            match = re.match(
+                r"(UPDATE|INSERT INTO|SELECT .*? FROM)\s+[\"`]?(\w+)",
+                query["sql"],
+            )
+            if match and match.group(2) in tables:
+                queries.append((query["sql"].split()[0], match.group(2)))
+        return response, queries
+
+    def test_register_queries(self):
+        """
+        Registering adds the user and their profile with one insert each,
+        and activating only updates what has changed
+        """
+        self.example["email"] = f"testqueries@{self.allowed_domain}.co.uk"
+        user_table = CustomUser._meta.db_table
+        profile_table = Profile._meta.db_table
+
+        response, queries = self.capture_queries(
+            "post", "/api/v1/auth/register", self.example
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [query for query in queries if query[0] != "SELECT"],
+            [("INSERT", user_table), ("INSERT", profile_table)],
+        )
+        self.assertNotIn(("SELECT", profile_table), queries)
+
+        user = CustomUser.objects.get(email=self.example["email"])
+        for field in ["title", "job_title"]:
+            self.assertEqual(getattr(user.profile, field), self.example[field])
+
+        # Activate the user
+        body = mail.outbox[0].body.split("\n")
+        pid, token = (
+            "".join([line for line in body if line[:4] == "http"])
+            .split("#/activate-account/")[1]
+            .split("/")
+        )
+        response, queries = self.capture_queries(
+            "post",
+            "/api/v1/auth/activate",
+            {"id": pid.strip(), "token": token.strip()},
+        )
+        self.assertEqual(response.status_code, 200)
+        # The user and profile are loaded together, and each updated once
+        # (the user only if they haven't been activated already)
+        self.assertEqual(
+            queries,
+            [
+                ("SELECT", user_table),
+                ("UPDATE", user_table),
+                ("UPDATE", profile_table),
+            ],
+        )
+
+    def test_activation_token_checked_first(self):
+        """
+        Bad and expired activation tokens are rejected without looking up
+        the user, and tokens can't be used once the account is deactivated
+        """
+        user = CustomUser.objects.create_user(
+            email=f"testtoken@{self.allowed_domain}.co.uk",
+            password="123ABCcde456",
+            is_active=False,
+        )
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = account_activation_token.make_token(user)
+        other_uid = urlsafe_base64_encode(force_bytes(user.pk + 1))
+        expired = datetime.now() + timedelta(
+            seconds=settings.ACCOUNT_ACTIVATION_TIMEOUT + 1
+        )
+
+        for data in [
+            {"id": uid, "token": "abc-123"},
+            {"id": uid, "token": token[:-1]},
+            # The token is for another user
+            {"id": other_uid, "token": token},
+        ]:
+            response, queries = self.capture_queries(
+                "post", "/api/v1/auth/activate", data
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(queries, [])
+
+        with patch.object(account_activation_token, "_now", lambda: expired):
+            response, queries = self.capture_queries(
+                "post", "/api/v1/auth/activate", {"id": uid, "token": token}
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(queries, [])
+
+        # Activate, and then deactivate the account
+        response = self.client.post(
+            "/api/v1/auth/activate",
+            {"id": uid, "token": token},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        user.is_active = False
+        user.save()
+
+        response = self.client.post(
+            "/api/v1/auth/activate",
+            {"id": uid, "token": token},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["non_field_errors"], ["Invalid activation token."]
+        )
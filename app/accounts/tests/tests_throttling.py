@@ -0,0 +1,267 @@
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from app.throttling import (
+    MemoryStore,
+    RedisStore,
+    SlidingWindowThrottle,
+    get_redis_client,
+    get_store,
+    stores,
+)
+
+
+def fix_time(seconds):
+    """
+    Fix the time used by the throttle
+    """
+    return patch.object(
+        SlidingWindowThrottle, "timer", staticmethod(lambda: seconds)
+    )
+
+
+class FakeRedis:
+    """
+    Redis client keeping the values in a dict, counting the round trips
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, key, value, ex=None, nx=False):
+        self.commands.append(("set", key, value, nx))
+
+    def incr(self, key):
+        self.commands.append(("incr", key, 1))
+
+    def decr(self, key):
+        self.commands.append(("incr", key, -1))
+
+    def mget(self, keys):
+        self.commands.append(("mget", keys))
+
+    def execute(self):
+        self.client.round_trips += 1
+        values = self.client.values
+        results = []
+        for command, *args in self.commands:
+            if command == "set":
+                key, value, nx = args
+                if not (nx and key in values):
+                    values[key] = value
+                results.append(True)
+            elif command == "incr":
+                key, amount = args
+                values[key] = values.get(key, 0) + amount
+                results.append(values[key])
+            else:
+                results.append([values.get(key) for key in args[0]])
+        return results
+
+
+# Hash passwords quickly, as every attempt is checked
+@override_settings(
+    THROTTLE_STORE="app.throttling.MemoryStore",
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class ThrottlingTestCase(TestCase):
+    def setUp(self):
+        get_store().clear()
+        cache.clear()
+
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+        self.email = f"test@{self.allowed_domain}.co.uk"
+        CustomUser.objects.create_user(
+            email=self.email,
+            password="123ABC456cde",
+            first_name="Test",
+            last_name="123",
+            is_active=True,
+        )
+        self.client = APIClient()
+        # Fix the time, half way through the window
+        timer = fix_time(90.0)
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def login(self, email=None, ip="127.0.0.1"):
+        return self.client.post(
+            "/api/v1/auth/login",
+            {"email": email or self.email, "password": "InvalidPassword"},
+            format="json",
+            REMOTE_ADDR=ip,
+        )
+
+    def test_email_limit(self):
+        """
+        Attempts for an email address are limited, from any IP address
+        """
+        for i in range(10):
+            self.assertEqual(self.login(ip=f"10.0.0.{i}").status_code, 400)
+
+        response = self.login(ip="10.0.1.1")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+        # The email address isn't case sensitive
+        self.assertEqual(self.login(self.email.upper()).status_code, 429)
+
+        # Other email addresses aren't affected
+        email = f"other@{self.allowed_domain}.co.uk"
+        self.assertEqual(self.login(email).status_code, 400)
+
+    def test_ip_limit(self):
+        """
+        Attempts from an IP address are limited, for any email address
+        """
+        for i in range(30):
+            email = f"test{i}@{self.allowed_domain}.co.uk"
+            self.assertEqual(self.login(email).status_code, 400)
+
+        email = f"test30@{self.allowed_domain}.co.uk"
+        self.assertEqual(self.login(email).status_code, 429)
+        self.assertEqual(self.login(email, ip="10.0.0.1").status_code, 400)
+
+    def test_sliding_window(self):
+        """
+        Attempts in the previous window count for the part that overlaps
+        """
+        for _ in range(10):
+            self.login()
+
+        # Most of the previous window still overlaps, leaving room for one
+        with fix_time(125.0):
+            self.assertEqual(self.login().status_code, 400)
+            self.assertEqual(self.login().status_code, 429)
+        # Then half of it, leaving room for four more
+        with fix_time(150.0):
+            for _ in range(4):
+                self.assertEqual(self.login().status_code, 400)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_password_reset_limit(self):
+        """
+        Password reset requests are limited
+        """
+        for _ in range(5):
+            response = self.client.post(
+                "/api/v1/auth/password-reset/",
+                {"email": self.email},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(
+            "/api/v1/auth/password-reset/",
+            {"email": self.email},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(THROTTLE_STORE="app.throttling.RedisStore")
+    def test_redis_store(self):
+        """
+        With Redis, each attempt is counted and checked in one round trip,
+        and attempts which aren't allowed aren't counted
+        """
+        redis = FakeRedis()
+        stores.pop("app.throttling.RedisStore", None)
+        with patch("app.throttling.get_redis_client", return_value=redis):
+            for _ in range(10):
+                self.assertEqual(self.login().status_code, 400)
+            self.assertEqual(redis.round_trips, 10)
+
+            # Taking back the rejected attempts is a second trip
+            for _ in range(3):
+                self.assertEqual(self.login().status_code, 429)
+            self.assertEqual(redis.round_trips, 16)
+
+            # Another email address from the same IP address is allowed, as
+            # the rejected attempts weren't counted
+            email = f"other@{self.allowed_domain}.co.uk"
+            for _ in range(10):
+                self.assertEqual(self.login(email).status_code, 400)
+
+    @skipUnless(isinstance(cache, RedisCache), "Requires Redis")
+    @override_settings(THROTTLE_STORE="app.throttling.RedisStore")
+    def test_redis_server(self):
+        """
+        Each attempt takes one round trip to a real Redis server
+        """
+        client = cache._cache.get_client(write=True)
+        pipeline = client.pipeline(transaction=False)
+        with patch.object(
+            type(client), "pipeline", return_value=pipeline
+        ), patch.object(
+            pipeline, "execute", wraps=pipeline.execute
+        ) as execute:
+            self.assertEqual(self.login().status_code, 400)
+        self.assertEqual(execute.call_count, 1)
+
+    def test_redis_required(self):
+        """
+        The Redis store can't be used without the Redis client
+        """
+        self.assertIsNone(get_redis_client())
+        redis_cache = Mock(spec=RedisCache)
+        redis_cache._cache = object()
+        with patch("app.throttling.cache", redis_cache):
+            self.assertIsNone(get_redis_client())
+        with self.assertRaises(ImproperlyConfigured):
+            RedisStore()
+
+    def test_memory_store_size(self):
+        """
+        Expired counts are removed, and the number of counts is limited
+        """
+        store = MemoryStore()
+        store.max_size = 3
+        with patch("app.throttling.time.monotonic", return_value=0):
+            store.hit({"a": 10, "b": 100}, [])
+            store.hit({"c": 10, "a": 10}, [])
+            store.hit({"d": 10}, [])
+        # The least recently counted is removed
+        self.assertEqual(list(store.counts), ["c", "a", "d"])
+
+        with patch("app.throttling.time.monotonic", return_value=30):
+            counts = store.hit({"e": 100}, ["a"])
+        # Not yet purged, but expired so not counted
+        self.assertEqual(counts, {"e": 1})
+        self.assertEqual(list(store.counts), ["a", "d", "e"])
+
+        with patch("app.throttling.time.monotonic", return_value=60):
+            store.hit({"f": 100}, [])
+        # The expired counts are purged
+        self.assertEqual(list(store.counts), ["e", "f"])
+
+    def test_hashed_keys(self):
+        """
+        The IP and email addresses sent by the client aren't used in the
+        keys as they are
+        """
+        self.login(ip="10.0.0.1")
+        keys = " ".join(get_store().counts)
+        self.assertEqual(len(get_store().counts), 2)
+        self.assertNotIn("10.0.0.1", keys)
+        self.assertNotIn(self.email, keys)
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+
+
+class TokenCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+
+        self.user = CustomUser.objects.create_user(
+            email=f"test@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+            first_name="Test",
+            last_name="123",
+            is_active=True,
+        )
+        self.auth_token, self.token = AuthToken.objects.create(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+    def get_user(self):
+        """
+        Call the user API, returning the response and the queries run
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/v1/auth/user")
+        return response, [q["sql"] for q in context.captured_queries]
+
+    def test_cached_token(self):
+        """
+        Once validated, the token isn't looked up in the database again
+        """
+        response, queries = self.get_user()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any("knox_authtoken" in q for q in queries))
+
+        # Only the user is loaded on the next request
+        response, queries = self.get_user()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("knox_authtoken", queries[0])
+
+        # Then the cached user is used (see tests_user_cache)
+        for _ in range(3):
+            response, queries = self.get_user()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(queries, [])
+
+    def test_refresh_coalesced(self):
+        """
+        The token expiry is written at most once per refresh interval
+        """
+        # Make the token close to expiring
+        expiry = self.auth_token.expiry - timedelta(minutes=30)
+        AuthToken.objects.filter(pk=self.auth_token.pk).update(expiry=expiry)
+
+        # The first request refreshes the expiry
+        self.assertEqual(self.get_user()[0].status_code, 200)
+        self.auth_token.refresh_from_db()
+        self.assertGreater(self.auth_token.expiry, expiry)
+
+        # Following requests within the interval don't write it again
+        for _ in range(3):
+            response, queries = self.get_user()
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(q.startswith("UPDATE") for q in queries))
+
+        # Once the interval has passed, it is refreshed again
+        cache.delete(f"auth_token_refresh:{self.auth_token.digest}")
+        response, queries = self.get_user()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(q.startswith("UPDATE") for q in queries))
+
+    def test_logout_invalidates(self):
+        """
+        Logging out stops the cached token being used straight away
+        """
+        self.assertEqual(self.get_user()[0].status_code, 200)
+        self.assertEqual(self.get_user()[0].status_code, 200)
+
+        response = self.client.post("/api/v1/auth/logout", {}, format="json")
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self.get_user()[0].status_code, 401)
+
+    def test_inactive_user(self):
+        """
+        Deactivating the user stops the cached token being used
+        """
+        self.assertEqual(self.get_user()[0].status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.get_user()[0].status_code, 401)
+
+    @override_settings(ROOT_URLCONF="api.tests.urls_async")
+    async def test_async(self):
+        """
+        The token is validated and cached when authenticating asynchronously
+        """
+        headers = {"Authorization": "Token " + self.token}
+        for _ in range(2):
+            response = await self.async_client.get(
+                "/api/v1/auth/user", headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["email"], self.user.email)
+
+        await self.user.auth_token_set.all().adelete()
+        response = await self.async_client.get(
+            "/api/v1/auth/user", headers=headers
+        )
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(
+            "/api/v1/auth/user", headers={"Authorization": "Token invalid"}
+        )
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+
+from accounts import user_cache
+from accounts.models import USER_CACHE_NAMESPACE, CustomUser, Profile
+from accounts.user_cache import clear_local, get_cached_user
+from app.versions import get_version
+
+
+class UserCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local()
+
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+
+        self.user = CustomUser.objects.create_user(
+            email=f"test@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+            first_name="Test",
+            last_name="123",
+            is_active=True,
+            profile={"title": "Dr", "job_title": "Tester"},
+        )
+        self.auth_token, self.token = AuthToken.objects.create(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+    def get_user(self):
+        """
+        Call the user API, returning the response and the number of queries
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/v1/auth/user")
+        return response, len(context.captured_queries)
+
+    def test_cached_user(self):
+        """
+        The user and their profile are loaded once, and then from the cache
+        """
+        with self.assertNumQueries(1):
+            user = get_cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            cached = get_cached_user(self.user.pk)
+            self.assertEqual(cached, self.user)
+            self.assertEqual(cached.first_name, "Test")
+            self.assertEqual(cached.profile.title, "Dr")
+            self.assertEqual(cached.profile.user, cached)
+        # Each request gets its own instance
+        self.assertIsNot(cached, user)
+        self.assertIsNot(cached, get_cached_user(self.user.pk))
+
+        # Other processes share the values through the cache
+        clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(self.user.pk).last_name, "123")
+
+        # Saving the unchanged user doesn't save the profile
+        with self.assertNumQueries(1):
+            cached.save()
+
+    def test_user_changed(self):
+        """
+        Changing the user or their profile stops the cached user being used
+        """
+        get_cached_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.get(pk=self.user.pk).save()
+        with self.assertNumQueries(1):
+            get_cached_user(self.user.pk)
+
+        profile = Profile.objects.get(user=self.user)
+        profile.job_title = "Developer"
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        with self.assertNumQueries(1):
+            user = get_cached_user(self.user.pk)
+        self.assertEqual(user.profile.job_title, "Developer")
+
+    def test_changed_on_commit(self):
+        """
+        The cached user is only invalidated once the change is committed, so
+        the old details can't be cached against the new version
+        """
+        get_cached_user(self.user.pk)
+        version = get_version(USER_CACHE_NAMESPACE, self.user.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                user = CustomUser.objects.get(pk=self.user.pk)
+                user.is_active = False
+                user.save()
+                user.profile.job_title = "Developer"
+                user.profile.save()
+                self.assertEqual(
+                    get_version(USER_CACHE_NAMESPACE, self.user.pk), version
+                )
+        # One for the user, and one for the profile
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(
+            get_version(USER_CACHE_NAMESPACE, self.user.pk), version
+        )
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(
+            get_version(USER_CACHE_NAMESPACE, self.user.pk), version
+        )
+        with self.assertNumQueries(1):
+            user = get_cached_user(self.user.pk)
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.profile.job_title, "Developer")
+
+    def test_user_api(self):
+        """
+        Requests with a cached token and user don't need the database
+        """
+        for _ in range(2):
+            self.assertEqual(self.get_user()[0].status_code, 200)
+        response, queries = self.get_user()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+        # A changed email address is returned straight away
+        self.user.email = f"changed@{self.allowed_domain}.co.uk"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response, queries = self.get_user()
+        self.assertEqual(response.data["email"], self.user.email)
+        self.assertEqual(queries, 1)
+
+        # As is the user being deleted
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.get_user()[0].status_code, 401)
+
+    def test_examples(self):
+        """
+        Checking the user's examples haven't changed doesn't need the database
+        """
+        for _ in range(2):
+            response = self.client.get("/api/v1/examples/")
+            self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                "/api/v1/examples/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(context.captured_queries, [])
+
+    @override_settings(USER_CACHE_SIZE=1)
+    def test_size(self):
+        """
+        Only the most recently used users are kept in each process
+        """
+        other = CustomUser.objects.create_user(
+            email=f"other@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+        )
+        get_cached_user(self.user.pk)
+        get_cached_user(other.pk)
+        self.assertEqual(list(user_cache._local), [other.pk])
+
+        # The first user is still in the shared cache
+        with self.assertNumQueries(0):
+            get_cached_user(self.user.pk)
+        self.assertEqual(list(user_cache._local), [self.user.pk])
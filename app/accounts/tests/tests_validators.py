@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from accounts.models import CustomUser
+from app.validators import (
+    CommonPasswordValidator,
+    PasswordComplexityValidator,
+    UserAttributeSimilarityValidator,
+    password_policy,
+)
+
+
+class PasswordPolicyTestCase(SimpleTestCase):
+    def get_messages(self, password, user=None):
+        try:
+            password_policy.validate(password, user)
+        except ValidationError as error:
+            return error.messages
+        return []
+
+    def test_complexity(self):
+        """Passwords need an upper and lower case letter and a digit"""
+        validator = PasswordComplexityValidator()
+        validator.validate("123ABCcde456")
+        for password in ["123ABC456", "abcDEFghi", "123abc456", "ÀÉÎ123õü"]:
+            with self.assertRaises(ValidationError) as context:
+                validator.validate(password)
+            self.assertEqual(
+                context.exception.code, "password_missing_characters"
+            )
+
+    def test_common_passwords_shared(self):
+        """The common passwords list is only loaded once"""
+        self.assertIs(
+            CommonPasswordValidator().passwords,
+            CommonPasswordValidator().passwords,
+        )
+        self.assertIn(
+            "This password is too common.", self.get_messages("Password123")
+        )
+
+    def test_similarity(self):
+        """The similarity check matches Django's"""
+        user = CustomUser(
+            email="jane.smith@mydomain.co.uk", first_name="Jane", last_name=""
+        )
+        validators = [
+            password_validation.UserAttributeSimilarityValidator(),
+            UserAttributeSimilarityValidator(),
+        ]
+        for password in [
+            "JaneSmith1",
+            "smith.jane",
+            "mydomain.co",
+            "123ABCcde456",
+            "J",
+            "jane.smith@mydomain.co.uk!",
+        ]:
+            results = []
+            for validator in validators:
+                try:
+                    validator.validate(password, user)
+                    results.append(None)
+                except ValidationError as error:
+                    results.append(error.messages)
+            self.assertEqual(results[0], results[1], password)
+
+    def test_validate(self):
+        """All of the errors are raised together"""
+        user = CustomUser(email="test@mydomain.co.uk", first_name="Test")
+        self.assertEqual(self.get_messages("123ABCcde456", user), [])
+        self.assertEqual(
+            self.get_messages("password", user),
+            [
+                "This password is too common.",
+                "This password must contain at least 1 digit, 1 upper and 1 "
+                "lower case character.",
+            ],
+        )
+
+    def test_validate_many(self):
+        """
+        Many passwords are validated as each would be, checking each distinct
+        password once for the validators that don't use the user
+        """
+        users = [
+            CustomUser(email=f"test{i}@mydomain.co.uk", first_name="Test")
+            for i in range(3)
+        ]
+        passwords = [
+            ("123ABCcde456", users[0]),
+            ("123ABCcde456", users[1]),
+            ("password", users[2]),
+            ("Test0@mydomain.co.uk", users[0]),
+        ]
+
+        validate = PasswordComplexityValidator.validate
+        with patch.object(
+            PasswordComplexityValidator,
+            "validate",
+            autospec=True,
+            side_effect=validate,
+        ) as complexity:
+            results = password_policy.validate_many(passwords)
+        self.assertEqual(complexity.call_count, 3)
+
+        self.assertEqual(
+            [None if error is None else error.messages for error in results],
+            [
+                self.get_messages(password, user) or None
+                for password, user in passwords
+            ],
+        )
+        self.assertIsNone(results[0])
+        self.assertIsNone(results[1])
+        self.assertIsNotNone(results[2])
+        self.assertIn(
+            "The password is too similar to the email address.",
+            results[3].messages,
+        )
@@ -1,14 +1,61 @@
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
 
 # Token generation for the account activation emails - make sure that it is
-# a valid token. Extends the default token generator
+# a valid token. Extends the default token generator.
+#
+# The token only signs the user's id and when it was made, so a bad or expired
+# token can be rejected without loading the user. It can't be used again once
+# the account is activated, as activating only updates accounts that haven't
+# been (see accounts.serializers.ActivateAccountSerializer).
 
 
 class AccountActivationTokenGenerator(PasswordResetTokenGenerator):
-    def _make_hash_value(self, user, timestamp):
-        return (
-            str(user.pk) + str(timestamp) + str(user.profile.email_confirmed)
-        )
+    key_salt = "accounts.tokens.AccountActivationTokenGenerator"
+
+    def _make_token_with_timestamp(self, user, timestamp, secret):
+        return self.make_token_for_pk(user.pk, timestamp, secret)
+
+    def make_token_for_pk(self, pk, timestamp, secret):
+        # As PasswordResetTokenGenerator, signing just the id and timestamp
+        hash_string = salted_hmac(
+            self.key_salt,
+            f"{pk}{timestamp}",
+            secret=secret,
+            algorithm=self.algorithm,
+        ).hexdigest()[::2]
+        return f"{int_to_base36(timestamp)}-{hash_string}"
+
+    def check_token(self, user, token):
+        return bool(user) and self.check_token_for_pk(user.pk, token)
+
+    def check_token_for_pk(self, pk, token):
+        """
+        Whether the token was made for the user with the id, and hasn't
+        expired, without needing the user
+        """
+        if not (pk and isinstance(token, str)):
+            return False
+        try:
+            ts_b36, _ = token.split("-")
+            timestamp = base36_to_int(ts_b36)
+        except ValueError:
+            return False
+
+        # Check that the timestamp/uid has not been tampered with
+        if not any(
+            constant_time_compare(
+                self.make_token_for_pk(pk, timestamp, secret), token
+            )
+            for secret in [self.secret, *self.secret_fallbacks]
+        ):
+            return False
+
+        # Check the timestamp is within limit
+        age = self._num_seconds(self._now()) - timestamp
+        return age <= settings.ACCOUNT_ACTIVATION_TIMEOUT
 
 
 account_activation_token = AccountActivationTokenGenerator()
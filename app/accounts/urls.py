@@ -1,7 +1,34 @@
-from django.urls import include, path, re_path
+from django.urls import include, path
 from knox import views as knox_views
 
-from accounts.api import ActivateAccountAPI, LoginAPI, RegisterAPI, UserAPI
+from accounts.api import (
+    ActivateAccountAPI,
+    LoginAPI,
+    PasswordResetConfirmAPI,
+    PasswordResetRequestAPI,
+    PasswordResetValidateAPI,
+    RegisterAPI,
+    UserAPI,
+)
+
+# As django_rest_passwordreset.urls, with the throttled views
+password_reset_urlpatterns = [
+    path(
+        "validate_token/",
+        PasswordResetValidateAPI.as_view(),
+        name="reset-password-validate",
+    ),
+    path(
+        "confirm/",
+        PasswordResetConfirmAPI.as_view(),
+        name="reset-password-confirm",
+    ),
+    path(
+        "",
+        PasswordResetRequestAPI.as_view(),
+        name="reset-password-request",
+    ),
+]
 
 urlpatterns = [
     path("register", RegisterAPI.as_view()),
@@ -9,8 +36,11 @@ urlpatterns = [
     path("user", UserAPI.as_view()),
     path("logout", knox_views.LogoutView.as_view(), name="knox_logout"),
     path("activate", ActivateAccountAPI.as_view()),
-    re_path(
-        r"^password-reset/",
-        include("django_rest_passwordreset.urls", namespace="password_reset"),
+    path(
+        "password-reset/",
+        include(
+            (password_reset_urlpatterns, "password_reset"),
+            namespace="password_reset",
+        ),
     ),
 ]
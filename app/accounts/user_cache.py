@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import USER_CACHE_NAMESPACE, CustomUser, Profile
+from app.versions import aget_version, get_version
+
+# Cache of the authenticated user
+# Authenticating a request with a cached token (see accounts.auth) still loads
+# the user from the database, and then their profile if it is used. Instead,
+# the user's and profile's field values are cached, keyed by the user's id and
+# their version stamp (see app.versions), and the instances are rebuilt from
+# them on each request. The version is bumped whenever the user or their
+# profile is saved or deleted (see accounts.models), so a changed user is
+# loaded from the database again on their next request.
+#
+# The values are kept in each process for USER_CACHE_TIMEOUT seconds (for up
+# to USER_CACHE_SIZE users), and in the Django cache so that other processes
+# can use them. Only the version is read from the Django cache when the user
+# is already cached in the process.
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def user_cache_key(pk, version):
+    return f"user:{pk}:{version}"
+
+
+def get_cached_user(pk):
+    """
+    The user (with their profile), from the cache if it has their current
+    version, else from the database. Raises CustomUser.DoesNotExist.
+    """
+    version = get_version(USER_CACHE_NAMESPACE, pk)
+    values = get_local(pk, version)
+    if values is None:
+        key = user_cache_key(pk, version)
+        values = cache.get(key)
+        if values is None:
+            user = CustomUser.objects.select_related("profile").get(pk=pk)
+            values = get_values(user)
+            cache.set(key, values, settings.USER_CACHE_TIMEOUT)
+            set_local(pk, version, values)
+            return user
+        set_local(pk, version, values)
+    return build_user(values)
+
+
+async def aget_cached_user(pk):
+    """
+    As get_cached_user, from async code
+    """
+    version = await aget_version(USER_CACHE_NAMESPACE, pk)
+    values = get_local(pk, version)
+    if values is None:
+        key = user_cache_key(pk, version)
+        values = await cache.aget(key)
+        if values is None:
+            user = await CustomUser.objects.select_related("profile").aget(
+                pk=pk
+            )
+            values = get_values(user)
+            await cache.aset(key, values, settings.USER_CACHE_TIMEOUT)
+            set_local(pk, version, values)
+            return user
+        set_local(pk, version, values)
+    return build_user(values)
+
+
+def get_local(pk, version):
+    """
+    The user's values cached in this process, if they are the current version
+    """
+    with _local_lock:
+        cached = _local.get(pk)
+        if cached is None:
+            return None
+        cached_version, expires, values = cached
+        if cached_version != version or expires <= time.monotonic():
+            del _local[pk]
+            return None
+        _local.move_to_end(pk)
+        return values
+
+
+def set_local(pk, version, values):
+    if not settings.USER_CACHE_SIZE:
+        return
+    expires = time.monotonic() + settings.USER_CACHE_TIMEOUT
+    with _local_lock:
+        _local[pk] = (version, expires, values)
+        _local.move_to_end(pk)
+        # Drop the least recently used users
+        while len(_local) > settings.USER_CACHE_SIZE:
+            _local.popitem(last=False)
+
+
+def clear_local():
+    """
+    Empty this process's cache (e.g. in tests)
+    """
+    with _local_lock:
+        _local.clear()
+
+
+def get_field_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def get_values(user):
+    """
+    The field values to cache for the user and their profile
+    """
+    profile = CustomUser.profile.related.get_cached_value(user, None)
+    return (
+        tuple(getattr(user, name) for name in get_field_names(CustomUser)),
+        (
+            None
+            if profile is None
+            else tuple(
+                getattr(profile, name) for name in get_field_names(Profile)
+            )
+        ),
+    )
+
+
+def build_user(values):
+    """
+    A new user instance from the cached values, as if loaded from the database
+    """
+    user_values, profile_values = values
+    db = CustomUser.objects.db
+    user = CustomUser.from_db(db, get_field_names(CustomUser), user_values)
+    if profile_values is None:
+        # As select_related does when there isn't a profile
+        CustomUser.profile.related.set_cached_value(user, None)
+    else:
+        user.profile = Profile.from_db(
+            db, get_field_names(Profile), profile_values
+        )
+    return user
@@ -1,17 +1,34 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
-from rest_framework.filters import SearchFilter
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-# Required if you want to return all, and not just those relating to the
-# logged in user
-# from api.models import ExampleDataTable
-from api.serializers import ExampleDataTableSerializer
-from app.pagination import CustomPagination
+from accounts.models import USER_CACHE_NAMESPACE
+from api.exports import EXPORT_FORMATS, export_response
+from api.filters import OwnerSearchFilter
+from api.models import EXAMPLES_CACHE_NAMESPACE, ExampleDataTable
+from api.serializers import (
+    BulkDeleteSerializer,
+    BulkUpdateIdSerializer,
+    ExampleDataTableSerializer,
+)
+from app.caching import versioned_response
+from app.counting import CachedCount, EstimatedCount
+from app.pagination import CustomPagination, KeysetPagination
+from app.readers import get_values_reader
+from app.versions import bump_version, bump_version_on_commit
+from app.views import AsyncAPIViewMixin
 
 
 # ExampleDataTable Viewset
-class ExampleDataTableViewSet(viewsets.ModelViewSet):
+class ExampleDataTableViewSet(AsyncAPIViewMixin, viewsets.ModelViewSet):
     """
     Methods to extract and modify the example data.
 
@@ -30,15 +47,44 @@ class ExampleDataTableViewSet(viewsets.ModelViewSet):
         given ID
 
     destroy: Delete data from the example table based on a given ID
+
+    export: Download all the data in the example data table for the logged \
+        in user, as NDJSON or CSV.
+
+    bulkCreate: Add multiple entries to the example data table (POST to \
+        bulk/ with a list of entries).
+
+    bulkPartialUpdate: Partially update multiple entries based on the ID in \
+        each entry (PATCH to bulk/ with a list of entries).
+
+    bulkDestroy: Delete multiple entries based on a list of IDs (DELETE to \
+        bulk/ with {"ids": [...]}).
     """
 
     # Force user to be authenticated to access
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ExampleDataTableSerializer
     pagination_class = CustomPagination
+    # Opt-in keyset pagination, used when the request includes
+    # ?pagination=cursor. Deep pages are as quick as the first, but the count
+    # is only provided when requested with ?count=true
+    cursor_pagination_class = KeysetPagination
+    pagination_mode_query_param = "pagination"
+    # How the total count is calculated. Small result sets are counted exactly
+    # and large ones use the database's estimate, and the result is cached for
+    # the user and query until their examples (or their profile, which is
+    # searched) change
+    count_strategy = CachedCount(
+        EXAMPLES_CACHE_NAMESPACE,
+        EstimatedCount(threshold=10000),
+        depends_on=[USER_CACHE_NAMESPACE],
+    )
 
     # Searching and filtering
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    # OwnerSearchFilter behaves as DRF's SearchFilter, but avoids joining to
+    # the user's tables when searching fields on the owner, and adds a ranked
+    # full text search mode (see api/filters.py)
+    filter_backends = [DjangoFilterBackend, OwnerSearchFilter]
     # Filter the data set by adding the parameter ?email="example@example.com"
     filterset_fields = ["email"]
     # Search the dataset using the SEARCH_PARAM e.g. ?search="hi"
@@ -57,6 +103,31 @@ class ExampleDataTableViewSet(viewsets.ModelViewSet):
     # here as we only ever return the logged in users' results, but is here
     # for reference on searching on related fields
 
+    # Fields used for the full text search when ?search_mode=ranked is given.
+    # These must match the full text search index on the model.
+    ranked_search_fields = ["message"]
+
+    # Streaming export options. The number of rows fetched from the database
+    # at a time is limited, so the export uses the same memory for any number
+    # of rows
+    export_format_query_param = "export_format"
+    export_chunk_size = 2000
+
+    # Whether the list reads values directly rather than serializing model
+    # instances (see app/readers.py)
+    fast_list = True
+
+    # Maximum number of entries in a single bulk request
+    bulk_max_items = 1000
+
+    # Errors from looking up an example that isn't found, or an invalid ID
+    lookup_errors = (
+        ExampleDataTable.DoesNotExist,
+        DjangoValidationError,
+        TypeError,
+        ValueError,
+    )
+
     # In here you can extract just the required dataset quickly and easily
     # This is where you would make amendments to the queryset that needed
     # to be included in all results. For example here, the queryset relates
@@ -71,21 +142,298 @@ class ExampleDataTableViewSet(viewsets.ModelViewSet):
         # Only return examples relating to the user
         return self.request.user.examples.all()
 
+    @property
+    def paginator(self):
+        """
+        The paginator instance, switching to keyset pagination if requested
+        """
+        if not hasattr(self, "_paginator"):
+            mode = self.request.query_params.get(
+                self.pagination_mode_query_param
+            )
+            if mode == "cursor":
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
     # Example overwriting the list response to include pagination
-    def list(self, response):
+    # The response has an ETag based on the user's examples version, so
+    # unchanged data isn't sent again (see app/caching.py). Searches match
+    # the owner's profile, so it also changes with the user's version.
+    @versioned_response(
+        EXAMPLES_CACHE_NAMESPACE, depends_on=[USER_CACHE_NAMESPACE]
+    )
+    def list(self, request, *args, **kwargs):
+        # Read just the serializer's fields as values, and format them as the
+        # serializer would, which is much quicker than serializing each row
+        reader = self.get_values_reader()
+        if reader is None:
+            return super().list(request, *args, **kwargs)
         # Get the queryset
         queryset = self.get_queryset()
         # Filter the queryset using the inbuilt methods
-        queryset = self.filter_queryset(queryset)
+        queryset = reader.values(self.filter_queryset(queryset))
         # Paginate the response
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(reader.to_representation(page))
         # Serialize the data if no page provided
-        serializer = self.get_serializer(queryset, many=True)
+        data = reader.to_representation(list(queryset))
         # Return the response
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @versioned_response(
+        EXAMPLES_CACHE_NAMESPACE, depends_on=[USER_CACHE_NAMESPACE]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return super().retrieve(request, *args, **kwargs)
+        # The queryset only contains the user's own examples, so there are no
+        # object permissions to check against the instance
+        queryset = self.get_queryset()
+        queryset = reader.values(self.filter_queryset(queryset))
+        try:
+            row = queryset.get(**self.get_lookup())
+        except self.lookup_errors:
+            raise self.not_found()
+        return Response(reader.to_representation([row])[0])
+
+    # The async versions of list and retrieve, used under ASGI so the
+    # request doesn't tie up a thread while waiting on the database (see
+    # app/views.py)
+    @versioned_response(
+        EXAMPLES_CACHE_NAMESPACE, depends_on=[USER_CACHE_NAMESPACE]
+    )
+    async def alist(self, request, *args, **kwargs):
+        # Read just the serializer's fields as values, and format them as the
+        # serializer would, which is much quicker than serializing each row
+        reader = self.get_values_reader()
+        if reader is None:
+            # Serializing instances may query related objects
+            return await sync_to_async(super().list)(request, *args, **kwargs)
+        # Get the queryset
+        queryset = self.get_queryset()
+        # Filter the queryset using the inbuilt methods
+        queryset = reader.values(await self.afilter_queryset(queryset))
+        # Paginate the response
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        # Serialize the data if no page provided
+        data = reader.to_representation([row async for row in queryset])
+        # Return the response
+        return Response(data, status=status.HTTP_200_OK)
+
+    @versioned_response(
+        EXAMPLES_CACHE_NAMESPACE, depends_on=[USER_CACHE_NAMESPACE]
+    )
+    async def aretrieve(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return await sync_to_async(super().retrieve)(
+                request, *args, **kwargs
+            )
+        queryset = self.get_queryset()
+        queryset = reader.values(await self.afilter_queryset(queryset))
+        try:
+            row = await queryset.aget(**self.get_lookup())
+        except self.lookup_errors:
+            raise self.not_found()
+        return Response(reader.to_representation([row])[0])
+
+    def get_lookup(self):
+        """
+        The filter for the example in the URL
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+    def not_found(self):
+        return Http404(
+            f"No {ExampleDataTable._meta.object_name} matches the given query."
+        )
+
+    async def afilter_queryset(self, queryset):
+        """
+        As filter_queryset, for async views
+        """
+        # Searching the owner's fields reads their profile
+        if self.request.query_params.get(OwnerSearchFilter.search_param):
+            return await sync_to_async(self.filter_queryset)(queryset)
+        return self.filter_queryset(queryset)
+
+    def get_values_reader(self):
+        if not self.fast_list:
+            return None
+        return get_values_reader(self.get_serializer_class())
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
+
+    # Export all of the user's examples, streamed as NDJSON (the default) or
+    # CSV with ?export_format=csv. The email filter and search are applied as
+    # for the list, but the rows aren't paginated.
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get(
+            self.export_format_query_param, "ndjson"
+        )
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {
+                    self.export_format_query_param: [
+                        f"Must be one of: {', '.join(EXPORT_FORMATS)}."
+                    ]
+                }
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(
+            queryset,
+            self.get_serializer_class(),
+            export_format,
+            "examples",
+            chunk_size=self.export_chunk_size,
+            # Stream asynchronously under ASGI, so the rows aren't buffered
+            asynchronous=isinstance(request._request, ASGIRequest),
+        )
+
+    def check_bulk_data(self, data):
+        """
+        Check the bulk request contains a list of entries
+        """
+        if not isinstance(data, list) or not data:
+            raise ValidationError(
+                {"non_field_errors": ["Expected a list of entries."]}
+            )
+        if len(data) > self.bulk_max_items:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"No more than {self.bulk_max_items} entries can be "
+                        "sent in one request."
+                    ]
+                }
+            )
+
+    # Bulk endpoints, for adding, updating or deleting many entries in a
+    # single request. Each runs in a single transaction, and nothing is saved
+    # unless every entry is valid. When invalid, the errors are returned as a
+    # list in the same order as the entries.
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        self.check_bulk_data(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        examples = []
+        for data in serializer.validated_data:
+            # Always save the examples against the current user
+            data.pop("owner", None)
+            example = ExampleDataTable(owner=self.request.user, **data)
+            # bulk_create doesn't call save(), so set this here instead
+            example.set_part_of_day_created()
+            examples.append(example)
+
+        with transaction.atomic():
+            examples = ExampleDataTable.objects.bulk_create(examples)
+
+        # Bulk operations don't send signals, so invalidate any cached data
+        bump_version(EXAMPLES_CACHE_NAMESPACE, self.request.user.pk)
+
+        serializer = self.get_serializer(examples, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_partial_update(self, request):
+        self.check_bulk_data(request.data)
+
+        ids = []
+        id_errors = []
+        for data in request.data:
+            id_serializer = BulkUpdateIdSerializer(data=data)
+            if id_serializer.is_valid():
+                ids.append(id_serializer.validated_data["id"])
+                id_errors.append(None)
+            else:
+                ids.append(None)
+                id_errors.append(id_serializer.errors)
+
+        with transaction.atomic():
+            # Only the user's own examples can be updated
+            examples = (
+                self.get_queryset()
+                .select_for_update()
+                .in_bulk([pk for pk in ids if pk is not None])
+            )
+
+            errors = []
+            updated = []
+            fields = {"last_updated_at", "part_of_day_created"}
+            for data, pk, id_error in zip(request.data, ids, id_errors):
+                if id_error:
+                    errors.append(id_error)
+                    continue
+                if pk not in examples:
+                    errors.append({"id": ["Not found."]})
+                    continue
+                serializer = self.get_serializer(
+                    examples[pk], data=data, partial=True
+                )
+                if not serializer.is_valid():
+                    errors.append(serializer.errors)
+                    continue
+                errors.append({})
+
+                validated_data = serializer.validated_data
+                validated_data.pop("owner", None)
+                for field, value in validated_data.items():
+                    setattr(examples[pk], field, value)
+                fields.update(validated_data)
+                updated.append(examples[pk])
+
+            if any(errors):
+                raise ValidationError(errors)
+
+            # bulk_update doesn't call save(), so set these here instead
+            now = timezone.now()
+            for example in updated:
+                example.last_updated_at = now
+                example.set_part_of_day_created()
+            ExampleDataTable.objects.bulk_update(updated, fields)
+
+        # Bulk operations don't send signals, so invalidate any cached data
+        bump_version(EXAMPLES_CACHE_NAMESPACE, self.request.user.pk)
+
+        serializer = self.get_serializer(updated, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.check_bulk_data(serializer.validated_data["ids"])
+        ids = set(serializer.validated_data["ids"])
+
+        with transaction.atomic():
+            # Only the user's own examples can be deleted
+            queryset = self.get_queryset().filter(id__in=ids)
+            missing = ids - set(queryset.values_list("id", flat=True))
+            if missing:
+                missing = ", ".join(str(pk) for pk in sorted(missing))
+                raise ValidationError({"ids": [f"Not found: {missing}"]})
+            # .delete() sends post_delete for each row, which would bump the
+            # version once per row, so delete them in a single query instead.
+            # This skips the cascades, so only while nothing references them
+            if ExampleDataTable._meta.related_objects:
+                queryset.delete()
+            else:
+                queryset._raw_delete(queryset.db)
+                # No signals are sent, so invalidate any cached data once it's
+                # committed
+                bump_version_on_commit(
+                    EXAMPLES_CACHE_NAMESPACE, self.request.user.pk
+                )
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
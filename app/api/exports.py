@@ -0,0 +1,122 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from djangorestframework_camel_case.util import camelize
+
+from app.readers import get_values_reader
+
+# Streaming exports
+# Rows are read from the database in chunks (using a server-side cursor where
+# the database supports it) and written to the response as they are read, so
+# the memory used stays the same however many rows there are. The values are
+# formatted the same way as the API, using app.readers rather than a
+# serializer for each row.
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class Echo:
+    """
+    A file-like object that returns what is written, for the csv writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, reader, chunk_size):
+    rows = queryset.values_list(*reader.attnames).iterator(
+        chunk_size=chunk_size
+    )
+    # Format the values a chunk at a time
+    while chunk := list(islice(rows, chunk_size)):
+        yield from reader.format_rows(chunk)
+
+
+async def aiter_rows(queryset, reader, chunk_size):
+    """
+    As iter_rows, reading each chunk in a thread so the event loop isn't
+    blocked by the database
+    """
+    rows = queryset.values_list(*reader.attnames).iterator(
+        chunk_size=chunk_size
+    )
+    read_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while chunk := await read_chunk():
+        for row in reader.format_rows(chunk):
+            yield row
+
+
+def get_keys(field_names):
+    """
+    The camelCase names used for the fields by the API
+    """
+    return list(camelize(dict.fromkeys(field_names)))
+
+
+def ndjson_writer(field_names):
+    """
+    The header line (if any) and the function formatting each row
+    """
+    keys = get_keys(field_names)
+    return None, lambda row: json.dumps(dict(zip(keys, row))) + "\n"
+
+
+def csv_writer(field_names):
+    writer = csv.writer(Echo())
+    return writer.writerow(get_keys(field_names)), writer.writerow
+
+
+def stream(rows, header, write_row):
+    if header is not None:
+        yield header
+    for row in rows:
+        yield write_row(row)
+
+
+async def astream(rows, header, write_row):
+    if header is not None:
+        yield header
+    async for row in rows:
+        yield write_row(row)
+
+
+def export_response(
+    queryset,
+    serializer_class,
+    export_format,
+    filename,
+    chunk_size=2000,
+    asynchronous=False,
+):
+    """
+    Stream every row in the queryset as NDJSON or CSV, with the fields of the
+    serializer (which must be supported by app.readers).
+
+    Set asynchronous when serving under ASGI, which buffers the whole of a
+    synchronous stream before sending it (and under WSGI, an asynchronous one).
+    """
+    reader = get_values_reader(serializer_class)
+    writer = csv_writer if export_format == "csv" else ndjson_writer
+    header, write_row = writer(reader.field_names)
+    if asynchronous:
+        content = astream(
+            aiter_rows(queryset, reader, chunk_size), header, write_row
+        )
+    else:
+        content = stream(
+            iter_rows(queryset, reader, chunk_size), header, write_row
+        )
+    response = StreamingHttpResponse(
+        content, content_type=EXPORT_FORMATS[export_format]
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
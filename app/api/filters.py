@@ -0,0 +1,123 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+
+from app.pagination import KeysetPagination
+
+# Custom filter backends
+# https://www.django-rest-framework.org/api-guide/filtering/#custom-generic-filtering
+
+
+class OwnerSearchFilter(SearchFilter):
+    """
+    Search filter for querysets which only contain the logged in user's data.
+
+    This keeps the same behaviour as the default SearchFilter (case-insensitive
+    partial matches, where every term must match one of the search fields),
+    with two differences:
+
+    - Search fields on the owner (e.g. owner__profile__job_title) have the
+      same value for every row, so rather than joining to the owner's tables
+      for each row, they are checked once against the logged in user.
+    - Adding ?search_mode=ranked uses Postgres full text search on the view's
+      `ranked_search_fields` instead, ordering the results by relevance.
+      Keyset pagination always orders by its own fields, so ranked searches
+      can't be combined with it and are rejected.
+    """
+
+    search_mode_param = "search_mode"
+    owner_field = "owner"
+    # This must match the config used for the full text search index
+    search_config = "english"
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        if request.query_params.get(self.search_mode_param) == "ranked":
+            if isinstance(getattr(view, "paginator", None), KeysetPagination):
+                raise ValidationError(
+                    {
+                        self.search_mode_param: [
+                            "Ranked search can't be used with cursor "
+                            "pagination."
+                        ]
+                    }
+                )
+            ranked_search_fields = getattr(view, "ranked_search_fields", None)
+            connection = connections[queryset.db]
+            if ranked_search_fields and connection.vendor == "postgresql":
+                return self.ranked_search(
+                    request, queryset, ranked_search_fields
+                )
+
+        # Split out the fields relating to the owner
+        owner_prefix = self.owner_field + LOOKUP_SEP
+        owner_values = [
+            self.get_owner_value(request.user, field[len(owner_prefix) :])
+            for field in search_fields
+            if field.startswith(owner_prefix)
+        ]
+        orm_lookups = [
+            self.construct_search(str(field), queryset)
+            for field in search_fields
+            if not field.startswith(owner_prefix)
+        ]
+
+        conditions = []
+        for term in search_terms:
+            # If the term matches the owner, then it matches every row
+            if any(term.lower() in value.lower() for value in owner_values):
+                continue
+            if not orm_lookups:
+                return queryset.none()
+            conditions.append(
+                reduce(or_, (Q(**{lookup: term}) for lookup in orm_lookups))
+            )
+
+        if conditions:
+            queryset = queryset.filter(reduce(and_, conditions))
+        return queryset
+
+    def get_owner_value(self, user, field):
+        """
+        Follow the lookup from the user to get the value as a string
+        """
+        value = user
+        try:
+            for part in field.split(LOOKUP_SEP):
+                value = getattr(value, part)
+        except ObjectDoesNotExist:
+            return ""
+        return "" if value is None else str(value)
+
+    def ranked_search(self, request, queryset, ranked_search_fields):
+        """
+        Full text search, with the best matches first
+        """
+        query = SearchQuery(
+            request.query_params.get(self.search_param, ""),
+            config=self.search_config,
+            search_type="websearch",
+        )
+        vector = SearchVector(*ranked_search_fields, config=self.search_config)
+        return (
+            queryset.annotate(search_vector=vector)
+            .filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", *queryset.model._meta.ordering)
+        )
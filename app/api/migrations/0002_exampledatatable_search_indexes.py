@@ -0,0 +1,41 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from app.operations import PortableAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # The indexes are built concurrently so that the table isn't locked
+    # against writes, which can't be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PortableAddIndexConcurrently(
+            model_name="exampledatatable",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("message"),
+                    name="gin_trgm_ops",
+                ),
+                name="api_example_message_trgm",
+            ),
+        ),
+        PortableAddIndexConcurrently(
+            model_name="exampledatatable",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    "message", config="english"
+                ),
+                name="api_example_message_fts",
+            ),
+        ),
+    ]
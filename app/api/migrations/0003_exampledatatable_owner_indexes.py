@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+from app.operations import PortableAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # The indexes are built concurrently so that the table isn't locked
+    # against writes, which can't be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("api", "0002_exampledatatable_search_indexes"),
+    ]
+
+    operations = [
+        PortableAddIndexConcurrently(
+            model_name="exampledatatable",
+            index=models.Index(
+                fields=["owner", "-created_at", "name", "id"],
+                name="api_example_owner_created",
+            ),
+        ),
+        PortableAddIndexConcurrently(
+            model_name="exampledatatable",
+            index=models.Index(
+                fields=["owner", "email"], name="api_example_owner_email"
+            ),
+        ),
+    ]
@@ -1,8 +1,18 @@
 import datetime
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from accounts.models import CustomUser
+from app.versions import bump_version_on_commit
+
+# Namespace for the per-user version stamp used to invalidate anything cached
+# about a user's examples (see app.versions)
+EXAMPLES_CACHE_NAMESPACE = "examples"
 
 
 class ExampleDataTable(models.Model):
@@ -77,11 +87,35 @@ class ExampleDataTable(models.Model):
         # # If the table name and schema are required
         # db_table = 'data_schema\".\"table_name'
 
-        # # If you need to be able to quickly search on a field combo or result
-        # # https://docs.djangoproject.com/en/3.2/ref/models/indexes/
-        # indexes = [
-        #     models.Index(fields=['email', 'message']),
-        # ]
+        # If you need to be able to quickly search on a field combo or result
+        # https://docs.djangoproject.com/en/3.2/ref/models/indexes/
+        indexes = [
+            # Every list is filtered to a single owner and then sorted by the
+            # default ordering (with the id as a tie-breaker for the keyset
+            # pagination), so this lets Postgres read the rows in order and
+            # stop at the page limit rather than sorting every row.
+            models.Index(
+                fields=["owner", "-created_at", "name", "id"],
+                name="api_example_owner_created",
+            ),
+            # Filtering the owner's data by email e.g. ?email=...
+            models.Index(
+                fields=["owner", "email"], name="api_example_owner_email"
+            ),
+            # Trigram index to speed up the (case-insensitive) partial match
+            # searches e.g. ?search=hi. Django compares UPPER(message), so the
+            # index needs to be on the same expression.
+            GinIndex(
+                OpClass(Upper("message"), name="gin_trgm_ops"),
+                name="api_example_message_trgm",
+            ),
+            # Full text search index for ranked searches. This must match
+            # the search vector used in api.filters.OwnerSearchFilter
+            GinIndex(
+                SearchVector("message", config="english"),
+                name="api_example_message_fts",
+            ),
+        ]
 
         # # Define a unique constraint on multiple fields
         # unique_together = ['email', 'owner']
@@ -102,7 +136,12 @@ class ExampleDataTable(models.Model):
     # things that would need to be considered e.g. localtime, but hopefully
     # gives a good impression
     def save(self, *args, **kwargs):
+        self.set_part_of_day_created()
+        return super().save(*args, **kwargs)
 
+    # The details are set in a separate method, so that they can also be set
+    # when saving in bulk (which doesn't call `save`)
+    def set_part_of_day_created(self):
         now = datetime.datetime.now().time()
         if now.hour >= 6 and now.hour < 12:
             self.part_of_day_created = "morning"
@@ -110,4 +149,17 @@ class ExampleDataTable(models.Model):
             self.part_of_day_created = "afternoon"
         else:
             self.part_of_day_created = "night"
-        return super().save(*args, **kwargs)
+
+
+# Whenever an example is added, changed or removed, bump the owner's version
+# so that anything cached about their examples (e.g. counts) is invalidated.
+# Note: bulk queryset operations (e.g. .update() or .bulk_create()) don't send
+# these signals, so need to call bump_version themselves.
+# The version is bumped once the change is committed, so that a concurrent
+# request can't cache the old rows against the new version.
+@receiver([post_save, post_delete], sender=ExampleDataTable)
+def bump_examples_version(sender, instance, using, **kwargs):
+    if instance.owner_id is not None:
+        bump_version_on_commit(
+            EXAMPLES_CACHE_NAMESPACE, instance.owner_id, using=using
+        )
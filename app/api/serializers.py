@@ -8,3 +8,15 @@ class ExampleDataTableSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExampleDataTable
         fields = ["id", "name", "email", "message", "created_at", "owner"]
+
+
+# Bulk delete serializer
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False
+    )
+
+
+# Bulk update entry serializer, checking the id of each entry to update
+class BulkUpdateIdSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
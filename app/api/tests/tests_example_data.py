@@ -1,16 +1,46 @@
+import datetime
 import json
+from unittest import skipUnless
+from unittest.mock import patch
 
+from asgiref.sync import iscoroutinefunction
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
 from knox.models import AuthToken
+from rest_framework import serializers
 from rest_framework.test import APIClient
 
-from accounts.models import CustomUser
-from api.models import ExampleDataTable
+from accounts.models import CustomUser, Profile
+from api.api import ExampleDataTableViewSet
+from api.models import EXAMPLES_CACHE_NAMESPACE, ExampleDataTable
+from api.serializers import ExampleDataTableSerializer
+from app.counting import ApproximateCount, EstimatedCount
+from app.readers import format_datetimes, get_values_reader
+from app.versions import get_version
+
+
+class FixedEstimate:
+    """
+    Count strategy which always gives the same estimate
+    """
+
+    def __init__(self, estimate):
+        self.estimate = estimate
+
+    def count(self, queryset, request=None):
+        return ApproximateCount(self.estimate)
+
+    async def acount(self, queryset, request=None):
+        return ApproximateCount(self.estimate)
 
 
 class ExampleDataTableTestCase(TestCase):
     def setUp(self):
+        cache.clear()
 
         if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
             self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
@@ -140,6 +170,946 @@ class ExampleDataTableTestCase(TestCase):
         # Clear the credentials
         self.client.credentials()
 
+    def test_cursor_pagination(self):
+        """
+        Check that paging through with a cursor returns every example once,
+        in the default order, in both directions
+        """
+
+        # Add enough data for several pages, with some sharing a created_at
+        # timestamp so that the tie-breaking fields are used
+        self.examples += [
+            ExampleDataTable.objects.create(
+                name=f"Person {i}",
+                email=f"user{i}@testdomain.co.uk",
+                owner=self.user,
+            )
+            for i in range(8)
+        ]
+        ExampleDataTable.objects.filter(
+            pk__in=[o.pk for o in self.examples[3:7]]
+        ).update(created_at=self.examples[3].created_at)
+        expected = list(
+            ExampleDataTable.objects.filter(owner=self.user)
+            .order_by("-created_at", "name", "id")
+            .values_list("id", flat=True)
+        )
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        # Walk forwards through the pages
+        pages = []
+        url = "/api/v1/examples/?pagination=cursor&limit=3&count=true"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([o["id"] for o in response.data["results"]])
+            url = response.data["pagination"]["next"]
+
+        self.assertEqual([i for page in pages for i in page], expected)
+        self.assertEqual(len(pages), 4)
+
+        # Only the first page was asked for the count
+        self.assertIsNone(response.data["pagination"]["count"])
+        self.assertIsNone(response.data["pagination"]["current_page"])
+        self.assertEqual(response.data["pagination"]["items_on_page"], 2)
+
+        # Walk backwards from the last page
+        url = response.data["pagination"]["previous"]
+        backwards = [pages[-1]]
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            backwards.insert(0, [o["id"] for o in response.data["results"]])
+            url = response.data["pagination"]["previous"]
+
+        self.assertEqual(backwards, pages)
+
+        # The first page includes the count when requested (this is the
+        # cached response from the start, so check the rendered JSON)
+        response = self.client.get(
+            "/api/v1/examples/?pagination=cursor&limit=3&count=true"
+        )
+        pagination = response.json()["pagination"]
+        self.assertEqual(pagination["count"], len(expected))
+        self.assertEqual(pagination["totalPages"], 4)
+        self.assertIsNone(pagination["previous"])
+
+        # An invalid cursor is rejected
+        response = self.client.get(
+            "/api/v1/examples/?pagination=cursor&limit=3&cursor=invalid"
+        )
+        self.assertEqual(response.status_code, 404)
+
+        # Clear the credentials
+        self.client.credentials()
+
+    # Without the cached responses, so that the count is worked out
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_cached_count(self):
+        """
+        Check that the count is cached between pages, and refreshed when the
+        user's examples change
+        """
+        cache.clear()
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        def get_count(url):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counted = any(
+                "COUNT(" in q["sql"] for q in context.captured_queries
+            )
+            return response.data["pagination"]["count"], counted
+
+        # The first request counts, changing page or limit uses the cache
+        self.assertEqual(get_count("/api/v1/examples/?limit=2"), (3, True))
+        self.assertEqual(
+            get_count("/api/v1/examples/?limit=2&page=2"), (3, False)
+        )
+        self.assertEqual(get_count("/api/v1/examples/?limit=1"), (3, False))
+
+        # A different filter is counted separately
+        self.assertEqual(
+            get_count(
+                "/api/v1/examples/?limit=2&email=userA1@testdomain.co.uk"
+            ),
+            (1, True),
+        )
+
+        # Adding an example invalidates the count
+        with self.captureOnCommitCallbacks(execute=True):
+            ExampleDataTable.objects.create(
+                name="Person D1",
+                email="userD1@testdomain.co.uk",
+                owner=self.user,
+            )
+        self.assertEqual(get_count("/api/v1/examples/?limit=2"), (4, True))
+
+        # Changes to another user's examples don't
+        with self.captureOnCommitCallbacks(execute=True):
+            self.examples2[0].delete()
+        self.assertEqual(get_count("/api/v1/examples/?limit=2"), (4, False))
+
+        # Deleting an example invalidates the count
+        with self.captureOnCommitCallbacks(execute=True):
+            self.examples[0].delete()
+        self.assertEqual(get_count("/api/v1/examples/?limit=2"), (3, True))
+
+        # Clear the credentials
+        self.client.credentials()
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_approximate_count(self):
+        """
+        Check that the pages past an estimated count which is too low can
+        still be reached
+        """
+        # 12 examples, but estimate 5 i.e. 3 pages of 2
+        for i in range(9):
+            ExampleDataTable.objects.create(
+                name=f"Person D{i}",
+                email=f"userD{i}@testdomain.co.uk",
+                owner=self.user,
+            )
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        with patch.object(
+            ExampleDataTableViewSet, "count_strategy", FixedEstimate(5)
+        ):
+            seen = []
+            for page in range(1, 7):
+                response = self.client.get(
+                    "/api/v1/examples/", {"limit": 2, "page": page}
+                )
+                self.assertEqual(response.status_code, 200)
+                pagination = response.data["pagination"]
+                self.assertEqual(pagination["count"], 5)
+                self.assertEqual(pagination["current_page"], page)
+                self.assertEqual(pagination["items_on_page"], 2)
+                self.assertEqual(pagination["next"] is not None, page < 6)
+                seen.extend(row["id"] for row in response.data["results"])
+
+            # Every row was returned once
+            self.assertEqual(
+                sorted(seen),
+                sorted(self.user.examples.values_list("id", flat=True)),
+            )
+
+            # Past the real last page
+            response = self.client.get(
+                "/api/v1/examples/", {"limit": 2, "page": 7}
+            )
+            self.assertEqual(response.status_code, 404)
+
+        # Clear the credentials
+        self.client.credentials()
+
+    @override_settings(
+        API_RESPONSE_CACHE_TIMEOUT=0, ROOT_URLCONF="api.tests.urls_async"
+    )
+    async def test_async_approximate_count(self):
+        """
+        Check that the pages past an estimated count which is too low can
+        still be reached from async views
+        """
+        headers = {"Authorization": "Token " + self.token}
+
+        with patch.object(
+            ExampleDataTableViewSet, "count_strategy", FixedEstimate(1)
+        ):
+            response = await self.async_client.get(
+                "/api/v1/examples/?limit=1&page=2", headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
+            pagination = response.json()["pagination"]
+            self.assertEqual(pagination["itemsOnPage"], 1)
+            self.assertIsNotNone(pagination["next"])
+
+            response = await self.async_client.get(
+                "/api/v1/examples/?limit=1&page=3", headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.json()["pagination"]["next"])
+
+            response = await self.async_client.get(
+                "/api/v1/examples/?limit=1&page=4", headers=headers
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_estimated_count(self):
+        """
+        Check that the planner's estimate is only used above the threshold
+        """
+        queryset = self.user.examples.all()
+
+        with patch.object(EstimatedCount, "estimate", return_value=50):
+            # Below the threshold, the rows are counted exactly
+            count = EstimatedCount(threshold=100).count(queryset)
+            self.assertEqual(count, 3)
+            self.assertNotIsInstance(count, ApproximateCount)
+
+            # At or above it, the estimate is used
+            count = EstimatedCount(threshold=50).count(queryset)
+            self.assertEqual(count, 50)
+            self.assertIsInstance(count, ApproximateCount)
+
+        # Without an estimate (i.e. not Postgres), the rows are counted
+        with patch.object(EstimatedCount, "estimate", return_value=None):
+            count = EstimatedCount(threshold=0).count(queryset)
+            self.assertEqual(count, 3)
+            self.assertNotIsInstance(count, ApproximateCount)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_estimated_count_plan_rows(self):
+        """
+        Check that the estimate is read from the plan
+        """
+        queryset = self.user.examples.all()
+        estimate = EstimatedCount().estimate(queryset)
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 1)
+
+        # A threshold of 1 uses the estimate rather than counting
+        with CaptureQueriesContext(connection) as context:
+            count = EstimatedCount(threshold=1).count(queryset)
+        self.assertIsInstance(count, ApproximateCount)
+        self.assertEqual(count, estimate)
+        self.assertFalse(
+            any("COUNT(" in q["sql"] for q in context.captured_queries)
+        )
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_cached_count_profile_changed(self):
+        """
+        Check that the cached count for a search matching the owner's
+        profile is refreshed when the profile changes
+        """
+        self.user.profile.job_title = "Data Engineer"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.save()
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        def get_page():
+            response = self.client.get(
+                "/api/v1/examples/", {"search": "Engineer", "limit": 10}
+            )
+            self.assertEqual(response.status_code, 200)
+            return (
+                response.data["pagination"]["count"],
+                len(response.data["results"]),
+            )
+
+        self.assertEqual(get_page(), (3, 3))
+
+        profile = Profile.objects.get(user=self.user)
+        profile.job_title = "Tester"
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(get_page(), (0, 0))
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_search(self):
+        """
+        Check that searching matches the message or the owner's job title,
+        and that every search term must match
+        """
+        self.user.profile.job_title = "Data Engineer"
+        self.user.profile.save()
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        def search(term):
+            response = self.client.get("/api/v1/examples/", {"search": term})
+            self.assertEqual(response.status_code, 200)
+            return sorted(o["name"] for o in response.data)
+
+        # Partial, case-insensitive match on the message
+        self.assertEqual(search("user a1"), ["Person A1"])
+        self.assertEqual(
+            search("MESSAGE"), ["Person A1", "Person B1", "Person C1"]
+        )
+        # Matching the owner's job title matches all their examples
+        self.assertEqual(
+            search("engineer"), ["Person A1", "Person B1", "Person C1"]
+        )
+        # All terms must match either field
+        self.assertEqual(search("engineer B1"), ["Person B1"])
+        self.assertEqual(search("engineer B2"), [])
+        # Examples for other users aren't returned
+        self.assertEqual(search("A2"), [])
+
+        # Clear the credentials
+        self.client.credentials()
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_ranked_search(self):
+        """
+        Check that ranked searches return the matching examples, with the
+        best matches first
+        """
+        for name, message in [
+            ("Cats", "Cats, cats and more cats"),
+            ("Dogs", "Dogs"),
+            ("Cat", "A cat and a dog"),
+        ]:
+            ExampleDataTable.objects.create(
+                name=name, message=message, owner=self.user
+            )
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        response = self.client.get(
+            "/api/v1/examples/", {"search": "cats", "search_mode": "ranked"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o["name"] for o in response.data], ["Cats", "Cat"])
+
+        # Paginated as normal
+        response = self.client.get(
+            "/api/v1/examples/",
+            {"search": "cats", "search_mode": "ranked", "limit": 1},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["pagination"]["count"], 2)
+        self.assertEqual(
+            [o["name"] for o in response.data["results"]], ["Cats"]
+        )
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_ranked_search_cursor(self):
+        """
+        Check that ranked searches can't be used with cursor pagination, as
+        the results would be in the cursor's order rather than by rank
+        """
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        params = {"search": "message", "search_mode": "ranked"}
+        response = self.client.get("/api/v1/examples/", params)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(
+            "/api/v1/examples/", {**params, "pagination": "cursor"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("search_mode", response.data)
+
+        # Without a search, the mode doesn't matter
+        response = self.client.get(
+            "/api/v1/examples/",
+            {"search_mode": "ranked", "pagination": "cursor"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_export(self):
+        """
+        Check that the user's examples are streamed as NDJSON or CSV, with
+        the filter and search applied
+        """
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        response = self.client.get("/api/v1/examples/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        # The rows match the list response
+        list_response = self.client.get("/api/v1/examples/")
+        self.assertEqual(rows, list_response.json())
+        self.assertEqual(
+            list(rows[0]),
+            ["id", "name", "email", "message", "createdAt", "owner"],
+        )
+
+        response = self.client.get(
+            "/api/v1/examples/export/",
+            {"export_format": "csv", "search": "B1"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,name,email,message,createdAt,owner")
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Person B1", lines[1])
+
+        response = self.client.get(
+            "/api/v1/examples/export/",
+            {"email": "userC1@testdomain.co.uk"},
+        )
+        rows = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0])["name"], "Person C1")
+
+        response = self.client.get(
+            "/api/v1/examples/export/", {"export_format": "xml"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        # Clear the credentials
+        self.client.credentials()
+
+    @override_settings(ROOT_URLCONF="api.tests.urls_async")
+    async def test_async_export(self):
+        """
+        Check that under ASGI the export is streamed asynchronously, rather
+        than Django reading the whole of it before sending it
+        """
+        headers = {"Authorization": "Token " + self.token}
+
+        for export_format in ("ndjson", "csv"):
+            response = await self.async_client.get(
+                "/api/v1/examples/export/",
+                {"export_format": export_format},
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            content = b"".join(
+                [chunk async for chunk in response.streaming_content]
+            )
+            lines = content.splitlines()
+            if export_format == "csv":
+                self.assertEqual(
+                    lines[0], b"id,name,email,message,createdAt,owner"
+                )
+                lines = lines[1:]
+            self.assertEqual(len(lines), len(self.examples))
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_fast_list(self):
+        """
+        Check that the list read as values matches the serializer output
+        """
+        # Include a missing message
+        self.examples[1].message = None
+        self.examples[1].save()
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        def get_responses(params):
+            responses = []
+            for fast_list in (True, False):
+                with patch.object(
+                    ExampleDataTableViewSet, "fast_list", fast_list
+                ):
+                    response = self.client.get("/api/v1/examples/", params)
+                self.assertEqual(response.status_code, 200)
+                responses.append(response)
+            return responses
+
+        for params in (
+            {},
+            {"limit": 2},
+            {"limit": 2, "page": 2},
+            {"search": "B1"},
+            {"pagination": "cursor", "limit": 2, "count": "true"},
+        ):
+            fast, serialized = get_responses(params)
+            self.assertEqual(fast.content, serialized.content)
+
+        # Following the cursor links gives the same pages
+        fast, serialized = get_responses({"pagination": "cursor", "limit": 2})
+        self.assertEqual(
+            fast.data["pagination"]["next"],
+            serialized.data["pagination"]["next"],
+        )
+
+        # The values are formatted as the serializer would
+        serializer = ExampleDataTableSerializer(
+            ExampleDataTable.objects.filter(owner=self.user), many=True
+        )
+        reader = get_values_reader(ExampleDataTableSerializer)
+        self.assertEqual(
+            reader.to_representation(
+                reader.values(ExampleDataTable.objects.filter(owner=self.user))
+            ),
+            serializer.data,
+        )
+
+        # Other datetime formats are also formatted the same way
+        values = [
+            datetime.datetime(2024, 1, 2, 3, 4, 5, 678),
+            datetime.datetime(999, 12, 31, 23, 59, 59),
+            None,
+        ]
+        for output_format in ("%Y-%m-%d %H:%M:%S.%f %%", "%b %d", "iso-8601"):
+            field = serializers.DateTimeField(format=output_format)
+            self.assertEqual(
+                format_datetimes(field, values),
+                [field.to_representation(value) for value in values],
+            )
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_etag(self):
+        """
+        Check that unchanged examples aren't queried or sent again
+        """
+        cache.clear()
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        def get(url, etag=None):
+            headers = {"If-None-Match": etag} if etag else {}
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, headers=headers)
+            queries = [
+                q["sql"]
+                for q in context.captured_queries
+                if ExampleDataTable._meta.db_table in q["sql"]
+            ]
+            return response, queries
+
+        url = "/api/v1/examples/?limit=2"
+        response, queries = get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries)
+        etag = response["ETag"]
+        content = response.content
+
+        # The client has the current version
+        response, queries = get(url, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, [])
+        self.assertEqual(response["ETag"], etag)
+
+        # Another client gets the cached response
+        response, queries = get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.content, content)
+        self.assertEqual(response["ETag"], etag)
+
+        # Each query string has its own ETag
+        response, queries = get("/api/v1/examples/?limit=1", etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Changes to another user's examples don't change the ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            self.examples2[0].delete()
+        self.assertEqual(get(url, etag)[0].status_code, 304)
+
+        # Changes to the user's examples do
+        with self.captureOnCommitCallbacks(execute=True):
+            self.examples[0].delete()
+        response, queries = get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertNotEqual(response.content, content)
+
+        # The detail view is the same
+        detail_url = f"/api/v1/examples/{self.examples[1].id}/"
+        etag = get(detail_url)[0]["ETag"]
+        self.assertEqual(get(detail_url, etag)[0].status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                detail_url, {"message": "Changed"}, format="json"
+            )
+        response = get(detail_url, etag)[0]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["message"], "Changed")
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_etag_profile_changed(self):
+        """
+        Check that searches matching the owner's profile aren't served from
+        the cache once the profile changes
+        """
+        self.user.profile.job_title = "Data Engineer"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.save()
+
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        url = "/api/v1/examples/?search=Engineer&limit=10"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+        etag = response["ETag"]
+
+        profile = Profile.objects.get(user=self.user)
+        profile.job_title = "Tester"
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+
+        # Neither the client's copy or the cached response are used
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["results"], [])
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_version_bumped_on_commit(self):
+        """
+        Check that the cached examples are only invalidated once the change
+        is committed, so the old rows can't be cached against the new version
+        """
+        version = get_version(EXAMPLES_CACHE_NAMESPACE, self.user.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.examples[0].delete()
+            self.assertEqual(
+                get_version(EXAMPLES_CACHE_NAMESPACE, self.user.pk), version
+            )
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        new_version = get_version(EXAMPLES_CACHE_NAMESPACE, self.user.pk)
+        self.assertNotEqual(new_version, version)
+
+        # Deleting in bulk (within a transaction) is the same
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(
+                "/api/v1/examples/bulk/",
+                {"ids": [self.examples[1].id]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 204)
+            self.assertEqual(
+                get_version(EXAMPLES_CACHE_NAMESPACE, self.user.pk),
+                new_version,
+            )
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(
+            get_version(EXAMPLES_CACHE_NAMESPACE, self.user.pk), new_version
+        )
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_async_dispatch(self):
+        """
+        Check that the views are only dispatched on the event loop when
+        ASYNC_API_VIEWS is on, so under WSGI they are run as normal
+        """
+        self.assertFalse(
+            iscoroutinefunction(resolve("/api/v1/examples/").func)
+        )
+        with override_settings(ROOT_URLCONF="api.tests.urls_async"):
+            self.assertTrue(
+                iscoroutinefunction(resolve("/api/v1/examples/").func)
+            )
+
+    @override_settings(
+        API_RESPONSE_CACHE_TIMEOUT=0, ROOT_URLCONF="api.tests.urls_async"
+    )
+    async def test_async(self):
+        """
+        Check that the list and detail work when run on the event loop
+        """
+        headers = {"Authorization": "Token " + self.token}
+
+        response = await self.async_client.get(
+            "/api/v1/examples/", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {row["id"] for row in response.json()},
+            {example.id for example in self.examples},
+        )
+
+        response = await self.async_client.get(
+            "/api/v1/examples/?limit=2&page=2", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["pagination"]["count"], 3)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+        response = await self.async_client.get(
+            "/api/v1/examples/?pagination=cursor&count=true&limit=2",
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertEqual(response.json()["pagination"]["count"], 3)
+
+        # Searching the owner's fields
+        response = await self.async_client.get(
+            "/api/v1/examples/?search=A1", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+        example = self.examples[0]
+        response = await self.async_client.get(
+            f"/api/v1/examples/{example.id}/", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["message"], example.message)
+
+        # Other users' examples aren't found
+        for pk in (self.examples2[0].id, "invalid"):
+            response = await self.async_client.get(
+                f"/api/v1/examples/{pk}/", headers=headers
+            )
+            self.assertEqual(response.status_code, 404)
+
+        # Sync actions still work
+        response = await self.async_client.patch(
+            f"/api/v1/examples/{example.id}/",
+            {"message": "Changed"},
+            content_type="application/json",
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["message"], "Changed")
+
+        # Unauthenticated requests are rejected
+        response = await self.async_client.get("/api/v1/examples/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_bulk_create(self):
+        """
+        Check that many examples can be added at once, for the current user
+        """
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        data = [
+            {
+                "name": f"Bulk {i}",
+                "email": f"bulk{i}@testdomain.co.uk",
+                "message": f"Bulk message {i}",
+                # The owner is always the current user
+                "owner": self.user2.id,
+            }
+            for i in range(5)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                "/api/v1/examples/bulk/", data, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5)
+        self.assertTrue(all(o["id"] for o in response.data))
+        inserts = [
+            q
+            for q in context.captured_queries
+            if q["sql"].startswith("INSERT")
+        ]
+        self.assertEqual(len(inserts), 1)
+
+        examples = ExampleDataTable.objects.filter(name__startswith="Bulk")
+        self.assertEqual(examples.count(), 5)
+        self.assertFalse(examples.exclude(owner=self.user).exists())
+        self.assertFalse(examples.filter(part_of_day_created=None).exists())
+
+        # Nothing is added if any of the examples are invalid
+        data[2]["email"] = "not an email"
+        response = self.client.post(
+            "/api/v1/examples/bulk/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("email", response.data[2])
+        self.assertEqual(examples.count(), 5)
+
+        # A list of examples is required
+        response = self.client.post(
+            "/api/v1/examples/bulk/", data[0], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_bulk_update(self):
+        """
+        Check that many of the user's examples can be changed at once
+        """
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        data = [
+            {"id": example.id, "message": f"Updated {example.name}"}
+            for example in self.examples
+        ]
+        response = self.client.patch(
+            "/api/v1/examples/bulk/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        for example in self.examples:
+            example.refresh_from_db()
+            self.assertEqual(example.message, f"Updated {example.name}")
+            self.assertGreater(example.last_updated_at, example.created_at)
+
+        # Nothing is changed if any example is invalid or not the user's
+        data = [
+            {"id": self.examples[0].id, "message": "Changed"},
+            {"id": self.examples2[0].id, "message": "Changed"},
+            {"message": "Changed"},
+        ]
+        response = self.client.patch(
+            "/api/v1/examples/bulk/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data,
+            [
+                {},
+                {"id": ["Not found."]},
+                {"id": ["This field is required."]},
+            ],
+        )
+
+        # The ids must be whole numbers, rather than e.g. rounding 1.5 down
+        data = [
+            {"id": self.examples[0].id + 0.5, "message": "Changed"},
+            {"id": True, "message": "Changed"},
+            "Changed",
+        ]
+        response = self.client.patch(
+            "/api/v1/examples/bulk/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data,
+            [
+                {"id": ["A valid integer is required."]},
+                {"id": ["A valid integer is required."]},
+                {
+                    "non_field_errors": [
+                        "Invalid data. Expected a dictionary, but got str."
+                    ]
+                },
+            ],
+        )
+        self.assertFalse(
+            ExampleDataTable.objects.filter(message="Changed").exists()
+        )
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_bulk_delete(self):
+        """
+        Check that many of the user's examples can be deleted at once
+        """
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        # Nothing is deleted if any of the examples are not the user's
+        ids = [self.examples[0].id, self.examples2[0].id]
+        response = self.client.delete(
+            "/api/v1/examples/bulk/", {"ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            ExampleDataTable.objects.filter(id__in=ids).count(), 2
+        )
+
+        ids = [self.examples[0].id, self.examples[1].id]
+        response = self.client.delete(
+            "/api/v1/examples/bulk/", {"ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            list(self.user.examples.values_list("id", flat=True)),
+            [self.examples[2].id],
+        )
+
+        # Clear the credentials
+        self.client.credentials()
+
+    def test_bulk_delete_version(self):
+        """
+        Check that deleting many examples bumps the version once
+        """
+        # Authenticate user
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        ids = [example.id for example in self.examples]
+        with patch("app.versions.bump_version") as bump_version:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(
+                    "/api/v1/examples/bulk/", {"ids": ids}, format="json"
+                )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.user.examples.exists())
+        bump_version.assert_called_once_with(
+            EXAMPLES_CACHE_NAMESPACE, self.user.pk
+        )
+
+        # Clear the credentials
+        self.client.credentials()
+
     # Other tests should be included in here for:
     # GET "/api/v1/examples/1"
     # POST
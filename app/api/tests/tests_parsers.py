@@ -0,0 +1,90 @@
+import io
+import json
+from unittest import mock
+
+import orjson
+from django.test import TestCase, override_settings
+from djangorestframework_camel_case.parser import (
+    CamelCaseJSONParser as LibraryCamelCaseJSONParser,
+)
+from rest_framework.exceptions import ParseError
+
+from app.parsers import CamelCaseJSONParser, RequestTooLarge
+
+
+class CamelCaseJSONParserTestCase(TestCase):
+    """
+    Check the project parser gives exactly the same data as the
+    djangorestframework_camel_case parser
+    """
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), "application/json", {})
+
+    def assertSameData(self, body):
+        expected = self.parse(LibraryCamelCaseJSONParser(), body)
+        data = self.parse(CamelCaseJSONParser(), body)
+        self.assertEqual(data, expected)
+        self.assertEqual(repr(data), repr(expected))
+        return data
+
+    def test_values(self):
+        data = self.assertSameData(
+            json.dumps(
+                {
+                    "camelCaseKey": "value",
+                    "already_snake": 1,
+                    "key2": True,
+                    "HTMLKey": None,
+                    "nestedDict": {"innerKey": [{"listKey": "aB"}]},
+                    "unicodeText": "é😀\n",
+                    "bigInt": 2**70,
+                    "aFloat": 1.5e-7,
+                }
+            ).encode()
+        )
+        self.assertEqual(
+            data["nested_dict"], {"inner_key": [{"list_key": "aB"}]}
+        )
+        self.assertSameData(b'{"notANumber": NaN, "huge": 1e400}')
+        # Integers just outside the 64 bit range are kept as integers
+        for number in (-(2**63) - 1, -(2**63), 2**63 - 1, 2**64, 10**19):
+            data = self.assertSameData(b'{"number": %d}' % number)
+            self.assertEqual(data["number"], number)
+        self.assertSameData(b"[]")
+        self.assertSameData(b'"text"')
+
+    def test_orjson(self):
+        """
+        UTF-8 JSON is loaded with orjson
+        """
+        with mock.patch("orjson.loads", side_effect=orjson.loads) as loads:
+            self.assertSameData(b'{"someKey": [1, "a"]}')
+            loads.assert_called_once()
+
+    def test_errors(self):
+        for body in (b"{", b"", b"\xff", b'{"a": 1,}'):
+            with self.assertRaises(ParseError):
+                self.parse(LibraryCamelCaseJSONParser(), body)
+            with self.assertRaises(ParseError):
+                self.parse(CamelCaseJSONParser(), body)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1000)
+    def test_too_large(self):
+        body = json.dumps({"message": "x" * 200000}).encode()
+        stream = io.BytesIO(body)
+        with self.assertRaises(RequestTooLarge):
+            CamelCaseJSONParser().parse(stream, "application/json", {})
+        # Reading stopped once the limit was passed
+        self.assertLess(stream.tell(), len(body))
+
+        self.assertEqual(
+            self.parse(CamelCaseJSONParser(), b'{"someKey": 1}'),
+            {"some_key": 1},
+        )
+
+        # The API responds with a 413 (here based on the Content-Length)
+        response = self.client.post(
+            "/api/v1/auth/login", body, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 413)
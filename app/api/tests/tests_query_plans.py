@@ -0,0 +1,131 @@
+import json
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from api.models import ExampleDataTable
+
+
+@skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+class ExampleDataTableQueryPlanTestCase(TestCase):
+    """
+    Check that the queries run by the examples API are able to use the
+    indexes, rather than scanning or sorting the whole table.
+
+    There is very little data in the test database, so Postgres would usually
+    choose a sequential scan anyway. To check an index *can* be used, scans
+    and sorts are disabled when explaining the queries - if there is no
+    suitable index, the planner has no choice but to use them regardless.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            self.allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            self.allowed_domain = "example"
+
+        self.user = CustomUser.objects.create_user(
+            email=f"test@{self.allowed_domain}.co.uk",
+            password="123ABC456cde",
+            first_name="Test",
+            last_name="123",
+            is_active=True,
+        )
+
+        # Add some fake data
+        for i in range(10):
+            ExampleDataTable.objects.create(
+                name=f"Person {i}",
+                email=f"user{i}@testdomain.co.uk",
+                message=f"Test Message from user {i}",
+                owner=self.user,
+            )
+
+        # Create a token for a logged in user and authenticate
+        self.token = AuthToken.objects.create(self.user)[1]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+    def get_example_queries(self, url):
+        """
+        The SQL for each query on the examples table when calling the url
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and ExampleDataTable._meta.db_table in query["sql"]
+        ]
+
+    def get_plan_nodes(self, sql):
+        """
+        The type of every node in the query plan
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        nodes = []
+        to_visit = [plan[0]["Plan"]]
+        while to_visit:
+            node = to_visit.pop()
+            nodes.append(node["Node Type"])
+            to_visit.extend(node.get("Plans", []))
+        return nodes
+
+    def assertIndexedPlan(self, url):
+        response, queries = self.get_example_queries(url)
+        self.assertTrue(queries, f"No queries on the examples for {url}")
+        for sql in queries:
+            nodes = self.get_plan_nodes(sql)
+            self.assertNotIn("Seq Scan", nodes, f"Seq scan for {url}: {sql}")
+            self.assertNotIn("Sort", nodes, f"Sort for {url}: {sql}")
+        return response
+
+    def test_list_plan(self):
+        """
+        Listing a page of examples uses the owner/ordering index
+        """
+        self.assertIndexedPlan("/api/v1/examples/?limit=3")
+        self.assertIndexedPlan("/api/v1/examples/?limit=3&page=3")
+
+    def test_cursor_plan(self):
+        """
+        Each page of the keyset pagination uses the owner/ordering index
+        """
+        response = self.assertIndexedPlan(
+            "/api/v1/examples/?pagination=cursor&limit=3&count=true"
+        )
+        response = self.assertIndexedPlan(response.data["pagination"]["next"])
+        self.assertIndexedPlan(response.data["pagination"]["previous"])
+
+    def test_filter_plan(self):
+        """
+        Filtering by email uses an index
+        """
+        self.assertIndexedPlan(
+            "/api/v1/examples/?limit=3&email=user1@testdomain.co.uk"
+        )
+
+    def test_retrieve_plan(self):
+        """
+        Getting a single example uses an index
+        """
+        example = ExampleDataTable.objects.filter(owner=self.user).first()
+        self.assertIndexedPlan(f"/api/v1/examples/{example.id}/")
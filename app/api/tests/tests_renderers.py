@@ -0,0 +1,128 @@
+import datetime
+import decimal
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils.translation import gettext_lazy as _
+from djangorestframework_camel_case.render import (
+    CamelCaseJSONRenderer as LibraryCamelCaseJSONRenderer,
+)
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from api.models import ExampleDataTable
+from api.serializers import ExampleDataTableSerializer
+from app.renderers import CamelCaseJSONRenderer
+
+
+class CamelCaseJSONRendererTestCase(TestCase):
+    """
+    Check the project renderer gives exactly the same JSON as the
+    djangorestframework_camel_case renderer
+    """
+
+    def assertSameJSON(self, data, accepted_media_type=None):
+        expected = LibraryCamelCaseJSONRenderer().render(
+            data, accepted_media_type
+        )
+        rendered = CamelCaseJSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(rendered, expected)
+        return rendered
+
+    def test_values(self):
+        self.assertSameJSON(
+            {
+                "snake_case_key": "value",
+                "already_camelCase": 1,
+                "key_2": True,
+                "_private": None,
+                "trailing_": "",
+                3: "integer key",
+                _("lazy_key"): _("lazy value"),
+                "nested_dict": {"inner_key": [{"list_key": "a b"}]},
+                "a_tuple": ("x_y", {"z_z": 1}),
+                "a_set": {1},
+                "unicode_text": "é😀\n\t\x00",
+                "big_int": 2**70,
+                "when_created": datetime.datetime(2024, 1, 2, 3, 4, 5, 678),
+                "on_date": datetime.date(2024, 1, 2),
+                "an_id": uuid.UUID(int=1),
+                "amount": decimal.Decimal("1.10"),
+            }
+        )
+
+    def test_orjson(self):
+        """
+        JSON without floats is encoded with orjson
+        """
+        with mock.patch.object(
+            CamelCaseJSONRenderer,
+            "render_orjson",
+            autospec=True,
+            side_effect=CamelCaseJSONRenderer.render_orjson,
+        ) as render_orjson:
+            self.assertSameJSON({"some_key": [1, "a"]})
+            render_orjson.assert_called_once()
+
+            self.assertSameJSON({"some_key": 1.5})
+            render_orjson.assert_called_once()
+
+    def test_floats(self):
+        self.assertSameJSON({"small_float": 1e-7, "big_float": 1e16})
+        self.assertSameJSON([0.1, -0.0, 123456789.125])
+
+    def test_indent(self):
+        rendered = self.assertSameJSON(
+            {"some_key": [1, 2]}, "application/json; indent=2"
+        )
+        self.assertIn(b"\n", rendered)
+
+    def test_empty(self):
+        self.assertSameJSON(None)
+        self.assertSameJSON({})
+        self.assertSameJSON([])
+
+    def test_examples(self):
+        """
+        The examples list, paginated and not, is rendered the same
+        """
+        if len(settings.ALLOWED_EMAIL_DOMAINS) > 0:
+            allowed_domain = settings.ALLOWED_EMAIL_DOMAINS[0]
+        else:
+            allowed_domain = "example"
+
+        user = CustomUser.objects.create_user(
+            email=f"test@{allowed_domain}.co.uk",
+            password="123ABC456cde",
+            first_name="Test",
+            last_name="123",
+            is_active=True,
+        )
+        for i in range(5):
+            ExampleDataTable.objects.create(
+                name=f"Person {i}",
+                email=f"user{i}@testdomain.co.uk",
+                message=f"Test Message from user {i}",
+                owner=user,
+            )
+        serializer = ExampleDataTableSerializer(
+            ExampleDataTable.objects.all(), many=True
+        )
+        self.assertSameJSON(serializer.data)
+        self.assertSameJSON(
+            ExampleDataTableSerializer(ExampleDataTable.objects.first()).data
+        )
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION="Token " + AuthToken.objects.create(user)[1]
+        )
+        response = client.get("/api/v1/examples/", {"limit": 2, "page": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content,
+            LibraryCamelCaseJSONRenderer().render(response.data),
+        )
@@ -0,0 +1,18 @@
+from django.test import override_settings
+from django.urls import include, path
+from rest_framework import routers
+
+from accounts.api import UserAPI
+from api.api import ExampleDataTableViewSet
+
+# The API views dispatched asynchronously, as they are under ASGI. Use with
+# @override_settings(ROOT_URLCONF="api.tests.urls_async")
+
+with override_settings(ASYNC_API_VIEWS=True):
+    router = routers.DefaultRouter()
+    router.register("examples", ExampleDataTableViewSet, "examples")
+
+    urlpatterns = [
+        path("api/v1/", include(router.urls)),
+        path("api/v1/auth/user", UserAPI.as_view()),
+    ]
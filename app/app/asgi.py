@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+# Dispatch the API views on the event loop (see app/views.py)
+os.environ.setdefault("ASYNC_API_VIEWS", "true")
 
 application = get_asgi_application()
@@ -0,0 +1,162 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from app.versions import aget_versions, get_versions
+
+# Conditional GET and response caching for the current user's data.
+# The ETag for a response is built from the user's version stamp (see
+# app.versions) and the requested URL, so it changes whenever the user's data
+# does. When the client already has the current version (If-None-Match),
+# a 304 is returned without querying the data. The rendered body can also be
+# cached against the ETag, so that new requests for unchanged data don't need
+# to query or serialize it either.
+# If the response also depends on other data about the user (e.g. a search
+# that matches their profile), include the versions for that data with
+# `depends_on`.
+
+
+def get_etag(request, namespace, version):
+    """
+    The ETag for the current user's data in the namespace, for this request
+    """
+    key = (
+        f"{namespace}:{request.user.pk}:{version}:"
+        f"{request.build_absolute_uri()}:{request.accepted_media_type}"
+    )
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+def etag_matches(request, etag):
+    """
+    Whether the client already has the response with the ETag
+    """
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    # Compression may have marked the ETag as weak, which still matches
+    return "*" in etags or etag in (e.removeprefix("W/") for e in etags)
+
+
+class VersionedResponse:
+    """
+    The ETag and cached response for a request
+    """
+
+    def __init__(self, request, namespace, version, timeout=None):
+        self.request = request
+        self.etag = get_etag(request, namespace, version)
+        self.headers = {
+            "ETag": self.etag,
+            "Cache-Control": "private, no-cache",
+        }
+        self.cache_key = f"response:{self.etag}"
+        self.cache_timeout = (
+            settings.API_RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+        )
+        # Only cache the JSON (rather than e.g. the browsable API)
+        self.cache_body = bool(self.cache_timeout) and isinstance(
+            request.accepted_renderer, JSONRenderer
+        )
+
+    def not_modified(self):
+        """
+        A 304 response if the client already has this version, else None
+        """
+        if etag_matches(self.request, self.etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=self.headers
+            )
+        return None
+
+    def cached_response(self, cached):
+        """
+        The response from the cached body, or None if there isn't one
+        """
+        if cached is None:
+            return None
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+        for header, value in self.headers.items():
+            response[header] = value
+        return response
+
+    def finalize(self, response):
+        """
+        Add the ETag to the view's response, and cache it once rendered
+        """
+        if response.status_code != status.HTTP_200_OK:
+            return response
+
+        for header, value in self.headers.items():
+            response[header] = value
+        if self.cache_body:
+
+            def cache_response(response):
+                cache.set(
+                    self.cache_key,
+                    (response.content, response["Content-Type"]),
+                    self.cache_timeout,
+                )
+
+            response.add_post_render_callback(cache_response)
+        return response
+
+
+def versioned_response(namespace, timeout=None, depends_on=()):
+    """
+    Add an ETag to the view's responses, returning a 304 when the client
+    already has the current version, and cache the rendered JSON for
+    `timeout` seconds (API_RESPONSE_CACHE_TIMEOUT by default, and not cached
+    when this is 0). This works with both sync and async view methods.
+
+    The responses also change with the user's versions for the namespaces
+    in `depends_on`.
+    """
+    namespaces = (namespace, *depends_on)
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+
+            @wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                version = await aget_versions(namespaces, request.user.pk)
+                versioned = VersionedResponse(
+                    request, namespace, version, timeout
+                )
+                response = versioned.not_modified()
+                if response is None and versioned.cache_body:
+                    cached = await cache.aget(versioned.cache_key)
+                    response = versioned.cached_response(cached)
+                if response is not None:
+                    return response
+                return versioned.finalize(
+                    await method(self, request, *args, **kwargs)
+                )
+
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            version = get_versions(namespaces, request.user.pk)
+            versioned = VersionedResponse(request, namespace, version, timeout)
+            response = versioned.not_modified()
+            if response is None and versioned.cache_body:
+                cached = cache.get(versioned.cache_key)
+                response = versioned.cached_response(cached)
+            if response is not None:
+                return response
+            return versioned.finalize(method(self, request, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
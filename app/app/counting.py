@@ -0,0 +1,133 @@
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connections
+
+from app.versions import aget_versions, get_versions
+
+# Strategies for counting the rows in a paginated queryset.
+# An exact COUNT(*) has to visit every row in the filtered queryset, so on
+# large data sets it can be as expensive as fetching the page itself. These
+# provide alternatives which can be set as the `count_strategy` on a view, or
+# wrapped within each other e.g. CachedCount("examples", EstimatedCount()).
+# Each has an `acount` method for counting from async views.
+
+
+class ApproximateCount(int):
+    """
+    A count that is an estimate rather than an exact figure
+    """
+
+
+class ExactCount:
+    """
+    Count the rows exactly using COUNT(*)
+    """
+
+    def count(self, queryset, request=None):
+        return queryset.count()
+
+    async def acount(self, queryset, request=None):
+        return await queryset.acount()
+
+
+class EstimatedCount:
+    """
+    Use the Postgres planner estimate for the number of rows when it is above
+    the threshold, otherwise count the rows exactly. This means small result
+    sets are still accurate, but large ones only cost an EXPLAIN.
+
+    On other databases this falls back to an exact count.
+    """
+
+    def __init__(self, threshold=10000):
+        self.threshold = threshold
+
+    def count(self, queryset, request=None):
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < self.threshold:
+            return queryset.count()
+        return ApproximateCount(estimate)
+
+    async def acount(self, queryset, request=None):
+        estimate = None
+        if connections[queryset.db].vendor == "postgresql":
+            # There is no async cursor, so EXPLAIN in a thread
+            estimate = await sync_to_async(self.estimate)(queryset)
+        if estimate is None or estimate < self.threshold:
+            return await queryset.acount()
+        return ApproximateCount(estimate)
+
+    def estimate(self, queryset):
+        """
+        The number of rows the planner expects the queryset to return
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        # Ordering doesn't affect the number of rows
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CachedCount:
+    """
+    Cache the result of another count strategy per user and set of query
+    parameters. The cached counts are invalidated by bumping the version for
+    the namespace and user (see app.versions), which should be done whenever
+    rows belonging to that user are created, changed or deleted. If the
+    count also depends on other data about the user (e.g. a search that
+    matches their profile), include the namespaces for it in `depends_on`.
+    """
+
+    # Query parameters that change which page is shown, but not the count
+    ignored_query_params = ("page", "limit", "cursor", "count")
+
+    def __init__(self, namespace, strategy=None, timeout=300, depends_on=()):
+        self.namespace = namespace
+        self.namespaces = (namespace, *depends_on)
+        self.strategy = strategy or ExactCount()
+        self.timeout = timeout
+
+    def count(self, queryset, request=None):
+        if request is None or not request.user.is_authenticated:
+            return self.strategy.count(queryset, request)
+
+        version = get_versions(self.namespaces, request.user.pk)
+        key = self.get_cache_key(request, version)
+        result = cache.get(key)
+        if result is None:
+            result = self.strategy.count(queryset, request)
+            cache.set(key, result, self.timeout)
+        return result
+
+    async def acount(self, queryset, request=None):
+        if request is None or not request.user.is_authenticated:
+            return await self.strategy.acount(queryset, request)
+
+        version = await aget_versions(self.namespaces, request.user.pk)
+        key = self.get_cache_key(request, version)
+        result = await cache.aget(key)
+        if result is None:
+            result = await self.strategy.acount(queryset, request)
+            await cache.aset(key, result, self.timeout)
+        return result
+
+    def get_cache_key(self, request, version):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            if key not in self.ignored_query_params
+            for value in values
+        )
+        digest = hashlib.md5(
+            json.dumps(params).encode(), usedforsecurity=False
+        ).hexdigest()
+        return f"count:{self.namespace}:{request.user.pk}:{version}:{digest}"
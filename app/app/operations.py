@@ -0,0 +1,46 @@
+from django.contrib.postgres.indexes import PostgresIndex
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db.migrations import AddIndex
+
+# Custom migration operations.
+# The app is set up to use Postgres, but these allow the migrations to still
+# run if a different database engine is used (e.g. sqlite for local
+# development).
+
+
+class PortableAddIndexConcurrently(AddIndexConcurrently):
+    """
+    Create an index using CREATE INDEX CONCURRENTLY on Postgres, so that the
+    table isn't locked against writes while the index is built.
+
+    On other databases, the index is created normally, or skipped if it is a
+    Postgres specific index type (e.g. GinIndex).
+
+    As with AddIndexConcurrently, the migration must set atomic = False.
+    """
+
+    def database_forwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        if isinstance(self.index, PostgresIndex):
+            return
+        return AddIndex.database_forwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        if isinstance(self.index, PostgresIndex):
+            return
+        return AddIndex.database_backwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
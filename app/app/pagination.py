@@ -1,5 +1,20 @@
+import base64
+import json
+import math
+from functools import partial, reduce
+from operator import or_
+from types import SimpleNamespace
+
+from django.core.paginator import EmptyPage, InvalidPage, Page
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from app.counting import ApproximateCount, ExactCount
 
 # This defines how API requests are paginated i.e. split up.
 # There are several default pagination classes available, but this one has
@@ -7,8 +22,146 @@ from rest_framework.response import Response
 # https://docs.djangoproject.com/en/3.1/topics/pagination/
 
 
+class CountStrategyPaginator(DjangoPaginator):
+    """
+    Django paginator which counts the rows using a count strategy (see
+    app.counting) rather than always running COUNT(*)
+    """
+
+    def __init__(self, *args, count_strategy, request=None, **kwargs):
+        self.count_strategy = count_strategy
+        self.request = request
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        return self.count_strategy.count(self.object_list, self.request)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # An estimated count may be too low, so don't stop the user
+            # moving past the estimated last page
+            if self.is_approximate and int(number) > 1:
+                return int(number)
+            raise
+
+    @property
+    def is_approximate(self):
+        return isinstance(self.count, ApproximateCount)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom, top = self.get_bounds(number)
+        return self.build_page(self.object_list[bottom:top], number)
+
+    def get_bounds(self, number):
+        """
+        The slice of the rows to fetch for the page
+        """
+        bottom = (number - 1) * self.per_page
+        if self.is_approximate:
+            # The real count may be above the estimate, so don't stop at it.
+            # Fetch one extra row to know whether there is a following page.
+            return bottom, bottom + self.per_page + 1
+        # As Paginator.page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        return bottom, top
+
+    def build_page(self, object_list, number):
+        """
+        Build the page from the rows fetched for the slice from get_bounds
+        """
+        if not self.is_approximate:
+            return self._get_page(object_list, number, self)
+        object_list = list(object_list)
+        if not object_list and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return ApproximatePage(
+            object_list[: self.per_page],
+            number,
+            self,
+            has_following=len(object_list) > self.per_page,
+        )
+
+
+class ApproximatePage(Page):
+    """
+    A page from a paginator with an approximate count, where whether there is
+    a following page comes from the rows rather than the count
+    """
+
+    def __init__(self, object_list, number, paginator, has_following):
+        super().__init__(object_list, number, paginator)
+        self.has_following = has_following
+
+    def has_next(self):
+        return self.has_following
+
+
+def get_count_strategy(paginator, view):
+    """
+    The count strategy set on the view, or the paginator's default
+    """
+    return getattr(view, "count_strategy", None) or paginator.count_strategy
+
+
 class CustomPagination(pagination.PageNumberPagination):
     page_size_query_param = "limit"
+    # How the total number of rows is calculated. This can be overridden by
+    # setting `count_strategy` on the view.
+    count_strategy = ExactCount()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CountStrategyPaginator,
+            count_strategy=get_count_strategy(self, view),
+            request=request,
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        As paginate_queryset, for async views
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        count_strategy = get_count_strategy(self, view)
+        paginator = CountStrategyPaginator(
+            queryset, page_size, count_strategy=count_strategy, request=request
+        )
+        # Count first, so that the paginator doesn't need to
+        paginator.count = await count_strategy.acount(queryset, request)
+
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        # As CountStrategyPaginator.page
+        bottom, top = paginator.get_bounds(number)
+        object_list = [row async for row in queryset[bottom:top]]
+        try:
+            self.page = paginator.build_page(object_list, number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
 
     def get_paginated_response(self, data):
         return Response(
@@ -18,9 +171,231 @@ class CustomPagination(pagination.PageNumberPagination):
                     "next": self.get_next_link(),
                     "count": self.page.paginator.count,
                     "current_page": self.page.number,
-                    "total_pages": self.page.paginator.num_pages,
+                    # The estimated count may be below the current page
+                    "total_pages": max(
+                        self.page.paginator.num_pages, self.page.number
+                    ),
                     "items_on_page": len(data),
                 },
                 "results": data,
             }
         )
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor (keyset) based pagination.
+
+    Rather than using OFFSET to skip to a page, the position of the last row
+    on the current page is encoded in an opaque cursor, and the next page is
+    fetched with a WHERE clause on the ordering fields. This means that deep
+    pages cost the same as the first one.
+
+    The response uses the same envelope as `CustomPagination` so the frontend
+    can consume either. As counting the rows is what makes deep pages slow,
+    the count is only calculated when requested with ?count=true, otherwise
+    `count`, `current_page` and `total_pages` are returned as null.
+
+    The ordering fields must be non-nullable, and should end with a unique
+    field so that every row has a distinct position. When paginating rows
+    read with `.values()`, the ordering fields must be included.
+    """
+
+    page_size = None
+    page_size_query_param = "limit"
+    max_page_size = None
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+    # Matches ExampleDataTable.Meta.ordering, with the pk as a tie-breaker
+    ordering = ("-created_at", "name", "id")
+    # How the total number of rows is calculated when it is requested
+    count_strategy = ExactCount()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        position = self.setup(queryset, request)
+        # Only count when asked to - this is the expensive part
+        self.count = None
+        if self.count_requested(request):
+            self.count = get_count_strategy(self, view).count(
+                queryset, request
+            )
+
+        # Fetch one extra row to know whether there is a following page
+        queryset = self.get_page_queryset(queryset, position)
+        return self.set_page(list(queryset[: self.page_size + 1]), position)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        As paginate_queryset, for async views
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        position = self.setup(queryset, request)
+        self.count = None
+        if self.count_requested(request):
+            self.count = await get_count_strategy(self, view).acount(
+                queryset, request
+            )
+
+        queryset = self.get_page_queryset(queryset, position)
+        results = [row async for row in queryset[: self.page_size + 1]]
+        return self.set_page(results, position)
+
+    def setup(self, queryset, request):
+        """
+        Store the details of the request, returning the cursor position
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.reverse, position = self.decode_cursor(request)
+        return position
+
+    def count_requested(self, request):
+        return self.count_query_param in request.query_params and (
+            request.query_params[self.count_query_param].lower()
+            in ("true", "1")
+        )
+
+    def get_page_queryset(self, queryset, position):
+        """
+        The rows following the position, in order
+        """
+        # When going backwards, walk the ordering in reverse and flip the
+        # results afterwards
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        return queryset
+
+    def set_page(self, results, position):
+        """
+        Set the page from the results (which include one extra row if there
+        is a following page)
+        """
+        self.has_following = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_next = position is not None
+            self.has_previous = self.has_following
+        else:
+            self.has_next = self.has_following
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return pagination._positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        total_pages = None
+        if self.count is not None:
+            total_pages = max(math.ceil(self.count / self.page_size), 1)
+        return Response(
+            {
+                "pagination": {
+                    "previous": self.get_previous_link(),
+                    "next": self.get_next_link(),
+                    "count": self.count,
+                    "current_page": None,
+                    "total_pages": total_pages,
+                    "items_on_page": len(data),
+                },
+                "results": data,
+            }
+        )
+
+    def decode_cursor(self, request):
+        """
+        Return a tuple of (reverse, position) from the cursor in the request
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = data["p"]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self._get_field(field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return bool(data.get("r")), position
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        """
+        Build the link to the page either side of the given instance
+        """
+        # Rows read with .values() are dicts
+        if isinstance(instance, dict):
+            instance = SimpleNamespace(**instance)
+        data = {
+            "p": [
+                self._get_field(field).value_to_string(instance)
+                for field in self.ordering
+            ],
+            "r": int(reverse),
+        }
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(",", ":")).encode()
+        ).decode()
+        url = remove_query_param(self.base_url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _get_field(self, field):
+        return self.model._meta.get_field(field.lstrip("-"))
+
+    def _after(self, ordering, position):
+        """
+        Build the filter for all rows that come after the position, i.e.
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        """
+        conditions = []
+        for i, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = {
+                previous.lstrip("-"): value
+                for previous, value in zip(ordering[:i], position[:i])
+            }
+            condition[f"{field.lstrip('-')}__{lookup}"] = position[i]
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
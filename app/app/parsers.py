@@ -0,0 +1,134 @@
+import json
+import re
+from functools import lru_cache
+
+import orjson
+from django.conf import settings
+from djangorestframework_camel_case.settings import api_settings
+from djangorestframework_camel_case.util import get_underscoreize_re
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import JSONParser
+
+# Numbers that may be outside the 64 bit integer range, which orjson loads as
+# floats instead (e.g. -9223372036854775809). Any number of 19 or more digits
+# is left to the json module, as is anything this long in a string, which is
+# harmless.
+LONG_NUMBER_RE = re.compile(rb"\d{19}")
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Request body is too large."
+    default_code = "request_too_large"
+
+
+@lru_cache(maxsize=4096)
+def underscoreize_key(key, no_underscore_before_number=False):
+    """
+    The snake_case version of the key, as converted by
+    djangorestframework_camel_case
+    """
+    underscoreize_re = get_underscoreize_re(
+        {"no_underscore_before_number": no_underscore_before_number}
+    )
+    return underscoreize_re.sub(r"\1_\2", key).lower()
+
+
+def underscoreize(
+    data,
+    no_underscore_before_number=False,
+    ignore_fields=None,
+    ignore_keys=None,
+):
+    """
+    Convert the keys in the parsed JSON to snake_case, giving the same result
+    as djangorestframework_camel_case's underscoreize
+    """
+    ignore_fields = ignore_fields or ()
+    ignore_keys = ignore_keys or ()
+
+    def convert(data):
+        if isinstance(data, dict):
+            new_dict = {}
+            for key, value in data.items():
+                new_key = underscoreize_key(key, no_underscore_before_number)
+                if key not in ignore_fields and new_key not in ignore_fields:
+                    value = convert(value)
+                if key in ignore_keys or new_key in ignore_keys:
+                    new_dict[key] = value
+                else:
+                    new_dict[new_key] = value
+            return new_dict
+        if isinstance(data, list):
+            return [convert(item) for item in data]
+        return data
+
+    return convert(data)
+
+
+def read_limited(stream, request=None, chunk_size=64 * 1024):
+    """
+    Read the body, raising RequestTooLarge as soon as it is more than
+    DATA_UPLOAD_MAX_MEMORY_SIZE, rather than reading all of it first
+    """
+    max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if max_size is None:
+        return stream.read()
+
+    if request is not None:
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > max_size:
+            raise RequestTooLarge()
+
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise RequestTooLarge()
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class CamelCaseJSONParser(JSONParser):
+    """
+    Parses the same data as djangorestframework_camel_case's parser, but
+    quicker.
+
+    The snake_case version of each key is cached (up to a limit), and the
+    JSON is loaded with orjson. Anything orjson can't load the same way (e.g.
+    NaN, very large integers) or rejects is loaded with the standard json
+    module instead, so the result and any errors are the same.
+
+    Bodies larger than DATA_UPLOAD_MAX_MEMORY_SIZE are rejected while they
+    are being read.
+    """
+
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        body = read_limited(stream, parser_context.get("request"))
+
+        try:
+            data = self.loads(body, encoding)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+        return underscoreize(data, **self.json_underscoreize)
+
+    def loads(self, body, encoding):
+        is_utf8 = encoding.lower().replace("-", "") == "utf8"
+        if is_utf8 and not LONG_NUMBER_RE.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(body.decode(encoding))
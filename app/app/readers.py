@@ -0,0 +1,185 @@
+from functools import lru_cache
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Serializer fields whose representation of a database value is the value
+# itself, so they can be passed straight through
+PLAIN_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# strftime directives that can be formatted from the datetime's attributes,
+# which is much quicker than calling strftime for each value
+DATETIME_DIRECTIVES = {
+    "Y": ("%d", "year"),
+    "m": ("%02d", "month"),
+    "d": ("%02d", "day"),
+    "H": ("%02d", "hour"),
+    "M": ("%02d", "minute"),
+    "S": ("%02d", "second"),
+    "f": ("%06d", "microsecond"),
+}
+
+# Cached readers for each serializer class
+readers = {}
+
+
+@lru_cache(maxsize=None)
+def compile_datetime_format(output_format):
+    """
+    Convert the strftime format to a %-format template and a function to get
+    the datetime attributes for it, or None if any directives aren't supported
+    """
+    template = []
+    attributes = []
+    parts = iter(output_format)
+    for char in parts:
+        if char != "%":
+            template.append(char)
+            continue
+        directive = next(parts, "")
+        if directive == "%":
+            template.append("%%")
+        elif directive in DATETIME_DIRECTIVES:
+            spec, attribute = DATETIME_DIRECTIVES[directive]
+            template.append(spec)
+            attributes.append(attribute)
+        else:
+            return None
+    if not attributes:
+        return None
+    return "".join(template), attrgetter(*attributes)
+
+
+def format_datetimes(field, values):
+    """
+    Format a column of datetimes as the serializer field would
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() == ISO_8601:
+        return [field.to_representation(value) for value in values]
+
+    # The timezone is the same for the whole column, so only convert the
+    # values when they need it
+    field_timezone = (
+        field.timezone
+        if hasattr(field, "timezone")
+        else field.default_timezone()
+    )
+    if field_timezone is not None or any(
+        value and timezone.is_aware(value) for value in values
+    ):
+        enforce_timezone = field.enforce_timezone
+        values = [
+            enforce_timezone(value) if value else None for value in values
+        ]
+
+    compiled = compile_datetime_format(output_format)
+    if compiled is None:
+        return [
+            value.strftime(output_format) if value else None
+            for value in values
+        ]
+    # strftime doesn't pad years before 1000 the same way on every platform
+    template, get_attributes = compiled
+    return [
+        (
+            (
+                template % get_attributes(value)
+                if value.year >= 1000
+                else value.strftime(output_format)
+            )
+            if value
+            else None
+        )
+        for value in values
+    ]
+
+
+class ValuesReader:
+    """
+    Reads the fields of a model serializer straight from the database as
+    values, and formats them as the serializer would.
+
+    This skips building model instances and calling each field's
+    `to_representation` for every row, which is most of the cost of
+    serializing a list. The values are formatted a column at a time instead.
+
+    Only serializers made up of simple model fields are supported - use
+    `get_values_reader` to get the reader, which is None otherwise.
+    """
+
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        self.field_names = []
+        self.attnames = []
+        self.formatters = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == "*" or "." in field.source:
+                raise ValueError(f"Unsupported field source: {field.source}")
+            model_field = model._meta.get_field(field.source)
+            if isinstance(field, serializers.DateTimeField):
+                formatter = format_datetimes
+            elif isinstance(field, PLAIN_FIELDS) and not (
+                isinstance(field, serializers.PrimaryKeyRelatedField)
+                and field.pk_field is not None
+            ):
+                formatter = None
+            else:
+                raise ValueError(f"Unsupported field type: {type(field)}")
+            self.field_names.append(name)
+            self.attnames.append(model_field.attname)
+            self.formatters.append((field, formatter))
+
+    def values(self, queryset):
+        """
+        Fetch just the values needed, as dicts
+        """
+        return queryset.values(*self.attnames)
+
+    def format_columns(self, columns):
+        """
+        Format the columns of values, in the order of `attnames`
+        """
+        return [
+            column if formatter is None else formatter(field, column)
+            for (field, formatter), column in zip(self.formatters, columns)
+        ]
+
+    def format_rows(self, rows):
+        """
+        Format the rows, as tuples of values in the order of `attnames`
+        """
+        if not rows:
+            return []
+        return list(zip(*self.format_columns(list(zip(*rows)))))
+
+    def to_representation(self, rows):
+        """
+        The serialized data for the rows (dicts) fetched by `values`
+        """
+        columns = self.format_columns(
+            [[row[attname] for row in rows] for attname in self.attnames]
+        )
+        field_names = self.field_names
+        return [dict(zip(field_names, row)) for row in zip(*columns)]
+
+
+def get_values_reader(serializer_class):
+    """
+    The values reader for the serializer, or None if it isn't supported
+    """
+    if serializer_class not in readers:
+        try:
+            readers[serializer_class] = ValuesReader(serializer_class)
+        except (AttributeError, ValueError, FieldDoesNotExist):
+            readers[serializer_class] = None
+    return readers[serializer_class]
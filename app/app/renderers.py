@@ -0,0 +1,175 @@
+import re
+from functools import lru_cache
+
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case.settings import api_settings
+from djangorestframework_camel_case.util import (
+    camelize_re,
+    is_iterable,
+    underscore_to_camel,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+# Values that never need converting, checked by type for speed
+SCALAR_TYPES = (str, int, bool, type(None))
+
+# The camelCase keys for the fields of each serializer class
+serializer_keys = {}
+
+
+@lru_cache(maxsize=4096)
+def camelize_key(key):
+    """
+    The camelCase version of the key, as converted by
+    djangorestframework_camel_case
+    """
+    if "_" not in key:
+        return key
+    return re.sub(camelize_re, underscore_to_camel, key)
+
+
+def get_serializer_keys(serializer):
+    """
+    The camelCase keys for the serializer's fields, worked out once for each
+    serializer class
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    serializer_class = type(serializer)
+    if serializer_class not in serializer_keys:
+        serializer_keys[serializer_class] = {
+            name: camelize_key(name) for name in serializer.fields
+        }
+    return serializer_keys[serializer_class]
+
+
+def camelize(data, ignore_fields=None, ignore_keys=None):
+    """
+    Convert the keys in the data to camelCase, giving the same result as
+    djangorestframework_camel_case's camelize.
+
+    Each key is only converted once per call and then looked up, starting
+    with the fields of any serializers the data came from.
+
+    Returns the converted data, and whether it may contain floats.
+    """
+    keys = {}
+    serializer_classes = set()
+    ignore_fields = ignore_fields or ()
+    ignore_keys = ignore_keys or ()
+    has_floats = False
+
+    def convert(data):
+        nonlocal has_floats
+        data_type = type(data)
+        if data_type in SCALAR_TYPES:
+            return data
+        if data_type is float:
+            has_floats = True
+            return data
+        if data_type is ReturnDict or data_type is ReturnList:
+            serializer = data.serializer
+            if (
+                serializer is not None
+                and type(serializer) not in serializer_classes
+            ):
+                serializer_classes.add(type(serializer))
+                keys.update(get_serializer_keys(serializer))
+        if isinstance(data, Promise):
+            data = force_str(data)
+        if isinstance(data, dict):
+            new_dict = {}
+            for key, value in data.items():
+                if isinstance(key, Promise):
+                    key = force_str(key)
+                if isinstance(key, str):
+                    new_key = keys.get(key)
+                    if new_key is None:
+                        new_key = keys[key] = camelize_key(key)
+                else:
+                    new_key = key
+
+                if key not in ignore_fields and new_key not in ignore_fields:
+                    value = convert(value)
+                elif not isinstance(value, SCALAR_TYPES):
+                    # Not checked, so may contain floats
+                    has_floats = True
+                if key in ignore_keys or new_key in ignore_keys:
+                    new_dict[key] = value
+                else:
+                    new_dict[new_key] = value
+            return new_dict
+        if isinstance(data, str):
+            return data
+        if isinstance(data, float):
+            has_floats = True
+            return data
+        if isinstance(data, (list, tuple)) or is_iterable(data):
+            return [convert(item) for item in data]
+        return data
+
+    return convert(data), has_floats
+
+
+class CamelCaseJSONRenderer(JSONRenderer):
+    """
+    Renders the same JSON as djangorestframework_camel_case's renderer, but
+    quicker.
+
+    The camelCase version of each key is worked out once (rather than running
+    a regex on every key of every row), and the JSON is encoded with orjson.
+    orjson formats floats differently, so responses including floats (or
+    anything else orjson can't encode the same way) are encoded with the
+    standard json module instead.
+    """
+
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        data, has_floats = camelize(
+            data,
+            ignore_fields=self.json_underscoreize.get("ignore_fields"),
+            ignore_keys=self.json_underscoreize.get("ignore_keys"),
+        )
+
+        if (
+            data is not None
+            and not has_floats
+            and self.compact
+            and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context or {})
+            is None
+        ):
+            try:
+                return self.render_orjson(data)
+            except orjson.JSONEncodeError:
+                pass
+
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def render_orjson(self, data):
+        encoder = self.encoder_class()
+
+        def default(obj):
+            value = encoder.default(obj)
+            # Anything other than a string (e.g. decimals as floats) may be
+            # formatted differently, so is left to the json module
+            if not isinstance(value, str):
+                raise TypeError
+            return value
+
+        ret = orjson.dumps(
+            data,
+            default=default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS,
+        )
+        # As the JSONRenderer, escape the characters that aren't valid in
+        # javascript strings
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -14,6 +14,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Useful feature to quickly switch betwen development and production settings
 ENVIRONMENT_DESCRIPTION = os.environ.get("ENVIRONMENT_DESCRIPTION", "DEV")
 PRODUCTION_MODE = ENVIRONMENT_DESCRIPTION == "PROD"
@@ -75,6 +77,8 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # Postgres specific features e.g. full text search
+    "django.contrib.postgres",
     # Rest framework
     "rest_framework",
     # Knox (login/authentication with tokens)
@@ -90,7 +94,10 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("knox.auth.TokenAuthentication",),
+    # Knox token authentication, with validated tokens cached
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "accounts.auth.CachedTokenAuthentication",
+    ),
     "DATETIME_FORMAT": "%d/%m/%Y %H:%M:%S",
     # Details on filtering can be found here:
     # https://www.django-rest-framework.org/api-guide/filtering/
@@ -101,15 +108,29 @@ REST_FRAMEWORK = {
     "SEARCH_PARAM": "search",
     "ORDERING_PARAM": "ordering",
     # Convert snake_case from python style, to react camelCase, and vice versa
+    # The JSON renderer and parser give the same results as
+    # djangorestframework_camel_case but are quicker (see app/renderers.py and
+    # app/parsers.py)
     "DEFAULT_RENDERER_CLASSES": (
-        "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
+        "app.renderers.CamelCaseJSONRenderer",
         "djangorestframework_camel_case.render.CamelCaseBrowsableAPIRenderer",
     ),
     "DEFAULT_PARSER_CLASSES": (
         "djangorestframework_camel_case.parser.CamelCaseFormParser",
         "djangorestframework_camel_case.parser.CamelCaseMultiPartParser",
-        "djangorestframework_camel_case.parser.CamelCaseJSONParser",
+        "app.parsers.CamelCaseJSONParser",
     ),
+    # Limits on attempts to log in, register and reset passwords, for each IP
+    # address and each email address (see app/throttling.py)
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": "30/min",
+        "login_email": "10/min",
+        "register_ip": "10/hour",
+        "register_email": "5/hour",
+        "password_reset_ip": "10/hour",
+        "password_reset_email": "5/hour",
+        "password_reset_confirm_ip": "30/hour",
+    },
 }
 
 # Knox settings for token authentication
@@ -121,8 +142,32 @@ REST_KNOX = {
     "AUTO_REFRESH": True,
     # Max number of tokens per user
     "TOKEN_LIMIT_PER_USER": 1,
+    # Minimum number of seconds between writing a refreshed timeout
+    "MIN_REFRESH_INTERVAL": 60,
 }
 
+# Number of seconds a validated token is cached for, before it is checked
+# against the database again
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+
+# Expired tokens are deleted by the clear_expired_tokens command, this many
+# at a time. Set TOKEN_HOUSEKEEPING_INTERVAL to a number of seconds to also
+# delete them that often in the background of the web workers (see
+# accounts/housekeeping.py).
+TOKEN_HOUSEKEEPING_BATCH_SIZE = 1000
+TOKEN_HOUSEKEEPING_INTERVAL = int(
+    os.environ.get("TOKEN_HOUSEKEEPING_INTERVAL", 0)
+)
+
+# Number of seconds the authenticated user's details are cached for, and the
+# most users cached in each process (see accounts/user_cache.py)
+USER_CACHE_TIMEOUT = 300
+USER_CACHE_SIZE = 1000
+
+# Number of seconds a rendered API response is cached for, for views using
+# app.caching.versioned_response (0 to only use ETags)
+API_RESPONSE_CACHE_TIMEOUT = 300
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -140,6 +185,10 @@ ROOT_URLCONF = "app.urls"
 # makes Django use this as the user model
 AUTH_USER_MODEL = "accounts.CustomUser"
 
+# As Django's ModelBackend, letting the login tell why authentication failed
+# without looking the user up again (see accounts/backends.py)
+AUTHENTICATION_BACKENDS = ["accounts.backends.EmailBackend"]
+
 # Places to find templates
 TEMPLATES = [
     {
@@ -166,6 +215,21 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Use with Postgres to specify a default schema
 DEFAULT_SCHEMA = "application"
 
+# The lifetime of a database connection, from DATABASE_CONN_MAX_AGE: a
+# number of seconds, or "None" to keep them open indefinitely
+database_conn_max_age = os.environ.get("DATABASE_CONN_MAX_AGE", "")
+if not database_conn_max_age:
+    conn_max_age = 60
+elif database_conn_max_age == "None":
+    conn_max_age = None
+elif database_conn_max_age.isdigit():
+    conn_max_age = int(database_conn_max_age)
+else:
+    raise ImproperlyConfigured(
+        f"DATABASE_CONN_MAX_AGE must be a number of seconds or None, not "
+        f"{database_conn_max_age!r}"
+    )
+
 DATABASES = {
     "default": {
         # "ENGINE": ,
@@ -179,29 +243,99 @@ DATABASES = {
         "HOST": os.environ.get("DATABASE_HOST", ""),
         "PORT": os.environ.get("DATABASE_PORT", ""),
         # The lifetime of a database connection, as an integer of seconds.
-        "CONN_MAX_AGE": 0,
+        # Connections are kept open and reused between requests for this
+        # long, rather than opening (and setting the search path on) a new
+        # connection for every request. Use 0 to close them after each
+        # request, or None to keep them open indefinitely. When running under
+        # ASGI, use 0 with a DATABASE_POOL_MODE: async views run their queries
+        # on different threads, and a persistent connection is opened for
+        # each thread rather than being reused.
+        "CONN_MAX_AGE": conn_max_age,
+        # Check a persistent connection still works before reusing it for a
+        # new request, so that a dropped connection doesn't cause an error
+        "CONN_HEALTH_CHECKS": True,
         # Test settings
         "TEST": {"NAME": "test_development", "TEMPLATE": "template_test"},
     }
 }
 
+# Caching
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The local memory cache is separate for each process. If running with more
+# than one worker, use a shared cache (e.g. redis or memcached) so that cached
+# values are invalidated in every process.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Where the throttled attempts are counted (see app/throttling.py). With a
+# Redis cache, the counts are shared between workers in one round trip for
+# each attempt. Otherwise, they are counted separately in each process.
+THROTTLE_STORE = (
+    "app.throttling.RedisStore"
+    if CACHES["default"]["BACKEND"]
+    == "django.core.cache.backends.redis.RedisCache"
+    else "app.throttling.MemoryStore"
+)
+
+# Whether views using app.views.AsyncAPIViewMixin are dispatched on the event
+# loop. This is turned on by app/asgi.py, as it is only of use under ASGI.
+ASYNC_API_VIEWS = os.environ.get("ASYNC_API_VIEWS", "").lower() in (
+    "true",
+    "1",
+)
+
+# Database connection pooling
+# Set DATABASE_POOL_MODE to choose how connections are managed:
+# - "" (default): persistent connections, reused for CONN_MAX_AGE seconds
+# - "psycopg": an in-process connection pool for each worker process. This
+#   requires psycopg 3 with the pool extra (pip install "psycopg[pool]")
+# - "pgbouncer": connect through PgBouncer running in transaction mode
+# The pool size should be set per worker, so that the total across all
+# workers stays within the database's max_connections.
+DATABASE_POOL_MODE = os.environ.get("DATABASE_POOL_MODE", "")
+
+if DATABASE_POOL_MODE == "psycopg":
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", 4)),
+        # Seconds to wait for a free connection before raising an error
+        "timeout": int(os.environ.get("DATABASE_POOL_TIMEOUT", 10)),
+    }
+    # The pool manages the connection lifetime instead
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+elif DATABASE_POOL_MODE == "pgbouncer":
+    # PgBouncer keeps the server connections open, so by default the
+    # connection to it is closed after each request
+    if not database_conn_max_age:
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+    # Each transaction may run on a different server connection, so server
+    # side cursors (used by .iterator()) can't be used
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+    # PgBouncer doesn't pass the startup options on to the server, so the
+    # search path needs to be set on the database user instead:
+    # ALTER ROLE <user> SET search_path = application, public;
+    DATABASES["default"]["OPTIONS"] = {}
+elif DATABASE_POOL_MODE:
+    raise ImproperlyConfigured(
+        f"Unknown DATABASE_POOL_MODE {DATABASE_POOL_MODE!r}"
+    )
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
 AUTH_PASSWORD_VALIDATORS = [
     {
         # Sufficiently different to the username, email, first and last name
-        "NAME": (
-            "django.contrib.auth.password_validation"
-            ".UserAttributeSimilarityValidator"
-        ),
+        # As Django's, comparing the characters more quickly
+        "NAME": "app.validators.UserAttributeSimilarityValidator",
     },
     {
         # Not a common word/phrase/term
-        "NAME": (
-            "django.contrib.auth.password_validation"
-            ".CommonPasswordValidator"
-        ),
+        # As Django's, with the list loaded once per process
+        "NAME": "app.validators.CommonPasswordValidator",
     },
     {
         # Minimum Complexity
@@ -209,6 +343,15 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Number of processes used to hash passwords, so that hashing doesn't hold up
+# the request workers (see accounts/hashing.py). This is off unless set, so
+# passwords are hashed in the request as normal. The request waits for its
+# hash either way, so this only helps when the worker has other work to carry
+# on with in the meantime: under ASGI, or with threaded WSGI workers.
+# Each web worker process starts its own pool, so share the cores between
+# them e.g. with 8 cores and 4 web workers, use 2.
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 0))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -275,3 +418,24 @@ else:
     # EMAIL_FILE_PATH folder location.
     EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
     EMAIL_FILE_PATH = str(BASE_DIR.joinpath("sent_emails"))
+
+# Whether to queue emails to be sent in the background by the
+# send_queued_emails management command, rather than sending them during the
+# request. This is off when developing, so emails are sent straight away.
+EMAIL_USE_QUEUE = PRODUCTION_MODE
+# Number of emails sent in each batch (and transaction)
+EMAIL_QUEUE_BATCH_SIZE = 50
+# Number of times to try sending an email before giving up
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+# Seconds to wait before the first retry - this doubles after each failure
+EMAIL_QUEUE_RETRY_DELAY = 60
+# Seconds before an email left as sending (e.g. because the sender was stopped
+# part way through a batch) is put back in the queue. This may mean it is sent
+# twice, so should be well above the time taken to send a batch.
+EMAIL_QUEUE_CLAIM_TIMEOUT = 60 * 30
+# Seconds before the account activation email is re-sent, when an inactive
+# user tries to log in again
+ACCOUNT_ACTIVATION_RESEND_INTERVAL = 60 * 10
+# Seconds the link in the account activation email can be used for (three
+# days, as with Django's password reset links)
+ACCOUNT_ACTIVATION_TIMEOUT = 60 * 60 * 24 * 3
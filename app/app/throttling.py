@@ -0,0 +1,267 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+# Rate limiting for the login, registration and password reset endpoints.
+# Each attempt is counted against the client's IP address and the email
+# address it is for, so a burst of attempts is limited whether it comes from
+# one address or is spread over many. The rates are set for each scope and
+# identity in DEFAULT_THROTTLE_RATES (e.g. "login_ip" and "login_email").
+#
+# The attempts are counted with a sliding window: the count for the current
+# window, plus the previous window's count weighted by how much of it still
+# overlaps the last `duration` seconds. The counts are kept in THROTTLE_STORE:
+# RedisStore shares them between workers when the default cache is Redis,
+# otherwise MemoryStore keeps them in each process.
+
+# The stores in use, by import path
+stores = {}
+
+
+def get_store():
+    """
+    The store for the attempt counts set by THROTTLE_STORE
+    """
+    path = settings.THROTTLE_STORE
+    if path not in stores:
+        stores[path] = import_string(path)()
+    return stores[path]
+
+
+def hash_ident(ident):
+    if ident is None:
+        return None
+    return hashlib.md5(ident.encode(), usedforsecurity=False).hexdigest()
+
+
+def get_redis_client():
+    """
+    The Redis client behind the default cache, or None if it isn't Redis.
+
+    Django's RedisCache doesn't have a public way to run several commands in
+    one round trip, so this uses its private `_cache` attribute (as in Django
+    4.0 to 5.1), returning None if that changes.
+    """
+    if not isinstance(cache, RedisCache):
+        return None
+    get_client = getattr(getattr(cache, "_cache", None), "get_client", None)
+    if get_client is None:
+        return None
+    return get_client(write=True)
+
+
+class RedisStore:
+    """
+    Counts attempts in Redis (the default cache), so they are shared between
+    workers. Each request's counts are added to and read in a single
+    pipelined round trip.
+    """
+
+    def __init__(self):
+        if get_redis_client() is None:
+            raise ImproperlyConfigured(
+                "app.throttling.RedisStore requires the default cache to be "
+                "django.core.cache.backends.redis.RedisCache"
+            )
+
+    def hit(self, increments, keys):
+        """
+        Add one to each count in `increments` (a dict of the key and its
+        timeout), returning the new counts along with the counts for `keys`
+        """
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for key, timeout in increments.items():
+            key = cache.make_and_validate_key(key)
+            # Start the count (and its expiry) on the first attempt in the
+            # window, then add this attempt
+            pipeline.set(key, 0, ex=timeout, nx=True)
+            pipeline.incr(key)
+        if keys:
+            pipeline.mget([cache.make_and_validate_key(key) for key in keys])
+        results = pipeline.execute()
+
+        counts = dict(zip(increments, results[1 : len(increments) * 2 : 2]))
+        if keys:
+            counts.update(
+                (key, int(count))
+                for key, count in zip(keys, results[-1])
+                if count is not None
+            )
+        return counts
+
+    def undo(self, keys):
+        """
+        Take back the attempts added to the counts by `hit`
+        """
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for key in keys:
+            pipeline.decr(cache.make_and_validate_key(key))
+        pipeline.execute()
+
+
+class MemoryStore:
+    """
+    Counts attempts in memory, separately in each process. This is the
+    store when the default cache isn't Redis.
+
+    Expired counts are removed every `purge_interval` seconds, and only the
+    `max_size` most recently used counts are kept, so a burst of attempts
+    from many addresses can't use up the memory.
+    """
+
+    max_size = 10000
+    purge_interval = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = OrderedDict()
+        self.next_purge = 0
+
+    def hit(self, increments, keys):
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_purge:
+                self.purge(now)
+            counts = {
+                key: self.counts[key][0]
+                for key in keys
+                if key in self.counts and self.counts[key][1] > now
+            }
+            for key, timeout in increments.items():
+                count, expires = self.counts.get(key, (0, 0))
+                if expires <= now:
+                    count, expires = 0, now + timeout
+                self.counts[key] = (count + 1, expires)
+                self.counts.move_to_end(key)
+                counts[key] = count + 1
+            while len(self.counts) > self.max_size:
+                self.counts.popitem(last=False)
+        return counts
+
+    def purge(self, now):
+        """
+        Remove the expired counts
+        """
+        for key in [
+            key for key, (_, expires) in self.counts.items() if expires <= now
+        ]:
+            del self.counts[key]
+        self.next_purge = now + self.purge_interval
+
+    def undo(self, keys):
+        with self.lock:
+            for key in keys:
+                if key in self.counts:
+                    count, expires = self.counts[key]
+                    self.counts[key] = (count - 1, expires)
+
+    def clear(self):
+        with self.lock:
+            self.counts.clear()
+            self.next_purge = 0
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limits the attempts for each IP address and email address, using the
+    rates for the view's `throttle_scope`.
+
+    Each attempt is counted and checked with one call to the store for all
+    of the identities. Attempts which aren't allowed are then taken back off
+    the counts.
+    """
+
+    identities = ("ip", "email")
+    email_field = "email"
+    timer = time.time
+    parse_rate = SimpleRateThrottle.parse_rate
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return True
+
+        now = self.timer()
+        windows = []
+        for identity, ident in self.get_identities(request).items():
+            rate = api_settings.DEFAULT_THROTTLE_RATES.get(
+                f"{scope}_{identity}"
+            )
+            if not rate or ident is None:
+                continue
+            limit, duration = self.parse_rate(rate)
+            window = int(now // duration)
+            key = f"throttle:{scope}:{identity}:{ident}"
+            windows.append(
+                (f"{key}:{window - 1}", f"{key}:{window}", limit, duration)
+            )
+        if not windows:
+            return True
+
+        # Count this attempt while reading the counts, so it takes one trip
+        # to the store. Keep the counts until they are no longer the previous
+        # window.
+        store = get_store()
+        counts = store.hit(
+            {
+                current_key: duration * 2
+                for _, current_key, _, duration in windows
+            },
+            [previous_key for previous_key, *_ in windows],
+        )
+        self.wait_time = None
+        for previous_key, current_key, limit, duration in windows:
+            wait = self.get_wait(
+                counts.get(previous_key, 0),
+                # Not including this attempt
+                counts.get(current_key, 1) - 1,
+                limit,
+                duration,
+                now,
+            )
+            if wait is not None:
+                self.wait_time = max(self.wait_time or 0, wait)
+        if self.wait_time is not None:
+            # Only allowed attempts are counted
+            store.undo([current_key for _, current_key, _, _ in windows])
+            return False
+        return True
+
+    def get_wait(self, previous, current, limit, duration, now):
+        """
+        The seconds until another attempt is allowed, or None if it is now
+        """
+        elapsed = (now % duration) / duration
+        if previous * (1 - elapsed) + current < limit:
+            return None
+        if current >= limit or not previous:
+            # Wait for the next window, when the current count becomes the
+            # previous one
+            return duration - now % duration
+        # Wait until enough of the previous window has dropped out
+        return ((1 - (limit - current) / previous) - elapsed) * duration
+
+    def get_identities(self, request):
+        """
+        The identities to count the attempt against
+        """
+        # Both are hashed, as they come from the client (the IP address can
+        # be from X-Forwarded-For), so the key is safe for any cache
+        identities = {"ip": hash_ident(self.get_ident(request)), "email": None}
+        data = request.data
+        email = data.get(self.email_field) if hasattr(data, "get") else None
+        if isinstance(email, str) and email.strip():
+            identities["email"] = hash_ident(email.strip().lower())
+        return {identity: identities[identity] for identity in self.identities}
+
+    def wait(self):
+        return self.wait_time
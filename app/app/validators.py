@@ -1,8 +1,21 @@
 import re
+import string
+from functools import lru_cache
 
-from django.core.exceptions import ValidationError
+from django.contrib.auth import password_validation
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.utils.translation import gettext as _
 
+# Password validation
+# PasswordPolicy runs the AUTH_PASSWORD_VALIDATORS, as Django's
+# validate_password does, and can also check many passwords at once (e.g. when
+# adding users in bulk). The validators are created once per process, and
+# the common passwords list is loaded once and shared.
+
+UPPERCASE = frozenset(string.ascii_uppercase)
+LOWERCASE = frozenset(string.ascii_lowercase)
+DIGITS = frozenset(string.digits)
+
 
 class PasswordComplexityValidator:
     def __init__(self, min_length=8, max_length=100):
@@ -28,8 +41,12 @@ class PasswordComplexityValidator:
                 code="password_too_long",
                 params={"max_length": self.max_length},
             )
-        if not re.match(
-            r"^(?=.*?[A-Z])(?=.*?[a-z])(?=.*?[0-9]).{8,}$", password
+        # Check the characters in one pass, rather than once for each class
+        characters = set(password)
+        if (
+            UPPERCASE.isdisjoint(characters)
+            or LOWERCASE.isdisjoint(characters)
+            or DIGITS.isdisjoint(characters)
         ):
             raise ValidationError(
                 _(
@@ -46,3 +63,150 @@ class PasswordComplexityValidator:
             f"{self.max_length} characters and at least 1 digit and 1 upper "
             "and 1 lower case character.."
         )
+
+
+@lru_cache(maxsize=None)
+def load_common_passwords(password_list_path):
+    """
+    The passwords in the list, loaded once per process
+    """
+    validator = password_validation.CommonPasswordValidator(password_list_path)
+    return frozenset(validator.passwords)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """
+    As Django's CommonPasswordValidator, sharing the loaded list
+    """
+
+    def __init__(self, password_list_path=None):
+        if password_list_path is None:
+            password_list_path = self.DEFAULT_PASSWORD_LIST_PATH
+        self.passwords = load_common_passwords(str(password_list_path))
+
+
+class UserAttributeSimilarityValidator(
+    password_validation.UserAttributeSimilarityValidator
+):
+    """
+    As Django's UserAttributeSimilarityValidator, counting the characters in
+    common directly rather than with difflib's SequenceMatcher.quick_ratio.
+    This gives the same similarity (twice the characters in common over the
+    total length) without building a SequenceMatcher for each attribute.
+    """
+
+    def validate(self, password, user=None):
+        if not user:
+            return
+
+        password = password.lower()
+        characters = set(password)
+        for attribute_name in self.user_attributes:
+            value = getattr(user, attribute_name, None)
+            if not value or not isinstance(value, str):
+                continue
+            value_lower = value.lower()
+            value_parts = re.split(r"\W+", value_lower) + [value_lower]
+            for value_part in value_parts:
+                if password_validation.exceeds_maximum_length_ratio(
+                    password, self.max_similarity, value_part
+                ):
+                    continue
+                length = len(password) + len(value_part)
+                common = sum(
+                    min(password.count(char), value_part.count(char))
+                    for char in characters.intersection(value_part)
+                )
+                similarity = 2.0 * common / length if length else 1.0
+                if similarity >= self.max_similarity:
+                    try:
+                        verbose_name = str(
+                            user._meta.get_field(attribute_name).verbose_name
+                        )
+                    except FieldDoesNotExist:
+                        verbose_name = attribute_name
+                    raise ValidationError(
+                        _(
+                            "The password is too similar to the "
+                            "%(verbose_name)s."
+                        ),
+                        code="password_too_similar",
+                        params={"verbose_name": verbose_name},
+                    )
+
+
+# Validators whose result only depends on the password (not the user), so
+# only need to check each distinct password once
+PASSWORD_ONLY_VALIDATORS = (
+    PasswordComplexityValidator,
+    password_validation.CommonPasswordValidator,
+    password_validation.MinimumLengthValidator,
+    password_validation.NumericPasswordValidator,
+)
+
+
+class PasswordPolicy:
+    """
+    Validates passwords with the given validators, or AUTH_PASSWORD_VALIDATORS
+    """
+
+    def __init__(self, validators=None):
+        self._validators = validators
+
+    @property
+    def validators(self):
+        if self._validators is not None:
+            return self._validators
+        # Created once, and again if the setting changes
+        return password_validation.get_default_password_validators()
+
+    def get_errors(self, password, user=None, results=None):
+        """
+        The errors from each of the validators. Results for the password only
+        validators are stored in `results`, if given.
+        """
+        errors = []
+        for validator in self.validators:
+            if results is not None and isinstance(
+                validator, PASSWORD_ONLY_VALIDATORS
+            ):
+                key = (id(validator), password)
+                if key not in results:
+                    results[key] = self.run(validator, password)
+                error = results[key]
+            else:
+                error = self.run(validator, password, user)
+            if error is not None:
+                errors.append(error)
+        return errors
+
+    def run(self, validator, password, user=None):
+        try:
+            validator.validate(password, user)
+        except ValidationError as error:
+            return error
+        return None
+
+    def validate(self, password, user=None):
+        """
+        Raise ValidationError with all of the errors if the password isn't
+        valid, as django.contrib.auth.password_validation.validate_password
+        """
+        errors = self.get_errors(password, user)
+        if errors:
+            raise ValidationError(errors)
+
+    def validate_many(self, passwords):
+        """
+        Validate many (password, user) pairs, returning a ValidationError with
+        all of the errors for each invalid password, or None when it is valid
+        """
+        results = {}
+        invalid = []
+        for password, user in passwords:
+            errors = self.get_errors(password, user, results)
+            invalid.append(ValidationError(errors) if errors else None)
+        return invalid
+
+
+password_policy = PasswordPolicy()
@@ -0,0 +1,88 @@
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Version stamps used to invalidate groups of cached values at once.
+# Rather than deleting every cached entry relating to (for example) a user's
+# data when it changes, each cache key includes the current version for that
+# user. Bumping the version means all of the old keys are no longer used, and
+# they will expire from the cache by themselves.
+# Versions should be bumped once the change is committed, otherwise another
+# request can read the new version before the change is visible to it, and
+# cache the old data against the new version.
+# Note: the default cache is local to each process, so a shared cache (e.g.
+# redis or memcached) should be configured in CACHES when running with more
+# than one worker.
+
+
+def _version_key(namespace, key):
+    return f"version:{namespace}:{key}"
+
+
+def get_version(namespace, key):
+    """
+    Get the current version for the given namespace and key
+    """
+    version_key = _version_key(namespace, key)
+    version = cache.get(version_key)
+    if version is None:
+        # Start from the current time rather than 1 so that if the version is
+        # evicted from the cache, old entries aren't picked up again
+        cache.add(version_key, time.time_ns(), timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+async def aget_version(namespace, key):
+    """
+    Get the current version for the given namespace and key, from async code
+    """
+    version_key = _version_key(namespace, key)
+    version = await cache.aget(version_key)
+    if version is None:
+        await cache.aadd(version_key, time.time_ns(), timeout=None)
+        version = await cache.aget(version_key)
+    return version
+
+
+def get_versions(namespaces, key):
+    """
+    The current versions for the key in each of the namespaces, combined
+    into one string
+    """
+    return ":".join(
+        str(get_version(namespace, key)) for namespace in namespaces
+    )
+
+
+async def aget_versions(namespaces, key):
+    """
+    As get_versions, from async code
+    """
+    return ":".join(
+        [str(await aget_version(namespace, key)) for namespace in namespaces]
+    )
+
+
+def bump_version(namespace, key):
+    """
+    Increment the version for the given namespace and key, invalidating
+    anything cached against the previous version
+    """
+    version_key = _version_key(namespace, key)
+    try:
+        return cache.incr(version_key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(version_key, version, timeout=None)
+        return version
+
+
+def bump_version_on_commit(namespace, key, using=None):
+    """
+    Bump the version for the given namespace and key once the current
+    transaction is committed, or straight away outside of a transaction
+    """
+    transaction.on_commit(partial(bump_version, namespace, key), using=using)
@@ -0,0 +1,138 @@
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from rest_framework import exceptions
+
+# Async views
+# Django REST framework views are synchronous, so under ASGI each request is
+# run in a thread. When ASYNC_API_VIEWS is on (the default under ASGI, see
+# app/asgi.py), views using AsyncAPIViewMixin are dispatched on the event
+# loop instead: authentication uses the authenticator's `aauthenticate` where
+# it has one, and a handler's async version (named with an "a" prefix e.g.
+# `alist` for `list`) is awaited directly. Handlers without an async version
+# (e.g. the create and update actions of a viewset) are run in a thread as
+# before.
+# Under WSGI, the views are dispatched synchronously as normal, as running
+# them on an event loop would only add the cost of switching threads.
+# Permissions and throttles are checked on the event loop, so they must not
+# query the database.
+
+
+class AsyncAPIViewMixin:
+    """
+    Dispatch the view asynchronously when ASYNC_API_VIEWS is on. Add before
+    the DRF view class e.g.
+    `class MyView(AsyncAPIViewMixin, generics.GenericAPIView)`
+    """
+
+    # Set from ASYNC_API_VIEWS when the view is created
+    async_dispatch = False
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        initkwargs.setdefault("async_dispatch", settings.ASYNC_API_VIEWS)
+        view = super().as_view(*args, **initkwargs)
+        # Viewsets don't mark their view as async, so Django wouldn't await it
+        if initkwargs["async_dispatch"] and not iscoroutinefunction(view):
+            markcoroutinefunction(view)
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.async_dispatch:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        # As APIView.dispatch, but awaiting the initial checks and handler
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            # Get the appropriate handler method
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+
+            async_handler = getattr(self, f"a{handler.__name__}", None)
+            if async_handler is not None:
+                response = await async_handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(
+                    request, *args, **kwargs
+                )
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        """
+        As APIView.initial, but authenticating asynchronously
+        """
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        # Perform content negotiation and store the accepted info on the
+        # request
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        # Determine the API version, if versioning is in use.
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        # Ensure that the incoming request is permitted
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        """
+        Authenticate the request, as Request._authenticate does when the user
+        is first accessed
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(
+                        request
+                    )
+                else:
+                    user_auth_tuple = await sync_to_async(
+                        authenticator.authenticate
+                    )(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def apaginate_queryset(self, queryset):
+        """
+        As GenericAPIView.paginate_queryset, for paginators with an async
+        `apaginate_queryset`
+        """
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self
+        )
@@ -0,0 +1,54 @@
+from utils import report, setup_django
+
+setup_django()
+
+import re  # noqa: E402
+
+from accounts.domains import EmailDomainPolicy  # noqa: E402
+
+# Compare checking email addresses against the allowed domains with the
+# regex originally used by CustomUserManager.create_user (built for every
+# call, and precompiled) against accounts.domains, for different numbers of
+# allowed domains.
+
+
+def build_regex(domains):
+    return (
+        r"^[a-zA-Z0-9\._:$!%-']+@[a-zA-Z0-9\.-]*(?:"
+        + "|".join(domains)
+        + r")\.[a-zA-Z\\.]{2,5}$"
+    )
+
+
+def main():
+    for count in (2, 100, 1000, 10000):
+        domains = [f"domain{i}" for i in range(count)]
+        emails = [
+            f"user{i}@mail.domain{i * 7919 % count}.co.uk" for i in range(50)
+        ] + [f"user{i}@otherdomain{i}.com" for i in range(50)]
+        pattern = re.compile(build_regex(domains))
+        policy = EmailDomainPolicy(domains)
+        assert [bool(pattern.match(email)) for email in emails] == (
+            policy.check_many(emails)
+        )
+
+        number = max(1, 1000 // count)
+        report(
+            f"Regex built per call ({count} domains, 100 emails)",
+            lambda: [re.match(build_regex(domains), e) for e in emails],
+            number=number,
+        )
+        report(
+            f"Precompiled regex ({count} domains, 100 emails)",
+            lambda: [pattern.match(email) for email in emails],
+            number=number,
+        )
+        report(
+            f"EmailDomainPolicy ({count} domains, 100 emails)",
+            lambda: policy.check_many(emails),
+            number=number,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from utils import report, setup_django
+
+setup_django()
+
+from django.template.loader import render_to_string  # noqa: E402
+from django.utils.encoding import force_bytes  # noqa: E402
+from django.utils.http import urlsafe_base64_encode  # noqa: E402
+
+from accounts.emails import account_activation_email  # noqa: E402
+from accounts.models import CustomUser, Profile  # noqa: E402
+from accounts.tokens import account_activation_token  # noqa: E402
+
+# Compare rendering the account activation email with render_to_string (as
+# it was done originally) against the precompiled templates in
+# accounts.emails. No database is needed - the users aren't saved.
+
+DOMAIN = "www.example.com"
+
+
+def make_users(count):
+    users = []
+    for i in range(count):
+        user = CustomUser(
+            pk=i + 1,
+            email=f"user{i}@example.com",
+            first_name="Test",
+            last_name=f"User {i}",
+        )
+        Profile(user=user)
+        users.append(user)
+    return users
+
+
+def render_with_render_to_string(user):
+    data = {
+        "user": user,
+        "domain": DOMAIN,
+        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+        "token": account_activation_token.make_token(user),
+    }
+    return (
+        render_to_string("email/account_activation_email.html", data),
+        render_to_string("email/account_activation_email.txt", data),
+    )
+
+
+def main():
+    users = make_users(100)
+    user = users[0]
+
+    report(
+        "render_to_string (1 email)",
+        lambda: render_with_render_to_string(user),
+    )
+    report(
+        "AccountActivationEmail.render (1 email)",
+        lambda: account_activation_email.render(user, domain=DOMAIN),
+    )
+    report(
+        "render_to_string (100 emails)",
+        lambda: [render_with_render_to_string(u) for u in users],
+        number=20,
+    )
+    report(
+        "AccountActivationEmail.render_many (100 emails)",
+        lambda: list(
+            account_activation_email.render_many(users, domain=DOMAIN)
+        ),
+        number=20,
+    )
+
+
+if __name__ == "__main__":
+    main()
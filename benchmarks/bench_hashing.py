@@ -0,0 +1,82 @@
+from utils import setup_django
+
+setup_django()
+
+import os  # noqa: E402
+import time  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+
+from django.test import override_settings  # noqa: E402
+
+from accounts import hashing  # noqa: E402
+from accounts.models import CustomUser  # noqa: E402
+from api.models import ExampleDataTable  # noqa: E402
+from api.serializers import ExampleDataTableSerializer  # noqa: E402
+
+# Compare the login throughput of a threaded worker process when passwords
+# are hashed in the worker (as originally) against the hashing pool in
+# accounts.hashing, along with how long other requests handled by the same
+# worker take while the logins are running.
+# No database is needed - each login checks the password of an in memory
+# user, and each other request serializes a page of examples.
+
+LOGINS = 48
+WORKER_THREADS = 8
+
+
+def other_request(examples):
+    """
+    Some pure Python request work, which needs the GIL
+    """
+    start = time.perf_counter()
+    ExampleDataTableSerializer(examples, many=True).data
+    return time.perf_counter() - start
+
+
+def run(workers, user, examples):
+    with override_settings(PASSWORD_HASHING_WORKERS=workers):
+        # Start the pool before timing
+        hashing.make_password("warm up")
+        with ThreadPoolExecutor(max_workers=WORKER_THREADS) as executor:
+            start = time.perf_counter()
+            logins = [
+                executor.submit(user.check_password, "123ABC456cde")
+                for _ in range(LOGINS)
+            ]
+            others = []
+            while not all(login.done() for login in logins):
+                others.append(other_request(examples))
+            assert all(login.result() for login in logins)
+            elapsed = time.perf_counter() - start
+        hashing.shutdown_executor()
+
+    others.sort()
+    name = f"{workers} hashing processes" if workers else "In the worker"
+    print(
+        f"{name:<30} {LOGINS / elapsed:>8.1f} logins/s   "
+        f"other requests: median {others[len(others) // 2] * 1000:.1f} ms, "
+        f"p99 {others[int(len(others) * 0.99)] * 1000:.1f} ms"
+    )
+
+
+def main():
+    with override_settings(PASSWORD_HASHING_WORKERS=0):
+        user = CustomUser(pk=1, email="owner@example.com")
+        user.set_password("123ABC456cde")
+    examples = [
+        ExampleDataTable(
+            pk=i + 1,
+            name=f"Person {i}",
+            email=f"user{i}@example.com",
+            message=f"Test message from user {i}",
+            owner=user,
+        )
+        for i in range(100)
+    ]
+
+    run(0, user, examples)
+    run(os.cpu_count() or 1, user, examples)
+
+
+if __name__ == "__main__":
+    main()
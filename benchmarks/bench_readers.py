@@ -0,0 +1,57 @@
+from utils import report, setup_django
+
+setup_django()
+
+import datetime  # noqa: E402
+
+from accounts.models import CustomUser  # noqa: E402
+from api.models import ExampleDataTable  # noqa: E402
+from api.serializers import ExampleDataTableSerializer  # noqa: E402
+from app.readers import get_values_reader  # noqa: E402
+
+# Compare serializing a page of examples with ExampleDataTableSerializer (as
+# it was done originally) against formatting the values with app.readers.
+# No database is needed - the rows are built in memory, so this doesn't
+# include the time saved by not building model instances.
+
+
+def main():
+    reader = get_values_reader(ExampleDataTableSerializer)
+    owner = CustomUser(pk=1, email="owner@example.com")
+    created_at = datetime.datetime(2024, 1, 2, 3, 4, 5)
+
+    for count in (10, 100, 1000):
+        examples = [
+            ExampleDataTable(
+                pk=i + 1,
+                name=f"Person {i}",
+                email=f"user{i}@example.com",
+                message=f"Test message from user {i}",
+                created_at=created_at,
+                owner=owner,
+            )
+            for i in range(count)
+        ]
+        rows = [
+            {attname: getattr(example, attname) for attname in reader.attnames}
+            for example in examples
+        ]
+        assert reader.to_representation(rows) == (
+            ExampleDataTableSerializer(examples, many=True).data
+        )
+
+        number = 10000 // count
+        report(
+            f"ExampleDataTableSerializer ({count} rows)",
+            lambda: ExampleDataTableSerializer(examples, many=True).data,
+            number=number,
+        )
+        report(
+            f"ValuesReader ({count} rows)",
+            lambda: reader.to_representation(rows),
+            number=number,
+        )
+
+
+if __name__ == "__main__":
+    main()
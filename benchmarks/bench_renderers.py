@@ -0,0 +1,72 @@
+from utils import report, setup_django
+
+setup_django()
+
+import datetime  # noqa: E402
+
+from djangorestframework_camel_case.render import (  # noqa: E402
+    CamelCaseJSONRenderer as LibraryCamelCaseJSONRenderer,
+)
+
+from accounts.models import CustomUser  # noqa: E402
+from api.models import ExampleDataTable  # noqa: E402
+from api.serializers import ExampleDataTableSerializer  # noqa: E402
+from app.renderers import CamelCaseJSONRenderer  # noqa: E402
+
+# Compare rendering a page of the examples list with the
+# djangorestframework_camel_case renderer (as it was done originally) against
+# the project renderer in app.renderers. No database is needed - the examples
+# aren't saved.
+
+
+def make_page(count):
+    owner = CustomUser(pk=1, email="owner@example.com")
+    created_at = datetime.datetime(2024, 1, 2, 3, 4, 5)
+    examples = [
+        ExampleDataTable(
+            pk=i + 1,
+            name=f"Person {i}",
+            email=f"user{i}@example.com",
+            message=f"Test message from user {i}",
+            created_at=created_at,
+            owner=owner,
+        )
+        for i in range(count)
+    ]
+    results = ExampleDataTableSerializer(examples, many=True).data
+    # The same envelope as CustomPagination
+    return {
+        "pagination": {
+            "previous": None,
+            "next": "http://www.example.com/api/v1/examples/?page=2",
+            "count": count * 10,
+            "current_page": 1,
+            "total_pages": 10,
+            "items_on_page": count,
+        },
+        "results": results,
+    }
+
+
+def main():
+    library_renderer = LibraryCamelCaseJSONRenderer()
+    renderer = CamelCaseJSONRenderer()
+
+    for count in (10, 100, 1000):
+        page = make_page(count)
+        assert renderer.render(page) == library_renderer.render(page)
+        number = 10000 // count
+        report(
+            f"djangorestframework_camel_case ({count} rows)",
+            lambda: library_renderer.render(page),
+            number=number,
+        )
+        report(
+            f"app.renderers ({count} rows)",
+            lambda: renderer.render(page),
+            number=number,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+from utils import report, setup_django
+
+setup_django()
+
+import re  # noqa: E402
+
+from django.contrib.auth import password_validation  # noqa: E402
+from django.core.exceptions import ValidationError  # noqa: E402
+
+from accounts.models import CustomUser  # noqa: E402
+from app.validators import (  # noqa: E402
+    CommonPasswordValidator,
+    PasswordComplexityValidator,
+    UserAttributeSimilarityValidator,
+    password_policy,
+)
+
+# Compare the password validation in app.validators against how it was done
+# originally: the complexity check with the lookahead regex, creating the
+# common passwords validator (which loads the list), the user attribute
+# similarity check, and validating many
+# passwords one at a time with Django's validate_password.
+
+
+def main():
+    password = "123ABCcde456"
+    report(
+        "Complexity (regex)",
+        lambda: re.match(
+            r"^(?=.*?[A-Z])(?=.*?[a-z])(?=.*?[0-9]).{8,}$", password
+        ),
+        number=100000,
+    )
+    validator = PasswordComplexityValidator()
+    report(
+        "Complexity (PasswordComplexityValidator)",
+        lambda: validator.validate(password),
+        number=100000,
+    )
+
+    report(
+        "Create Django's CommonPasswordValidator",
+        password_validation.CommonPasswordValidator,
+        number=10,
+    )
+    report(
+        "Create CommonPasswordValidator (shared list)",
+        CommonPasswordValidator,
+        number=10000,
+    )
+
+    user = CustomUser(
+        email="jane.smith@example.com", first_name="Jane", last_name="Smith"
+    )
+    for name, similarity in [
+        ("Django's", password_validation.UserAttributeSimilarityValidator()),
+        ("app.validators", UserAttributeSimilarityValidator()),
+    ]:
+        report(
+            f"Attribute similarity ({name})",
+            lambda: similarity.validate(password, user),
+            number=10000,
+        )
+
+    # A batch of new users, many sharing an initial password
+    users = [
+        (
+            f"Initial{i % 10}Password",
+            CustomUser(
+                email=f"user{i}@example.com",
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+            ),
+        )
+        for i in range(1000)
+    ]
+
+    # The validators as originally configured
+    validators = [
+        password_validation.UserAttributeSimilarityValidator(),
+        password_validation.CommonPasswordValidator(),
+        PasswordComplexityValidator(),
+    ]
+
+    def validate_each():
+        for password, user in users:
+            try:
+                password_validation.validate_password(
+                    password, user, validators
+                )
+            except ValidationError:
+                pass
+
+    report(
+        "validate_password (1000 users)",
+        validate_each,
+        number=3,
+        repeat=3,
+    )
+    report(
+        "PasswordPolicy.validate_many (1000 users)",
+        lambda: password_policy.validate_many(users),
+        number=3,
+        repeat=3,
+    )
+
+
+if __name__ == "__main__":
+    main()
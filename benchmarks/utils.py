@@ -0,0 +1,28 @@
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Shared setup for the benchmark scripts. These are run directly e.g.
+# `python benchmarks/bench_emails.py`, or all together with `nox -s benchmark`
+
+
+def setup_django():
+    """
+    Make the app importable and configure Django
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+    import django
+
+    django.setup()
+
+
+def report(name, func, number=1000, repeat=5):
+    """
+    Time the function, printing the best time per call
+    """
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    print(f"{name:<50} {best * 1e6:>10.1f} us/call")
+    return best
@@ -1,8 +1,10 @@
+from pathlib import Path
+
 import nox
 
 nox.options.sessions = ["lint"]
 
-PYTHON_SOURCES = ["app", "noxfile.py", "database-setup.py"]
+PYTHON_SOURCES = ["app", "benchmarks", "noxfile.py", "database-setup.py"]
 
 
 @nox.session
@@ -14,6 +16,16 @@ def test(session):
     session.run("python", "app/manage.py", "test", "app/", "--noinput")
 
 
+@nox.session
+def benchmark(session):
+    """
+    Run the benchmark scripts
+    """
+    session.install("-r", "app/requirements.txt")
+    for script in sorted(Path("benchmarks").glob("bench_*.py")):
+        session.run("python", str(script))
+
+
 @nox.session
 def lint(session):
     """